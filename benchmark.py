@@ -0,0 +1,261 @@
+import core.topology
+import core.model
+import argparse
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_SIZES = [5, 50, 100, 200, 450]
+DEFAULT_HISTORY = 'solutions/benchmark_history.jsonl'
+
+
+# ---------------------------------------------------------------
+# ---------------------- Stage Measurement ----------------------
+# ---------------------------------------------------------------
+
+def _peak_rss_kb() -> int:
+    """ Process high-water mark of the resident set size, in KB. """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _current_rss_kb() -> int:
+    """ Resident set size of the process now, in KB (None without /proc). """
+    try:
+        with open('/proc/self/statm', 'r') as statm_file:
+            return int(statm_file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        return None
+
+
+class StageRecorder:
+    """
+    Wall time and memory of every stage. The memory of a stage is measured as
+    deltas over the stage: peak_rss_delta_kb is how much it raised the high-water
+    mark of the process (0 when it stayed below the peak of an earlier stage), and
+    rss_delta_kb how much resident memory it left behind.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name: str, function, *args, **kwargs):
+        peak_before, rss_before = _peak_rss_kb(), _current_rss_kb()
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        wall_time = time.perf_counter() - start
+        rss_after = _current_rss_kb()
+        self.stages[name] = {'wall_time': wall_time, 'peak_rss_delta_kb': _peak_rss_kb() - peak_before,
+                             'rss_delta_kb': rss_after - rss_before if rss_after is not None else None}
+        return result
+
+
+def create_topology(size: int) -> core.topology.Topology:
+    """ Same hardware and base station definitions used in eepran.py. """
+    topo = core.topology.Topology('data/T2_{}_BS_usage.csv'.format(size))
+    topo.add_hardware(identifier=1, cpu=64, power_consumption=225)
+    topo.add_hardware(identifier=2, cpu=56, power_consumption=400)
+    topo.add_base_station(identifier=1, num_rf_chains=25, num_sectors=3,
+                          transmission_power=40, static_power_consumption=260,
+                          rf_chain_power_consumption=1, power_amplifier_efficiency=0.25)
+    return topo
+
+
+def run_size(size: int, builder: str, solve: bool, time_limit: float, backend: str = 'cplex') -> dict:
+    """
+    Run every stage of the EEP-RAN pipeline for a single topology size.
+
+    The model stages use the generated routes. The shipped routes (data/routes_{size}.json)
+    are imported into a second topology, only to time the import.
+    """
+    logging.getLogger().setLevel(logging.WARNING)
+    recorder = StageRecorder()
+    result = {'size': size, 'builder': builder, 'backend': backend, 'stages': recorder.stages}
+
+    topo = recorder.run('topology_init', create_topology, size)
+    recorder.run('load_nodes', topo.load_nodes_for_eepran,
+                 'data/EEPRAN_T2_{}_nodes.json'.format(size))
+    recorder.run('load_links', topo.load_links_for_eepran,
+                 'data/EEPRAN_T2_{}_links.json'.format(size))
+    recorder.run('generate_routes', topo.generate_routes, origin_node='node0')
+    result['routes'] = len(topo.get_routes())
+
+    routes_path = 'data/routes_{}.json'.format(size)
+    if os.path.exists(routes_path):
+        imported = create_topology(size)
+        imported.load_nodes_for_eepran('data/EEPRAN_T2_{}_nodes.json'.format(size))
+        imported.load_links_for_eepran('data/EEPRAN_T2_{}_links.json'.format(size))
+        recorder.run('import_routes', imported.import_routes_from_json, routes_path)
+        result['imported_routes'] = len(imported.get_routes())
+        del imported
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        lp_path = os.path.join(tmp_dir, 'model.lp')
+        if builder == 'term':
+            model, _ = recorder.run('build_model', core.model.build_eepran_model, topo, lp_path=None)
+        elif builder == 'colgen':
+            from core.colgen import build_eepran_model_colgen
+
+            model, _ = recorder.run('build_model', build_eepran_model_colgen, topo, backend=backend)
+        else:
+            model, _ = recorder.run('build_model', core.model.build_eepran_model_sparse,
+                                    topo, lp_path=None, backend=backend)
+        # sections of the build are only timed, their memory is part of build_model
+        for section, wall_time in model.build_timings.items():
+            recorder.stages['build_model/{}'.format(section)] = {'wall_time': wall_time}
+
+        recorder.run('export_lp', model.export_as_lp, lp_path)
+
+    result['variables'] = model.number_of_variables
+    result['constraints'] = model.number_of_constraints
+
+    if solve:
+        if time_limit is not None:
+            model.parameters.timelimit = time_limit
+        model.parameters.threads = 1
+        try:
+            solution = recorder.run('solve', model.solve, log_output=False)
+        except Exception as error:
+            # e.g. size limits of the community edition; keep the stages measured so far
+            result['solve_status'] = 'error: {}'.format(error)
+        else:
+            details = model.solve_details
+            result['solve_status'] = details.status
+            if hasattr(details, 'deterministic_time'):
+                result['solver_ticks'] = details.deterministic_time
+            result['objective'] = solution.get_objective_value() if solution is not None else None
+
+    model.end()
+    return result
+
+
+# ---------------------------------------------------------------
+# ------------------------ History File -------------------------
+# ---------------------------------------------------------------
+
+def load_history(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as history_file:
+        return [json.loads(line) for line in history_file if line.strip()]
+
+
+def append_history(path: str, record: dict) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as history_file:
+        history_file.write(json.dumps(record) + '\n')
+
+
+def find_regressions(history: list, result: dict, threshold: float,
+                     window: int, min_time: float) -> list:
+    """
+    Compare each stage of result against the median of the last runs with the same
+    size, builder and backend.
+
+    Parameters
+    ----------
+
+    threshold : float
+        Allowed relative slow down, e.g. 0.25 fails a stage 25% slower than its baseline.
+    window : int
+        Number of previous runs used to compute the baseline.
+    min_time : float
+        Stages faster than this (in seconds) are too noisy and never fail.
+
+    """
+    previous = [run for record in history for run in record['results']
+                if run['size'] == result['size'] and run['builder'] == result['builder']
+                and run.get('backend', 'cplex') == result.get('backend', 'cplex')][-window:]
+
+    regressions = []
+    for stage, measures in result['stages'].items():
+        baseline = [run['stages'][stage]['wall_time'] for run in previous if stage in run['stages']]
+        if len(baseline) == 0:
+            continue
+
+        baseline_time = statistics.median(baseline)
+        wall_time = measures['wall_time']
+        if wall_time > min_time and wall_time > baseline_time * (1 + threshold):
+            regressions.append((stage, baseline_time, wall_time))
+
+    return regressions
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------------------------------------------------------------
+# ---------------------------- Main -----------------------------
+# ---------------------------------------------------------------
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the EEP-RAN pipeline over the T2 instances.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--builder', choices=['sparse', 'term', 'colgen'], default='sparse')
+    parser.add_argument('--backend', choices=core.model.SOLVER_BACKENDS, default='cplex',
+                        help='Solver of the sparse builder.')
+    parser.add_argument('--no-solve', action='store_true', help='Skip the solve stage.')
+    parser.add_argument('--time-limit', type=float, default=None, help='Solver time limit [s].')
+    parser.add_argument('--history', default=DEFAULT_HISTORY)
+    parser.add_argument('--threshold', type=float, default=0.25)
+    parser.add_argument('--window', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.1)
+    parser.add_argument('--no-record', action='store_true', help='Do not append to the history file.')
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    record = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'revision': _git_revision(),
+              'results': []}
+    failed = False
+
+    # Each size runs in a fresh process, so peak RSS is not inherited from smaller sizes
+    context = multiprocessing.get_context('spawn')
+    for size in args.sizes:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                result = executor.submit(run_size, size, args.builder, not args.no_solve,
+                                         args.time_limit, args.backend).result()
+            except Exception as error:
+                print('T2_{}: failed with {!r}'.format(size, error))
+                failed = True
+                continue
+
+        record['results'].append(result)
+        print('T2_{}: {} routes, {} variables, {} constraints'.format(
+            size, result['routes'], result['variables'], result['constraints']))
+        for stage, measures in result['stages'].items():
+            memory = ''
+            if 'peak_rss_delta_kb' in measures:
+                memory = ' peak +{:>9} KB, rss {:>+10} KB'.format(measures['peak_rss_delta_kb'],
+                                                                  measures['rss_delta_kb'])
+            print('    {:<40} {:>10.4f}s{}'.format(stage, measures['wall_time'], memory))
+        if 'solve_status' in result:
+            print('    {:<40} {}'.format('solve status', result['solve_status']))
+        if 'solver_ticks' in result:
+            print('    {:<40} {:>10.2f} ticks'.format('solver', result['solver_ticks']))
+
+        for stage, baseline_time, wall_time in find_regressions(history, result, args.threshold,
+                                                                args.window, args.min_time):
+            print('    REGRESSION {}: {:.4f}s -> {:.4f}s'.format(stage, baseline_time, wall_time))
+            failed = True
+
+    if not args.no_record:
+        append_history(args.history, record)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+from __future__ import annotations
+from core.model import *
+import hashlib
+import os
+import shutil
+import time
+
+
+def routes_fingerprint(routes: list) -> str:
+    """ sha256 of the identifiers, sequences, links and delays of routes. """
+    digest = hashlib.sha256()
+    for route in routes:
+        digest.update(repr((route.identifier, route.sequence, route.get_fronthaul_links(),
+                            route.get_midhaul_links(), route.get_backhaul_links(), route.delay_fronthaul,
+                            route.delay_midhaul, route.delay_backhaul)).encode())
+    return digest.hexdigest()
+
+
+class TopologyCache:
+    """
+    Content addressed cache of routes and models on disk.
+
+    Every entry is a directory named by the sha256 of what it was built from: the
+    Topology.fingerprint() (nodes, links, hardware, base stations and the DRC
+    catalog), the origin node and path selection for routes, and the routes fingerprint, centralization
+    cap and presolve flag for models. A changed topology or catalog misses the cache
+    instead of reading stale data.
+
+    Routes are kept as a core.routestore.RouteStore. Models are kept as the
+    EepranMatrix (EepranMatrix.save()) plus its MPS, read back by CPLEX, so neither
+    the matrix nor the docplex model is assembled again.
+
+    Entries are evicted least recently used first (by the mtime of the entry, touched
+    on every hit) when the cache grows over max_bytes.
+    """
+
+    def __init__(self, directory: str = 'data/cache', max_bytes: int = 1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+
+    def __entry_path(self, *parts) -> str:
+        digest = hashlib.sha256(json.dumps([str(part) for part in parts]).encode()).hexdigest()
+        return os.path.join(self.directory, digest)
+
+
+    def __hit(self, path: str) -> bool:
+        if not os.path.isdir(path):
+            return False
+        os.utime(path)
+        return True
+
+
+    def __commit(self, staging: str, path: str) -> None:
+        """ Move a fully written entry in place, so a crash never leaves half an entry. """
+        if os.path.isdir(path):
+            shutil.rmtree(staging)
+        else:
+            os.replace(staging, path)
+        self.evict(keep=path)
+
+
+    def __staging_path(self, path: str) -> str:
+        staging = '{}.{}.tmp'.format(path, os.getpid())
+        shutil.rmtree(staging, ignore_errors=True)
+        return staging
+
+
+    # ----- Routes -----
+
+    def load_routes(self, topo: Topology, origin_node: str, workers: int = None,
+                    shortest_paths: bool = False) -> bool:
+        """
+        Import the cached routes of topo into it, generating them on a miss (see
+        Topology.generate_routes() for workers and shortest_paths) and caching them.
+
+        :returns: True on a cache hit.
+        """
+        path = self.__entry_path('routes', topo.fingerprint(), origin_node, shortest_paths)
+        if self.__hit(path):
+            topo.import_routes_from_store(path)
+            return True
+
+        topo.generate_routes(origin_node, workers, shortest_paths)
+        staging = self.__staging_path(path)
+        topo.export_routes_to_store(staging)
+        self.__commit(staging, path)
+        return False
+
+
+    # ----- Models -----
+
+    def build_eepran_model(self, topo: Topology, centralization_cap: int = 0, presolve: bool = False,
+                           backend: str = 'cplex') -> {Model, AbstractConstraint}:
+        """
+        core.model.build_eepran_model_sparse() (without the LP export), reading the
+        matrix and the model from the cache when topo and its routes are unchanged.
+        """
+        path = self.__entry_path('model', topo.fingerprint(), routes_fingerprint(topo.get_routes()),
+                                 centralization_cap, presolve)
+        if self.__hit(path):
+            logging.info('Model Creation Time (cached):')
+            load_start = time.time()
+            matrix = EepranMatrix.load(os.path.join(path, 'matrix'), topo)
+            load_end = time.time()
+            logging.info('    Matrix Load: {}s'.format(load_end - load_start))
+
+            if backend != 'cplex':
+                model, centralization_constraint = create_model_from_matrix(matrix, backend, log_output=True)
+            else:
+                model, centralization_constraint = read_model_from_mps(matrix, os.path.join(path, 'model.mps'))
+            model.build_timings['Matrix Load'] = load_end - load_start
+            return model, centralization_constraint
+
+        logging.info('Model Creation Time (sparse):')
+        matrix = build_eepran_matrix(topo, centralization_cap, presolve)
+        staging = self.__staging_path(path)
+        matrix.save(os.path.join(staging, 'matrix'))
+        matrix.write_mps(os.path.join(staging, 'model.mps'))
+        self.__commit(staging, path)
+        return create_model_from_matrix(matrix, backend, log_output=True)
+
+
+    # ----- Eviction -----
+
+    def size(self) -> int:
+        """ :returns: The bytes used by the cache entries. """
+        return sum(_directory_size(os.path.join(self.directory, entry))
+                   for entry in os.listdir(self.directory))
+
+
+    def evict(self, keep: str = None) -> list:
+        """
+        Remove the least recently used entries until the cache fits in max_bytes.
+        The entry keep is never removed.
+
+        :returns: The removed entries.
+        """
+        entries = []
+        for entry in os.listdir(self.directory):
+            path = os.path.join(self.directory, entry)
+            if os.path.isdir(path) and not entry.endswith('.tmp'):
+                entries.append((os.path.getmtime(path), path, _directory_size(path)))
+        entries.sort()
+
+        total = sum(size for _, _, size in entries)
+        removed = []
+        for _, path, size in entries:
+            if total <= self.max_bytes:
+                break
+            if keep is not None and os.path.samefile(path, keep):
+                continue
+            shutil.rmtree(path)
+            total -= size
+            removed.append(path)
+        return removed
+
+
+def read_model_from_mps(matrix: EepranMatrix, mps_path: str) -> {Model, AbstractConstraint}:
+    """
+    Read the docplex model of matrix from an MPS written by EepranMatrix.write_mps(),
+    with the same names and x/y/z, columns, row_constraints and matrix attributes as
+    core.model.create_model_from_matrix().
+    """
+    from docplex.mp.model_reader import ModelReader
+
+    read_start = time.time()
+    model = ModelReader.read(mps_path, model_name='EEP-Ran Problem')
+    if model is None or model.number_of_variables != matrix.num_columns:
+        raise RuntimeError('Cannot read the cached model {}'.format(mps_path))
+
+    # MPS names are sanitized (see core.matrix._mps_name()), the original ones are restored
+    columns = list(model.iter_variables())
+    for column, name in zip(columns, matrix.column_names):
+        column.name = name
+    model.row_constraints = list(model.iter_constraints())
+    for constraint, name in zip(model.row_constraints, matrix.row_names):
+        constraint.name = name
+
+    model.x = dict(zip(matrix.x_keys, columns[:matrix.num_x]))
+    model.y = dict(zip(matrix.y_keys, columns[matrix.num_x:matrix.num_x+matrix.num_y]))
+    model.z = dict(zip(matrix.z_keys, columns[matrix.num_x+matrix.num_y:]))
+    model.columns = columns
+    model.matrix = matrix
+    read_end = time.time()
+
+    logging.info('    Model Read: {}s'.format(read_end - read_start))
+    model.build_timings = {'Model Read': read_end - read_start}
+    return model, model.row_constraints[matrix.centralization_row]
+
+
+def _directory_size(path: str) -> int:
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
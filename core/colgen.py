@@ -0,0 +1,416 @@
+from __future__ import annotations
+from core.model import *
+from core.highs import _row_bounds
+import time
+
+# docplex (which loads pandas) is imported when the restricted master is built
+
+
+class _ColumnPricer:
+    """
+    Route/DRC columns of the EEP-RAN model generated on demand from the routes of the
+    topology, without assembling the matrix. With an origin node the routes are not
+    kept: every pass streams them again from Topology.iter_routes(), base station by
+    base station, and only the priced columns are held.
+
+    A column is its cost at full load and its terms, as (row, coefficient) pairs;
+    rows are identified as ('single_route', bs_key), ('psi_1', hw_key),
+    ('processing', hw_key), ('link', link_key), ('psi_2', CeilVariableKey) and
+    ('centralization', None). The coefficients are those of core.matrix.EepranMatrix
+    (a psi row stands for its low and high ceil rows, which share them).
+    """
+
+    def __init__(self, topo: Topology, origin_node=None, shortest_paths: bool = False):
+        self.topo = topo
+        self.origin_node = origin_node
+        self.shortest_paths = shortest_paths
+        self.index = topo.get_index()
+        self.splits = package_drc.get_drc_list()
+        self.vnf_cpu_usage = package_drc.get_vnf_dict()
+        functions = list(self.vnf_cpu_usage.keys())
+        self.base_station_keys = topo.get_base_station_keys()
+        self.maximum_centralization = len(functions) * len(self.base_station_keys)
+        self.ceil_keys = set(get_ceil_variable_keys(topo, functions))
+        self.cu_functions = {drc.identifier: [f for f in functions if f in drc.fs_cu] for drc in self.splits}
+        self.du_functions = {drc.identifier: [f for f in functions if f in drc.fs_du] for drc in self.splits}
+
+
+    def iter_routes(self):
+        """ Yields the routes of the topology, or generates them from origin_node. """
+        if self.origin_node is None:
+            return iter(self.topo.get_routes())
+        return self.topo.iter_routes(self.origin_node, self.shortest_paths)
+
+
+    def iter_columns(self):
+        """ Yields (DecisionVariableKey, route, cost, terms) for every candidate, route by route. """
+        base_station_keys = set(self.base_station_keys)
+        for route in self.iter_routes():
+            bs_key = route.get_target_base_station()
+            if bs_key not in base_station_keys:
+                continue
+            for drc in get_route_drcs(route, self.splits):
+                key = DecisionVariableKey(route.identifier, drc.identifier, bs_key)
+                yield (key, route) + self.column(route, drc)
+
+
+    def column(self, route: Route, drc) -> tuple:
+        """ :returns: (cost, terms) of the column of route with drc. """
+        index = self.index
+        bs_key = route.get_target_base_station()
+        bs_id = index.base_station_ids[bs_key]
+        cost = (1.0 - drc.bs_relief) * (index.base_station_static_power[bs_id] +
+                                        index.base_station_load_power[bs_id])
+        terms = [(('single_route', bs_key), 1.0)]
+
+        cu_functions = self.cu_functions[drc.identifier]
+        du_functions = self.du_functions[drc.identifier]
+        for hw_key in route.get_hardware_keys():
+            functions = []
+            if route.is_cu(hw_key):
+                functions += cu_functions
+            if route.is_du(hw_key):
+                functions += du_functions
+            if len(functions) == 0:
+                continue
+            hw_id = index.hardware_ids[hw_key]
+            cpu_usage = sum(self.vnf_cpu_usage[function] for function in functions)
+            cost += cpu_usage * index.hardware_dynamic_power_per_core[hw_id]
+            terms.append((('psi_1', hw_key), -len(functions) / self.maximum_centralization))
+            terms.append((('processing', hw_key), cpu_usage))
+
+        for links, bandwidth in ((route.get_backhaul_links(), drc.bandwidth_bh),
+                                 (route.get_midhaul_links(), drc.bandwidth_mh),
+                                 (route.get_fronthaul_links(), drc.bandwidth_fh)):
+            for link_key in links:
+                link_id = index.link_ids[link_key]
+                ports = bandwidth / index.link_port_capacity[link_id]
+                cost += ports * index.link_port_power[link_id]
+                terms.append((('link', link_key), ports))
+
+        for has_crosshaul, node_key, functions in (
+                (route.has_backhaul(), route.get_backhaul_node_key, cu_functions),
+                (route.has_midhaul(), route.get_midhaul_node_key, du_functions)):
+            if not has_crosshaul:
+                continue
+            for function in functions:
+                ceil_key = CeilVariableKey(node_key(), function)
+                if ceil_key in self.ceil_keys:
+                    terms.append((('psi_2', ceil_key), -1.0 / self.maximum_centralization))
+                    terms.append((('centralization', None), 1.0))
+        return cost, terms
+
+
+class _CplexMaster:
+    """
+    LP of the restricted master in docplex, grown row by row and column by column.
+    A row is added to the model with its first term, as docplex rejects an empty
+    equality row.
+    """
+
+    def __init__(self):
+        from docplex.mp.model import Model
+
+        self.model = Model(name='EEP-Ran Master')
+        self.rows = []          # (name, sense, rhs, left expression) until the row is added
+        self.constraints = []
+        self.objective = self.model.linear_expr()
+
+
+    def add_row(self, name: str, sense: str, rhs: float) -> int:
+        """ Add an empty row. :returns: its position. """
+        self.rows.append((name, sense, rhs, self.model.linear_expr()))
+        self.constraints.append(None)
+        return len(self.constraints) - 1
+
+
+    def add_column(self, name: str, cost: float, upper: float, entries: list) -> None:
+        """ Add a column with entries, as (row position, coefficient) pairs. """
+        var = self.model.continuous_var(ub=upper, name=name)
+        self.objective.add_term(var, cost)
+        for position, value in entries:
+            if self.constraints[position] is not None:
+                self.constraints[position].left_expr.add_term(var, value)
+            else:
+                row_name, sense, rhs, expression = self.rows[position]
+                expression.add_term(var, value)
+                if sense == EepranMatrix.LESS_EQUAL:
+                    constraint = expression <= rhs
+                elif sense == EepranMatrix.GREATER_EQUAL:
+                    constraint = expression >= rhs
+                else:
+                    constraint = expression == rhs
+                self.constraints[position] = self.model.add_constraint(constraint, row_name)
+                self.rows[position] = None
+
+
+    def solve(self) -> float:
+        self.model.minimize(self.objective)
+        solution = self.model.solve()
+        if solution is None:
+            raise RuntimeError('Restricted master LP failed: {}'.format(self.model.solve_details.status))
+        return solution.get_objective_value()
+
+
+    def row_duals(self) -> list:
+        return self.model.dual_values(self.constraints)
+
+
+    def end(self) -> None:
+        self.model.end()
+
+
+class _HighsMaster:
+    """
+    LP of the restricted master in HiGHS, grown row by row and column by column, so
+    every solve starts from the basis of the previous one.
+    """
+
+    def __init__(self):
+        import highspy
+
+        self.highs = highspy.Highs()
+        self.highs.setOptionValue('output_flag', False)
+        self.optimal = highspy.HighsModelStatus.kOptimal
+
+
+    def add_row(self, name: str, sense: str, rhs: float) -> int:
+        """ Add an empty row. :returns: its position. """
+        lower, upper = _row_bounds(sense, rhs)
+        self.highs.addRow(lower, upper, 0, numpy.zeros(0, dtype=numpy.int32), numpy.zeros(0))
+        return self.highs.getNumRow() - 1
+
+
+    def add_column(self, name: str, cost: float, upper: float, entries: list) -> None:
+        """ Add a column with entries, as (row position, coefficient) pairs. """
+        positions = numpy.array([position for position, _ in entries], dtype=numpy.int32)
+        values = numpy.array([value for _, value in entries], dtype=float)
+        self.highs.addCol(cost, 0.0, numpy.inf if upper is None else upper, len(entries), positions, values)
+
+
+    def solve(self) -> float:
+        self.highs.run()
+        status = self.highs.getModelStatus()
+        if status != self.optimal:
+            raise RuntimeError('Restricted master LP failed: {}'.format(self.highs.modelStatusToString(status)))
+        return self.highs.getInfo().objective_function_value
+
+
+    def row_duals(self) -> list:
+        return list(self.highs.getSolution().row_dual)
+
+
+    def end(self) -> None:
+        pass
+
+
+class _RestrictedMaster:
+    """
+    LP relaxation of the EEP-RAN model over the generated x columns, solved by the
+    backend of the model (_CplexMaster or _HighsMaster).
+
+    Rows, and the y and z columns of the ceil rows, are created with the first
+    column touching them: a row without x terms is slack in the full model, so its
+    dual is 0 either way. The single route and centralization rows get an artificial
+    column with a big penalty, so the master is feasible with any subset of columns.
+    """
+
+    def __init__(self, pricer: _ColumnPricer, centralization_cap: int, penalty: float, backend: str):
+        if backend == 'cplex':
+            self.solver = _CplexMaster()
+        elif backend == 'highs':
+            self.solver = _HighsMaster()
+        else:
+            raise ValueError('Unknown solver backend {!r}, expected one of {}'.format(backend, SOLVER_BACKENDS))
+
+        self.pricer = pricer
+        self.tolerance = 1 / pricer.maximum_centralization
+        self.rows = {}          # row -> [row positions] (low and high for psi rows)
+        self.x = {}
+
+        self.__add_row(('centralization', None), 'centralization_constraint',
+                       [('G', centralization_cap)], penalty)
+        for bs_key in pricer.base_station_keys:
+            self.__add_row(('single_route', bs_key), 'single_route_{}'.format(bs_key), [('E', 1.0)], penalty)
+
+
+    def __add_row(self, row: tuple, name: str, constraints: list, penalty: float = None) -> None:
+        positions = []
+        for number, (sense, rhs) in enumerate(constraints):
+            position = self.solver.add_row('{}_{}'.format(name, number), sense, rhs)
+            if penalty is not None:
+                self.solver.add_column('artificial_{}'.format(name), penalty, None, [(position, 1.0)])
+            positions.append(position)
+        self.rows[row] = positions
+
+
+    def __ensure_row(self, row: tuple) -> None:
+        if row in self.rows:
+            return
+        index = self.pricer.index
+        kind, entity = row
+        if kind == 'processing':
+            self.__add_row(row, 'processing_capacity_{}'.format(entity),
+                           [('L', index.hardware_cpu_cores[index.hardware_ids[entity]])])
+        elif kind == 'link':
+            self.__add_row(row, 'qty_ports_link_{}'.format(entity),
+                           [('L', index.link_max_ports[index.link_ids[entity]])])
+        else:
+            if kind == 'psi_1':
+                name = 'ceil_restriction_{}'.format(entity)
+                var_name = 'y_{}'.format(entity)
+                cost = index.hardware_static_power[index.hardware_ids[entity]]
+                entries = []
+            else:
+                name = 'ceil_restriction_{}_{}'.format(entity.node_key, entity.function_key)
+                var_name = 'z_{}_{}'.format(entity.node_key, entity.function_key)
+                cost = 0.0
+                entries = [(self.rows[('centralization', None)][0], -1.0)]
+            self.__add_row(row, name, [('G', 0.0), ('L', 1.0 - self.tolerance)])
+            entries += [(position, 1.0) for position in self.rows[row]]
+            self.solver.add_column(var_name, cost, None, entries)
+
+
+    def add_column(self, key: DecisionVariableKey, cost: float, terms: list) -> None:
+        entries = {}
+        for row, value in terms:
+            self.__ensure_row(row)
+            for position in self.rows[row]:
+                entries[position] = entries.get(position, 0.0) + value
+        self.solver.add_column('x_path{}_drc{}_{}'.format(*key), cost, 1.0, list(entries.items()))
+        self.x[key] = cost
+
+
+    def solve(self) -> float:
+        return self.solver.solve()
+
+
+    def row_duals(self) -> dict:
+        """ :returns: row -> dual value (summed over the low and high rows of a psi row). """
+        duals = self.solver.row_duals()
+        return {row: sum(duals[position] for position in positions) for row, positions in self.rows.items()}
+
+
+    def end(self) -> None:
+        self.solver.end()
+
+
+def build_eepran_model_colgen(topo: Topology, centralization_cap: int = 0,
+                              max_iterations: int = 100, columns_per_base_station: int = 1,
+                              penalty: float = 1e6, presolve: bool = False,
+                              lp_path: str = None, backend: str = 'cplex',
+                              origin_node=None, shortest_paths: bool = False) -> {Model, AbstractConstraint}:
+    """
+    Build a restricted EEP-RAN model by column generation.
+
+    Every base station starts with the lowest delay route of each DRC. The LP
+    relaxation of the restricted model is solved and the duals of its rows (single
+    route, link capacity, processing capacity, ceil and centralization rows) price
+    the route/DRC candidates of every base station, generated on demand from the
+    routes (the full matrix is never assembled); the most negative reduced cost
+    columns of each base station are added until none is left. The returned model is
+    the restricted MIP over the generated columns, built from their EepranMatrix and
+    ready to be solved.
+
+    Parameters
+    ----------
+
+    topo : Topology
+        Topology with routes already generated or imported, or none with origin_node.
+    centralization_cap : int
+        Right-hand side of the centralization constraint.
+    max_iterations : int
+        Maximum number of pricing rounds.
+    columns_per_base_station : int
+        Columns with negative reduced cost added per base station and round.
+    penalty : float
+        Cost of the artificial columns that keep the restricted LP feasible.
+    presolve : bool
+        Remove the dominated generated columns from the restricted MIP (core.presolve).
+    lp_path : str
+        Where to export the restricted MIP as LP. None skips the export.
+    backend : str
+        Solver backend of the master LP and of the restricted MIP, see
+        core.model.create_model_from_matrix().
+    origin_node :
+        Stream the routes from origin_node with Topology.iter_routes() in every pricing
+        round instead of pricing the routes of topo, so they are never all held. The
+        routes of the generated columns then become the routes of topo.
+    shortest_paths : bool
+        See Topology.iter_routes() (only with origin_node).
+
+    The model gets a column_generation dict with the number of iterations, generated
+    columns, priced candidates and the LP bound (a lower bound of the full model when
+    pricing converged).
+
+    """
+    logging.info('Model Creation Time (column generation):')
+    tolerance = 1e-6
+
+    colgen_start = time.time()
+    pricer = _ColumnPricer(topo, origin_node, shortest_paths)
+    master = _RestrictedMaster(pricer, centralization_cap, penalty, backend)
+    routes = {}
+
+    # ----- Seed: lowest delay route of every (BS, DRC) pair -----
+    best = {}
+    for key, route, cost, terms in pricer.iter_columns():
+        delay = route.delay_fronthaul + route.delay_midhaul + route.delay_backhaul
+        seed = (key.bs_key, key.drc_id)
+        if seed not in best or delay < best[seed][0]:
+            best[seed] = (delay, key, route, cost, terms)
+    for _, key, route, cost, terms in best.values():
+        master.add_column(key, cost, terms)
+        routes[route.identifier] = route
+
+    iterations = 0
+    converged = False
+    lp_bound = None
+    num_candidates = 0
+    while iterations < max_iterations:
+        iterations += 1
+        lp_bound = master.solve()
+        duals = master.row_duals()
+
+        # best columns of each base station, so one round does not flood a single BS
+        priced = {}
+        num_candidates = 0
+        for key, route, cost, terms in pricer.iter_columns():
+            num_candidates += 1
+            if key in master.x:
+                continue
+            reduced_cost = cost - sum(duals.get(row, 0.0) * value for row, value in terms)
+            if reduced_cost < -tolerance:
+                columns = priced.setdefault(key.bs_key, [])
+                columns.append((reduced_cost, num_candidates, key, route, cost, terms))
+                if len(columns) > columns_per_base_station:
+                    columns.sort()
+                    columns.pop()
+        new_columns = [column for bs_key in pricer.base_station_keys for column in sorted(priced.get(bs_key, []))]
+        if len(new_columns) == 0:
+            converged = True
+            break
+
+        for _, _, key, route, cost, terms in new_columns:
+            master.add_column(key, cost, terms)
+            routes[route.identifier] = route
+
+    colgen_end = time.time()
+    logging.info('    Column Generation: {}s, {} iterations, {} of {} columns, LP bound {}'.format(
+        colgen_end - colgen_start, iterations, len(master.x), num_candidates, lp_bound))
+    master.end()
+
+    # ----- Restricted MIP -----
+    routes = sorted(routes.values(), key=lambda route: route.identifier)
+    if origin_node is not None:
+        topo.set_routes(routes)
+    generated = set(master.x)
+    registry = VariableRegistry(topo, pricer.splits, pricer.vnf_cpu_usage.keys(), routes=routes)
+    registry.remove_keys({key for key in registry.keys if key not in generated})
+    matrix = EepranMatrix(topo, centralization_cap, presolve, registry)
+    model, centralization_constraint = create_model_from_matrix(matrix, backend, lp_path=lp_path)
+    model.build_timings['Column Generation'] = colgen_end - colgen_start
+    model.column_generation = {'iterations': iterations, 'converged': converged,
+                               'columns': len(master.x), 'candidates': num_candidates,
+                               'lp_bound': lp_bound}
+    return model, centralization_constraint
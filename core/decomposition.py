@@ -0,0 +1,439 @@
+from __future__ import annotations
+from core.model import *
+from core.heuristic import *
+import concurrent.futures
+import os
+import time
+
+
+def get_first_level_subtree(route: Route) -> str:
+    """ :returns: The node below the route source (the core) the route goes through. """
+    for segment in (route.backhaul, route.midhaul, route.fronthaul):
+        if len(segment) > 0:
+            return segment[0][1]
+    return None
+
+
+class _Subproblem:
+    """
+    A part of the decomposed model: the x columns of its base stations, the y/z columns
+    only its base stations use and a copy of every y/z column shared with other parts.
+
+    columns : list
+        Original matrix column of each subproblem column, or -1 for copies.
+    copies : dict
+        Shared matrix column -> subproblem column of its copy.
+
+    Once assembled it has the EepranMatrix attributes core.model.create_model_from_matrix()
+    reads: the x columns come first (binary), every other column is integer and kept
+    as y, there is no centralization row, and objective is set before each solve.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.columns = []
+        self.copies = {}
+        self.column_names = []
+        self.column_types = []
+        self.row_names = []
+        self.row_senses = []
+        self.rhs = []
+        self.rows = None
+        self.__row_idx = []
+        self.__col_idx = []
+        self.__values = []
+
+
+    def add_column(self, matrix: EepranMatrix, column: int, copy: bool = False) -> int:
+        self.columns.append(-1 if copy else column)
+        name = matrix.column_names[column]
+        self.column_names.append('{}_{}'.format(name, self.name) if copy else name)
+        self.column_types.append(matrix.column_types[column])
+        if copy:
+            self.copies[column] = len(self.columns) - 1
+        return len(self.columns) - 1
+
+
+    def add_row(self, name: str, sense: str, rhs: float, columns: list, values: list) -> None:
+        row = len(self.row_names)
+        self.row_names.append(name)
+        self.row_senses.append(sense)
+        self.rhs.append(rhs)
+        self.__row_idx.extend([row] * len(columns))
+        self.__col_idx.extend(columns)
+        self.__values.extend(values)
+
+
+    def assemble(self, matrix: EepranMatrix) -> None:
+        self.columns = numpy.asarray(self.columns, dtype=numpy.int64)
+        self.num_columns = len(self.columns)
+        self.num_x = int(numpy.count_nonzero((self.columns >= 0) & (self.columns < matrix.num_x)))
+        self.num_y = self.num_columns - self.num_x
+        self.num_z = 0
+        self.x_keys = [matrix.x_keys[column] for column in self.columns[:self.num_x].tolist()]
+        self.y_keys = self.column_names[self.num_x:]
+        self.z_keys = []
+        self.objective = numpy.zeros(self.num_columns)
+        self.centralization_row = None
+        self.build_time = None
+        self.rhs = numpy.asarray(self.rhs, dtype=float)
+        self.rows = scipy.sparse.csr_matrix(
+            (numpy.asarray(self.__values, dtype=float),
+             (numpy.asarray(self.__row_idx, dtype=numpy.int64), numpy.asarray(self.__col_idx, dtype=numpy.int64))),
+            shape=(len(self.row_names), len(self.columns))
+        )
+        self.__row_idx = []
+        self.__col_idx = []
+        self.__values = []
+
+
+class _Decomposition:
+    """
+    First-level subtree decomposition of an EepranMatrix.
+
+    Every base station belongs to the subtree of its lowest delay route, with all its
+    route/DRC columns. The relaxed (coupling) constraints are:
+
+    - the rows with x columns of more than one part (centralization, and the link and
+      processing rows of resources reached from several subtrees);
+    - copy <= shared column, for every y/z column used by more than one part. Each part
+      keeps its own copy with the ceil rows restricted to its x columns, and the shared
+      column itself is left to the Lagrangian master (binary, no rows).
+    """
+
+    def __init__(self, matrix: EepranMatrix, topo: Topology):
+        self.matrix = matrix
+        rows = matrix.rows
+        num_x = matrix.num_x
+
+        # ----- Base stations and x columns -----
+        home = {}
+        for key in matrix.x_keys:
+            route = topo.get_route(key.route_id)
+            delay = route.delay_fronthaul + route.delay_midhaul + route.delay_backhaul
+            if key.bs_key not in home or delay < home[key.bs_key][0]:
+                home[key.bs_key] = (delay, get_first_level_subtree(route))
+        self.names = sorted({subtree for _, subtree in home.values()})
+        part_index = {name: idx for idx, name in enumerate(self.names)}
+
+        column_part = numpy.full(matrix.num_columns, -1, dtype=numpy.int64)
+        for column, key in enumerate(matrix.x_keys):
+            column_part[column] = part_index[home[key.bs_key][1]]
+
+        # ----- y/z columns: local to one part, shared or unused -----
+        row_parts = []
+        column_parts = {}
+        for row in range(len(matrix.row_names)):
+            columns = rows.indices[rows.indptr[row]:rows.indptr[row+1]]
+            parts = set(column_part[columns[columns < num_x]].tolist())
+            row_parts.append(parts)
+            if row == matrix.centralization_row:
+                continue
+            for column in columns[columns >= num_x].tolist():
+                column_parts.setdefault(column, set()).update(parts)
+
+        self.shared = sorted(column for column, parts in column_parts.items() if len(parts) > 1)
+        shared = set(self.shared)
+        for column, parts in column_parts.items():
+            if len(parts) == 1:
+                column_part[column] = next(iter(parts))
+        self.column_part = column_part
+
+        # the low ceil row of every y/z column gives its value from the x columns
+        self.ceil_rows = {}
+        for row, sense in enumerate(matrix.row_senses):
+            if sense != EepranMatrix.GREATER_EQUAL or row == matrix.centralization_row:
+                continue
+            columns = rows.indices[rows.indptr[row]:rows.indptr[row+1]]
+            for column in columns[columns >= num_x].tolist():
+                self.ceil_rows[column] = row
+
+        # ----- Subproblems -----
+        self.subproblems = [_Subproblem(name) for name in self.names]
+        local_index = {}
+        for column in numpy.flatnonzero(column_part >= 0).tolist():
+            local_index[column] = self.subproblems[column_part[column]].add_column(matrix, column)
+        self.copies = []                            # (shared column, part)
+        for column in self.shared:
+            for part in sorted(column_parts[column]):
+                self.subproblems[part].add_column(matrix, column, copy=True)
+                self.copies.append((column, part))
+
+        coupling_rows = []
+        for row, parts in enumerate(row_parts):
+            columns = rows.indices[rows.indptr[row]:rows.indptr[row+1]].tolist()
+            values = rows.data[rows.indptr[row]:rows.indptr[row+1]].tolist()
+            name, sense, rhs = matrix.row_names[row], matrix.row_senses[row], matrix.rhs[row]
+
+            if row == matrix.centralization_row:
+                coupling_rows.append(row)
+            elif any(column in shared for column in columns):
+                for part in parts:
+                    subproblem = self.subproblems[part]
+                    terms = [(subproblem.copies[column] if column in shared else local_index[column], value)
+                             for column, value in zip(columns, values)
+                             if column in shared or column_part[column] == part]
+                    subproblem.add_row('{}_{}'.format(name, subproblem.name), sense, rhs,
+                                       [column for column, _ in terms], [value for _, value in terms])
+            elif len(parts) == 1:
+                part = next(iter(parts))
+                self.subproblems[part].add_row(name, sense, rhs, [local_index[column] for column in columns],
+                                               values)
+            elif len(parts) > 1:
+                coupling_rows.append(row)
+            elif sense == EepranMatrix.EQUAL and rhs != 0:
+                raise ValueError('{} has no candidate column'.format(name))
+
+        for subproblem in self.subproblems:
+            subproblem.assemble(matrix)
+
+        self.coupling_rows = numpy.asarray(coupling_rows, dtype=numpy.int64)
+        self.coupling = rows[self.coupling_rows]
+        self.coupling_rhs = matrix.rhs[self.coupling_rows]
+        # signs turn every coupling row into sign * (a v - b) <= 0
+        self.signs = numpy.asarray([-1.0 if matrix.row_senses[row] == EepranMatrix.GREATER_EQUAL else 1.0
+                                    for row in coupling_rows])
+        self.free = numpy.asarray([matrix.row_senses[row] == EepranMatrix.EQUAL for row in coupling_rows],
+                                  dtype=bool)
+
+
+    def complete(self, values: numpy.ndarray) -> numpy.ndarray:
+        """ Set every y/z column to the smallest value its ceil rows allow for the x columns. """
+        matrix = self.matrix
+        values = values.copy()
+        values[matrix.num_x:] = 0
+        x_part = matrix.rows[:, :matrix.num_x] @ values[:matrix.num_x]
+        for column, row in self.ceil_rows.items():
+            values[column] = max(0.0, numpy.ceil(-x_part[row] - 1e-9))
+        return values
+
+
+    def is_feasible(self, values: numpy.ndarray, tolerance: float = 1e-6) -> bool:
+        matrix = self.matrix
+        activity = matrix.rows @ values
+        for row, sense in enumerate(matrix.row_senses):
+            if sense == EepranMatrix.LESS_EQUAL and activity[row] > matrix.rhs[row] + tolerance:
+                return False
+            if sense == EepranMatrix.GREATER_EQUAL and activity[row] < matrix.rhs[row] - tolerance:
+                return False
+            if sense == EepranMatrix.EQUAL and abs(activity[row] - matrix.rhs[row]) > tolerance:
+                return False
+        return True
+
+
+# ----- Worker state, subproblem models built on first use -----
+_worker_subproblems = None
+_worker_models = {}
+_worker_threads = 1
+_worker_time_limit = None
+_worker_backend = 'cplex'
+
+
+def _init_worker(subproblems: list, threads: int, time_limit: float, backend: str) -> None:
+    global _worker_subproblems, _worker_threads, _worker_time_limit, _worker_backend
+
+    logging.getLogger().setLevel(logging.WARNING)
+    _worker_subproblems = subproblems
+    _worker_threads = threads
+    _worker_time_limit = time_limit
+    _worker_backend = backend
+
+
+def _build_subproblem_model(subproblem: _Subproblem) -> Model:
+    model, _ = create_model_from_matrix(subproblem, _worker_backend)
+    model.name = 'EEP-Ran Subproblem {}'.format(subproblem.name)
+    model.parameters.threads = _worker_threads
+    if _worker_time_limit is not None:
+        model.parameters.timelimit = _worker_time_limit
+    return model
+
+
+def _solve_subproblem(part: int, objective: numpy.ndarray) -> dict:
+    subproblem = _worker_subproblems[part]
+    if part not in _worker_models:
+        _worker_models[part] = _build_subproblem_model(subproblem)
+    model = _worker_models[part]
+
+    subproblem.objective = objective
+    update_model_objective(model)
+    solution = model.solve()
+    if solution is None:
+        return {'part': part, 'status': str(model.solve_details.status), 'values': None}
+
+    return {'part': part, 'status': str(model.solve_details.status),
+            'bound': min(model.solve_details.best_bound, solution.get_objective_value()),
+            'values': numpy.asarray(solution.get_values(model.columns))}
+
+
+def solve_decomposition(topo: Topology, centralization_cap: int = 0, workers: int = None,
+                        threads_per_worker: int = 1, max_iterations: int = 50,
+                        gap_tolerance: float = 1e-4, time_limit: float = None,
+                        backend: str = 'cplex') -> dict:
+    """
+    Solve the EEP-RAN problem by first-level subtree decomposition and Lagrangian
+    relaxation of what the subtrees share.
+
+    Base stations are grouped by the first-level subtree (the node below the core) of
+    their lowest delay route. Base stations reaching hardware or links of other subtrees
+    are coordinated through Lagrangian multipliers on the shared rows, on the
+    centralization constraint and on the copies of the shared ceil variables (see
+    _Decomposition). The subproblems are solved in parallel processes and the
+    multipliers follow subgradient steps.
+
+    The Lagrangian dual, with the subproblem best bounds, is a proven lower bound.
+    Upper bounds come from the heuristic of core.heuristic and from the subproblem
+    assignments that satisfy every row once the ceil variables are recomputed.
+
+    Parameters
+    ----------
+
+    topo : Topology
+        Topology with routes already generated or imported.
+    centralization_cap : int
+        Right-hand side of the centralization constraint.
+    workers : int
+        Number of worker processes. Default: cpu count / threads_per_worker.
+    threads_per_worker : int
+        Solver threads of each worker.
+    max_iterations : int
+        Maximum number of subgradient iterations.
+    gap_tolerance : float
+        Stop when (upper bound - lower bound) / upper bound is below this value.
+    time_limit : float
+        Solver time limit per subproblem solve [s].
+    backend : str
+        Solver backend of the subproblems, see core.model.create_model_from_matrix().
+
+    Returns
+    -------
+
+    A dict with objective (best feasible, or None), bound, gap, centralization,
+    iterations, subproblems and assignment (bs_key -> (route_id, drc_id)).
+
+    """
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+    decomposition_start = time.time()
+    matrix = build_eepran_matrix(topo, centralization_cap)
+    decomposition = _Decomposition(matrix, topo)
+    subproblems = decomposition.subproblems
+    coupling, signs, free = decomposition.coupling, decomposition.signs, decomposition.free
+    shared = numpy.asarray(decomposition.shared, dtype=numpy.int64)
+    copy_columns = numpy.asarray([column for column, _ in decomposition.copies], dtype=numpy.int64)
+    logging.info('Decomposition: {} subproblems, {} coupling rows, {} shared columns'.format(
+        len(subproblems), len(decomposition.coupling_rows), len(shared)))
+
+    upper_bound = numpy.inf
+    best_values = None
+    heuristic = solve_heuristic(topo, centralization_cap)
+    if heuristic['feasible']:
+        values = numpy.zeros(matrix.num_columns)
+        values[[matrix.x_index[key] for key in heuristic['keys']]] = 1
+        values = decomposition.complete(values)
+        if decomposition.is_feasible(values):
+            upper_bound = float(matrix.objective @ values)
+            best_values = values
+
+    row_multipliers = numpy.zeros(len(decomposition.coupling_rows))
+    copy_multipliers = numpy.zeros(len(decomposition.copies))
+    lower_bound = -numpy.inf
+    step_scale = 2.0
+    no_improvement = 0
+    iterations = 0
+    gap = numpy.inf
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                initargs=(subproblems, threads_per_worker,
+                                                          time_limit, backend)) as executor:
+        while iterations < max_iterations:
+            iterations += 1
+
+            # ----- Lagrangian subproblems -----
+            objective = matrix.objective + coupling.T @ (signs * row_multipliers)
+            copy_costs = {}
+            for (column, part), multiplier in zip(decomposition.copies, copy_multipliers.tolist()):
+                copy_costs[(column, part)] = multiplier
+            futures = []
+            for part, subproblem in enumerate(subproblems):
+                part_objective = numpy.empty(len(subproblem.columns))
+                originals = subproblem.columns >= 0
+                part_objective[originals] = objective[subproblem.columns[originals]]
+                for column, copy in subproblem.copies.items():
+                    part_objective[copy] = copy_costs[(column, part)]
+                futures.append(executor.submit(_solve_subproblem, part, part_objective))
+            results = [future.result() for future in futures]
+
+            failed = [subproblems[result['part']].name for result in results if result['values'] is None]
+            if len(failed) > 0:
+                raise RuntimeError('Subproblems without solution: {}'.format(failed))
+
+            # the shared columns have no row left: 1 when their reduced cost is negative
+            shared_costs = objective[shared] - numpy.bincount(
+                numpy.searchsorted(shared, copy_columns), weights=copy_multipliers, minlength=len(shared))
+            values = numpy.zeros(matrix.num_columns)
+            values[shared] = shared_costs < 0
+            copy_values = numpy.zeros(len(decomposition.copies))
+            copy_position = {copy: idx for idx, copy in enumerate(decomposition.copies)}
+            for result in results:
+                subproblem = subproblems[result['part']]
+                originals = subproblem.columns >= 0
+                values[subproblem.columns[originals]] = result['values'][originals]
+                for column, copy in subproblem.copies.items():
+                    copy_values[copy_position[(column, result['part'])]] = result['values'][copy]
+
+            dual_value = (sum(result['bound'] for result in results) +
+                          float(numpy.minimum(shared_costs, 0).sum()) -
+                          float((signs * row_multipliers) @ decomposition.coupling_rhs))
+            if dual_value > lower_bound + 1e-9:
+                lower_bound = dual_value
+                no_improvement = 0
+            else:
+                no_improvement += 1
+
+            # ----- Primal recovery -----
+            candidate = decomposition.complete(values)
+            if decomposition.is_feasible(candidate):
+                cost = float(matrix.objective @ candidate)
+                if cost < upper_bound:
+                    upper_bound = cost
+                    best_values = candidate
+
+            gap = (upper_bound - lower_bound) / abs(upper_bound) if numpy.isfinite(upper_bound) else numpy.inf
+            logging.info('    Iteration {}: bound {}, best {}, gap {}'.format(iterations, lower_bound,
+                                                                           upper_bound, gap))
+            if gap <= gap_tolerance:
+                break
+
+            # ----- Subgradient step -----
+            row_subgradient = signs * (coupling @ values - decomposition.coupling_rhs)
+            row_subgradient[(row_multipliers <= 0) & (row_subgradient < 0) & ~free] = 0
+            copy_subgradient = copy_values - values[copy_columns]
+            copy_subgradient[(copy_multipliers <= 0) & (copy_subgradient < 0)] = 0
+            norm = float(row_subgradient @ row_subgradient + copy_subgradient @ copy_subgradient)
+            if norm == 0:
+                break
+
+            if no_improvement >= 3:
+                step_scale /= 2
+                no_improvement = 0
+            target = upper_bound if numpy.isfinite(upper_bound) else dual_value + max(1.0, 0.05 * abs(dual_value))
+            step = step_scale * max(target - dual_value, 1e-6) / norm
+            row_multipliers = row_multipliers + step * row_subgradient
+            row_multipliers[~free] = numpy.maximum(row_multipliers[~free], 0)
+            copy_multipliers = numpy.maximum(copy_multipliers + step * copy_subgradient, 0)
+
+    result = {'objective': None, 'bound': lower_bound, 'gap': None, 'centralization': None,
+              'iterations': iterations, 'subproblems': len(subproblems), 'assignment': {}}
+    if best_values is not None:
+        result['objective'] = upper_bound
+        result['gap'] = (upper_bound - lower_bound) / abs(upper_bound)
+        result['centralization'] = float((matrix.rows @ best_values)[matrix.centralization_row])
+        for column, key in enumerate(matrix.x_keys):
+            if best_values[column] > 0.5:
+                result['assignment'][key.bs_key] = (key.route_id, key.drc_id)
+
+    decomposition_end = time.time()
+    logging.info('Decomposition: {}s, objective {}, bound {}, {} iterations'.format(
+        decomposition_end - decomposition_start, result['objective'], lower_bound, iterations))
+    return result
@@ -77,3 +77,15 @@ def get_drc_list() -> list:
 def get_vnf_dict() -> dict:
     return {'f0': 1.176, 'f1': 1.176, 'f2': 0.833, 'f3': 0.343, 'f4': 0.343,
             'f5': 0.0245, 'f6': 0.0245, 'f7': 0.49, 'f8': 0.49}
+
+
+def get_delay_budgets(splits: list) -> dict:
+    """
+    :returns: Number of needed nodes -> sorted set of the (delay_bh, delay_mh, delay_fh)
+              budgets of the DRCs of splits. A route with that many nodes can only be
+              assigned a DRC if its crosshaul delays fit one of the budgets.
+    """
+    budgets = {}
+    for drc in splits:
+        budgets.setdefault(drc.num_needed_nodes(), set()).add((drc.delay_bh, drc.delay_mh, drc.delay_fh))
+    return {num_nodes: sorted(values) for num_nodes, values in budgets.items()}
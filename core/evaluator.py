@@ -0,0 +1,194 @@
+from core.matrix import *
+
+
+class SolutionEvaluator:
+    """
+    Objective, capacities and centralization of assignments (one route/DRC key per
+    base station) computed with NumPy, without building or solving a model.
+
+    Every term of the objective of core.model.build_eepran_model() is kept in a
+    table over the x candidates of an EepranMatrix, read from its rows at the loads
+    it has when the evaluator is built:
+
+    - base station power with bs_relief, hardware dynamic power and link port power,
+      one value per candidate;
+    - VNFs hosted per hardware and per (node, VNF) pair, whose ceils are y (the
+      hardware paying its static power) and z (as in the centralization row);
+    - ports per link and CPU cores per hardware, checked against max_ports and
+      num_cpu_cores.
+
+    An assignment is an int array with the x column (of the matrix) of every base
+    station, in the order of Topology.get_base_station_keys(); -1 leaves a base
+    station unassigned. evaluate() scores a batch of assignments at once.
+    """
+
+    def __init__(self, matrix: EepranMatrix):
+        self.matrix = matrix
+        topo = matrix.topo
+        index = topo.get_index()
+        num_x = matrix.num_x
+        rows = matrix.rows.tocsr()
+        self.base_station_keys = list(topo.get_base_station_keys())
+        self.num_base_stations = len(self.base_station_keys)
+
+        # ----- Row Blocks -----
+        hardware_ceil_rows = matrix.hardware_ceil_rows
+        link_rows = matrix.link_rows
+        pair_ceil_rows = matrix.pair_ceil_rows
+        single_route_rows = matrix.single_route_rows
+        processing_rows = matrix.processing_rows
+
+        # ids (see core.index.TopologyIndex) of the columns of the tables below
+        self.hardware_ids = numpy.array([index.hardware_ids[hw_key] for hw_key in matrix.y_keys],
+                                        dtype=numpy.int64)
+        self.link_ids = numpy.array([index.link_ids[link_key] for link_key in matrix.link_keys],
+                                    dtype=numpy.int64)
+        self.cpu_hardware_ids = numpy.array([index.hardware_ids[hw_key] for hw_key in matrix.processing_keys],
+                                            dtype=numpy.int64)
+
+        # ----- Candidate Tables [x, resource] -----
+        # a last, empty candidate stands for an unassigned base station
+        def table(block: numpy.ndarray, scale: float = 1.0) -> scipy.sparse.csr_matrix:
+            candidates = (rows[block, :num_x].T * scale).tocsr()
+            candidates.eliminate_zeros()
+            return scipy.sparse.vstack([candidates, scipy.sparse.csr_matrix((1, len(block)))]).tocsr()
+
+        self.maximum_centralization = matrix.maximum_centralization
+        self.hosted_functions = _integer_table(table(hardware_ceil_rows, -self.maximum_centralization))
+        self.hosted_pairs = _integer_table(table(pair_ceil_rows, -self.maximum_centralization))
+        self.link_ports = table(link_rows)
+        self.cpu_usage = table(processing_rows)
+
+        positions = {bs_key: position for position, bs_key in enumerate(self.base_station_keys)}
+        row_base_station = numpy.array([positions[bs_key] for bs_key in matrix.single_route_keys],
+                                       dtype=numpy.int64)
+        single_route = rows[single_route_rows, :num_x].tocoo()
+        self.candidate_base_station = numpy.full(num_x + 1, -1, dtype=numpy.int64)
+        self.candidate_base_station[single_route.col] = row_base_station[single_route.row]
+
+        # ----- Resource Vectors -----
+        self.hardware_static_power = matrix.objective[matrix.num_x:matrix.num_x+matrix.num_y]
+        self.max_ports = matrix.rhs[link_rows]
+        self.cpu_cores = matrix.rhs[processing_rows]
+
+        # ----- Candidate Power -----
+        relief = numpy.array([1.0 - matrix.drc_dict[key.drc_id].bs_relief for key in matrix.x_keys])
+        base_station = numpy.array([index.base_station_ids[key.bs_key] for key in matrix.x_keys],
+                                   dtype=numpy.int64).reshape(-1)
+        self.base_station_power = numpy.append(relief * (index.base_station_static_power[base_station] +
+                                                         matrix.loads[:num_x] *
+                                                         index.base_station_load_power[base_station]), 0.0)
+        self.dynamic_power = self.cpu_usage @ index.hardware_dynamic_power_per_core[self.cpu_hardware_ids]
+        self.link_power = self.link_ports @ index.link_port_power[self.link_ids]
+
+
+    def assignment_from_keys(self, keys) -> numpy.ndarray:
+        """
+        :returns: The assignment of keys (DecisionVariableKeys, e.g. the keys of
+        core.heuristic.solve_heuristic()), -1 for the base stations without one.
+        """
+        positions = {bs_key: position for position, bs_key in enumerate(self.base_station_keys)}
+        assignment = numpy.full(self.num_base_stations, -1, dtype=numpy.int64)
+        for key in keys:
+            assignment[positions[key.bs_key]] = self.matrix.x_index[key]
+        return assignment
+
+
+    def evaluate(self, assignments: numpy.ndarray, tolerance: float = 1e-6) -> dict:
+        """
+        Score assignments.
+
+        Parameters
+        ----------
+
+        assignments : numpy.ndarray
+            int [base stations] or [assignments, base stations], see SolutionEvaluator.
+        tolerance : float
+            Slack of the capacity checks.
+
+        Returns
+        -------
+
+        A dict of arrays with one value per assignment: objective [w] and its terms
+        base_station_power, dynamic_power, static_power and link_power, centralization,
+        complete (every base station has one of its own candidates), max_link_utilisation,
+        max_cpu_utilisation and feasible (complete, within every capacity and at least
+        the centralization cap of the matrix). link_utilisation [assignments, link rows]
+        (ports over max_ports) and cpu_utilisation [assignments, processing rows]
+        (cores over num_cpu_cores) are sparse.
+
+        """
+        assignments = numpy.atleast_2d(numpy.asarray(assignments, dtype=numpy.int64))
+        num_assignments, num_base_stations = assignments.shape
+        if num_base_stations != self.num_base_stations:
+            raise ValueError('An assignment has {} base stations, not {}'.format(num_base_stations,
+                                                                                self.num_base_stations))
+        num_x = self.matrix.num_x
+        candidates = numpy.where(assignments < 0, num_x, assignments)
+        selection = scipy.sparse.csr_matrix(
+            (numpy.ones(candidates.size), candidates.ravel(),
+             numpy.arange(num_assignments + 1) * num_base_stations),
+            shape=(num_assignments, num_x + 1))
+
+        # ----- Power -----
+        base_station_power = self.base_station_power[candidates].sum(axis=1)
+        dynamic_power = self.dynamic_power[candidates].sum(axis=1)
+        link_power = self.link_power[candidates].sum(axis=1)
+        powered = _ceil_division((selection @ self.hosted_functions).tocsr(), self.maximum_centralization)
+        static_power = powered @ self.hardware_static_power
+
+        # ----- Centralization -----
+        pairs = (selection @ self.hosted_pairs).tocsr()
+        centralization = (numpy.asarray(pairs.sum(axis=1)).reshape(-1) -
+                          numpy.asarray(_ceil_division(pairs, self.maximum_centralization).sum(axis=1)).reshape(-1))
+
+        # ----- Capacities -----
+        link_utilisation = _utilisation((selection @ self.link_ports).tocsr(), self.max_ports)
+        cpu_utilisation = _utilisation((selection @ self.cpu_usage).tocsr(), self.cpu_cores)
+        max_link_utilisation = _row_max(link_utilisation)
+        max_cpu_utilisation = _row_max(cpu_utilisation)
+
+        complete = numpy.all(self.candidate_base_station[candidates] == numpy.arange(num_base_stations), axis=1)
+        feasible = (complete & (max_link_utilisation <= 1.0 + tolerance) & (max_cpu_utilisation <= 1.0 + tolerance)
+                    & (centralization >= self.matrix.centralization_cap))
+
+        return {
+            'objective': base_station_power + dynamic_power + static_power + link_power,
+            'base_station_power': base_station_power,
+            'dynamic_power': dynamic_power,
+            'static_power': static_power,
+            'link_power': link_power,
+            'centralization': centralization,
+            'complete': complete,
+            'max_link_utilisation': max_link_utilisation,
+            'max_cpu_utilisation': max_cpu_utilisation,
+            'feasible': feasible,
+            'link_utilisation': link_utilisation,
+            'cpu_utilisation': cpu_utilisation,
+        }
+
+
+def _integer_table(table: scipy.sparse.csr_matrix) -> scipy.sparse.csr_matrix:
+    """ Round a table of counts read from float coefficients. """
+    table.data = numpy.rint(table.data)
+    return table.astype(numpy.int64)
+
+
+def _ceil_division(counts: scipy.sparse.csr_matrix, divisor: int) -> scipy.sparse.csr_matrix:
+    result = counts.copy()
+    result.data = -(-result.data // divisor)
+    return result
+
+
+def _utilisation(usage: scipy.sparse.csr_matrix, capacity: numpy.ndarray) -> scipy.sparse.csr_matrix:
+    """ usage over capacity, column by column (inf where a used resource has no capacity). """
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        usage = usage.copy()
+        usage.data = usage.data / capacity[usage.indices]
+    return usage
+
+
+def _row_max(values: scipy.sparse.csr_matrix) -> numpy.ndarray:
+    if values.shape[1] == 0:
+        return numpy.zeros(values.shape[0])
+    return numpy.maximum(values.max(axis=1).toarray().reshape(-1), 0.0)
@@ -0,0 +1,187 @@
+from core.model import *
+import concurrent.futures
+import os
+import time
+
+# CPX_STAT_INFEASIBLE, CPX_STAT_INForUNBD, CPXMIP_INFEASIBLE and CPXMIP_INForUNBD
+_CPLEX_INFEASIBLE_STATUSES = (3, 4, 103, 119)
+
+# ----- Worker state, one model per process -----
+_worker_model = None
+_worker_baseline = None
+
+
+def build_failure_index(matrix: EepranMatrix) -> dict:
+    """
+    Index the x columns of matrix by the links and hardware their routes use.
+
+    Links are keyed by the key of their node1 -> node2 direction (see
+    core.index.TopologyIndex.link_keys), hardware by its key.
+
+    :returns: link_key or hw_key -> int array of x columns
+    """
+    topo = matrix.topo
+    index = topo.get_index()
+    route_elements = {}
+    failure_index = {}
+    for column, key in enumerate(matrix.x_keys):
+        elements = route_elements.get(key.route_id)
+        if elements is None:
+            route = topo.get_route(key.route_id)
+            elements = [index.link_keys[index.link_ids[link_key]] for link_key in route.get_all_links()]
+            elements += route.get_hardware_keys()
+            route_elements[key.route_id] = elements
+        for element in elements:
+            failure_index.setdefault(element, []).append(column)
+    return {element: numpy.array(columns, dtype=numpy.int64) for element, columns in failure_index.items()}
+
+
+def _failure_kind(index: TopologyIndex, key: str) -> tuple:
+    """ :returns: ('link' or 'hardware', the key of the element in the failure index) """
+    if key in index.hardware_ids:
+        return 'hardware', key
+    if key in index.link_ids:
+        return 'link', index.link_keys[index.link_ids[key]]
+    raise ValueError('{} is neither a link nor a hardware key'.format(key))
+
+
+def _init_worker(topo: Topology, centralization_cap: int, presolve: bool, baseline: numpy.ndarray,
+                 threads: int, time_limit: float, backend: str) -> None:
+    global _worker_model, _worker_baseline
+
+    logging.getLogger().setLevel(logging.WARNING)
+    matrix = build_eepran_matrix(topo, centralization_cap, presolve)
+    _worker_model, _ = create_model_from_matrix(matrix, backend)
+    _worker_model.parameters.threads = threads
+    if time_limit is not None:
+        _worker_model.parameters.timelimit = time_limit
+    _worker_baseline = baseline
+
+
+def _proved_infeasible(model) -> bool:
+    """ Whether the last solve of model proved it infeasible, read from the status of its backend. """
+    # the model is bounded (y and z are ceils of bounded sums), so infeasible or unbounded is infeasible
+    if isinstance(model, HighsModel):
+        import highspy
+        return model.highs.getModelStatus() in (highspy.HighsModelStatus.kInfeasible,
+                                                highspy.HighsModelStatus.kUnboundedOrInfeasible)
+
+    return model.solve_details.status_code in _CPLEX_INFEASIBLE_STATUSES
+
+
+def _solve_failure(columns: numpy.ndarray) -> dict:
+    """ Solve the worker model with the x columns fixed to 0, then release them. """
+    model = _worker_model
+    variables = [model.columns[column] for column in columns.tolist()]
+    model.change_var_upper_bounds(variables, 0)
+
+    start = _worker_baseline.copy()
+    start[columns] = 0
+    if isinstance(model, HighsModel):
+        model.add_mip_start(HighsSolution(None, start, None))
+    else:
+        matrix = model.matrix
+        add_assignment_mip_start(model, [key for key, value in zip(matrix.x_keys, start[:matrix.num_x].tolist())
+                                         if value > 0.5])
+
+    solution = model.solve()
+    result = {'status': str(model.solve_details.status), 'solve_time': model.solve_details.time,
+              'objective': solution.get_objective_value() if solution is not None else None,
+              'infeasible': solution is None and _proved_infeasible(model)}
+
+    model.clear_mip_starts()
+    model.change_var_upper_bounds(variables, 1)
+    return result
+
+
+def evaluate_failures(topo: Topology, failures: list = None, centralization_cap: int = 0,
+                      presolve: bool = False, workers: int = None, threads_per_worker: int = 1,
+                      time_limit: float = None, backend: str = 'cplex') -> list:
+    """
+    Power and feasibility impact of single (N-1) link or hardware failures.
+
+    The model is solved once without failures (the baseline). Every worker of a
+    process pool builds the model once; a failure only fixes to 0 the x variables
+    whose route crosses the failed link or uses the failed hardware (found through
+    build_failure_index()), solves with the baseline assignment as MIP start, and
+    releases them again. Failures that no candidate route uses keep the baseline
+    and are not solved.
+
+    Parameters
+    ----------
+
+    topo : Topology
+        Topology with routes already generated or imported.
+    failures : list
+        Link keys (either direction) and hardware keys to fail, one at a time.
+        Default: every link and hardware of topo.
+    centralization_cap : int
+        Right-hand side of the centralization constraint.
+    presolve : bool
+        Build the model with presolve, see core.matrix.build_eepran_matrix().
+    workers : int
+        Number of worker processes. Default: cpu count / threads_per_worker.
+    threads_per_worker : int
+        Solver threads of each worker, so workers do not oversubscribe the cores.
+    time_limit : float
+        Solver time limit per failure (and for the baseline) [s].
+    backend : str
+        Solver backend, see core.model.create_model_from_matrix().
+
+    Returns
+    -------
+
+    One dict per failure, in the order of failures: failure, kind ('link' or
+    'hardware'), affected (x variables fixed to 0), status, objective,
+    objective_delta (over the baseline), infeasible (True when the solver proved no
+    assignment survives the failure) and solve_time.
+
+    """
+    index = topo.get_index()
+    if failures is None:
+        failures = index.link_keys + index.hardware_keys
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+    # ----- Baseline -----
+    evaluation_start = time.time()
+    matrix = build_eepran_matrix(topo, centralization_cap, presolve)
+    model, _ = create_model_from_matrix(matrix, backend)
+    model.parameters.threads = threads_per_worker
+    if time_limit is not None:
+        model.parameters.timelimit = time_limit
+    solution = model.solve()
+    if solution is None:
+        raise RuntimeError('The model without failures has no solution ({})'.format(model.solve_details.status))
+    baseline_objective = solution.get_objective_value()
+    baseline = numpy.array(solution.get_values(model.columns), dtype=float)
+    failure_index = build_failure_index(matrix)
+    model.end()
+    logging.info('Failure Baseline: {} [w], {}s'.format(baseline_objective, time.time() - evaluation_start))
+
+    # ----- Failures -----
+    table = []
+    for failure in failures:
+        kind, element = _failure_kind(index, failure)
+        columns = failure_index.get(element, numpy.zeros(0, dtype=numpy.int64))
+        table.append({'failure': failure, 'kind': kind, 'affected': len(columns), 'status': 'unaffected',
+                      'objective': baseline_objective, 'objective_delta': 0.0, 'infeasible': False,
+                      'solve_time': 0.0})
+    pending = [row for row in table if row['affected'] > 0]
+
+    if len(pending) > 0:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(pending)),
+                                                    initializer=_init_worker,
+                                                    initargs=(topo, centralization_cap, presolve, baseline,
+                                                              threads_per_worker, time_limit,
+                                                              backend)) as executor:
+            columns = [failure_index[_failure_kind(index, row['failure'])[1]] for row in pending]
+            for row, result in zip(pending, executor.map(_solve_failure, columns)):
+                row.update(result)
+                row['objective_delta'] = (result['objective'] - baseline_objective
+                                          if result['objective'] is not None else None)
+
+    evaluation_end = time.time()
+    logging.info('Failure Evaluation: {} failures, {} solved, {}s'.format(len(table), len(pending),
+                                                                          evaluation_end - evaluation_start))
+    return table
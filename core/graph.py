@@ -1,49 +1,241 @@
-import collections
+import heapq
+
 
 class Graph:
+    """
+    Directed graph with integer adjacency lists.
+
+    Vertices are indexed in insertion order; the adjacency of each vertex is kept
+    sorted by vertex key, so the paths found do not depend on the order the edges
+    were added.
+    """
+
     def __init__(self):
-        self.vertices = []
-        self.graph = collections.defaultdict(list)
+        self.vertices = []          # index -> vertex key
+        self.vertex_index = {}      # vertex key -> index
+        self.adjacency = []         # index -> [index]
         self.cost = {}
         self.paths = []
-        self.actual_paths_counter = 0
-    
-    @staticmethod
-    def __is_cycle(path: list) -> bool:
-        return len(path) > 4 and 1 in path and 2 in path
+        self.__sorted = True
 
     def get_paths(self) -> list:
         return self.paths
 
-    def __find_all_paths(self, source: int, destination: int, has_been_visited: list, 
-                        actual_path: list, k: int):
-        has_been_visited[source] = True
-        actual_path.append(source)
+    def __add_vertex(self, key) -> int:
+        index = self.vertex_index.get(key)
+        if index is None:
+            index = len(self.vertices)
+            self.vertex_index[key] = index
+            self.vertices.append(key)
+            self.adjacency.append([])
+        return index
 
-        if source == destination:
-            if not self.__is_cycle(actual_path):
-                self.actual_paths_counter += 1
-                if self.actual_paths_counter < k:
-                    self.paths.append(actual_path.copy())
-        else:
-            for node in self.graph[source]:
-                if has_been_visited[node]:
-                    continue
-                self.__find_all_paths(node, destination, has_been_visited, actual_path, k)
-
-        actual_path.pop()
-        has_been_visited[source] = False
-
-    def add_edge(self, source: int, destination: int, delay: float = 0):
-        if source not in self.vertices:
-            self.vertices.append(source)
-        if destination not in self.vertices:
-            self.vertices.append(destination)
-        self.graph[source].append(destination)
+    def add_edge(self, source, destination, delay: float = 0):
+        source_index = self.__add_vertex(source)
+        destination_index = self.__add_vertex(destination)
+        self.adjacency[source_index].append(destination_index)
         self.cost[(source, destination, 'delay')] = delay
+        self.__sorted = False
+
+    def __sort_adjacency(self) -> None:
+        if self.__sorted:
+            return
+        for neighbours in self.adjacency:
+            neighbours.sort(key=lambda index: str(self.vertices[index]))
+        self.__sorted = True
+
+    def __topological_order(self, source: int) -> list:
+        """ :returns: The vertices reachable from source in topological order, or None on a cycle. """
+        reachable = [False] * len(self.vertices)
+        reachable[source] = True
+        stack = [source]
+        while stack:
+            for neighbour in self.adjacency[stack.pop()]:
+                if not reachable[neighbour]:
+                    reachable[neighbour] = True
+                    stack.append(neighbour)
+
+        in_degree = [0] * len(self.vertices)
+        for vertex, neighbours in enumerate(self.adjacency):
+            if reachable[vertex]:
+                for neighbour in neighbours:
+                    in_degree[neighbour] += 1
+
+        order = []
+        ready = [source] if in_degree[source] == 0 else []
+        while ready:
+            vertex = ready.pop()
+            order.append(vertex)
+            for neighbour in self.adjacency[vertex]:
+                in_degree[neighbour] -= 1
+                if in_degree[neighbour] == 0:
+                    ready.append(neighbour)
+
+        if len(order) != sum(reachable):
+            return None
+        return order
+
+    def __first_paths_acyclic(self, source: int, order: list, max_paths: int) -> list:
+        """
+        First max_paths paths from source to every vertex, in depth-first order, in a
+        single pass over the topological order. A path is ranked by the positions of its
+        edges in the (sorted) adjacency, so the first paths of a vertex only extend the
+        first paths of its predecessors.
+
+        :returns: index -> [(rank, path)]
+        """
+        best = [None] * len(self.vertices)
+        best[source] = [((), (source,))]
+        incoming = [[] for _ in self.vertices]
+        for vertex in order:
+            candidates = heapq.nsmallest(max_paths, incoming[vertex]) if vertex != source else best[source]
+            best[vertex] = candidates
+            incoming[vertex] = None
+            for position, neighbour in enumerate(self.adjacency[vertex]):
+                incoming[neighbour].extend((rank + (position,), path + (neighbour,))
+                                           for rank, path in candidates)
+        return best
+
+    def __first_paths_dfs(self, source: int, destination: int, max_paths: int) -> list:
+        """ Iterative depth-first search of the first max_paths simple paths (any graph). """
+        paths = []
+        visited = [False] * len(self.vertices)
+        visited[source] = True
+        path = [source]
+        stack = [iter(self.adjacency[source])]
+        if source == destination:
+            return [tuple(path)]
+
+        while stack and len(paths) < max_paths:
+            neighbour = next(stack[-1], None)
+            if neighbour is None:
+                stack.pop()
+                visited[path.pop()] = False
+            elif not visited[neighbour]:
+                if neighbour == destination:
+                    paths.append(tuple(path) + (neighbour,))
+                else:
+                    visited[neighbour] = True
+                    path.append(neighbour)
+                    stack.append(iter(self.adjacency[neighbour]))
+        return paths
+
+    def find_paths(self, source, destinations: list, max_paths: int = 3) -> dict:
+        """
+        Find the first max_paths paths (in depth-first order over the sorted adjacency)
+        from source to each destination.
+
+        Acyclic graphs are solved in a single traversal for all destinations; graphs
+        with cycles fall back to an iterative depth-first search per destination.
+
+        :returns: destination -> [[vertex key]]
+        """
+        self.__sort_adjacency()
+        source_index = self.vertex_index[source]
+        order = self.__topological_order(source_index)
+        if order is not None:
+            best = self.__first_paths_acyclic(source_index, order, max_paths)
+
+        result = {}
+        for destination in destinations:
+            destination_index = self.vertex_index.get(destination)
+            if destination_index is None:
+                found = []
+            elif order is not None:
+                found = [path for _, path in (best[destination_index] or [])]
+            else:
+                found = self.__first_paths_dfs(source_index, destination_index, max_paths)
+            result[destination] = [[self.vertices[index] for index in path] for path in found]
+        return result
+
+    def __edge_delays(self) -> list:
+        """ :returns: index -> [delay], aligned with the (sorted) adjacency. """
+        vertices = self.vertices
+        return [[self.cost[(vertices[vertex], vertices[neighbour], 'delay')] for neighbour in neighbours]
+                for vertex, neighbours in enumerate(self.adjacency)]
+
+
+    def __shortest_paths_acyclic(self, source: int, order: list, delays: list, max_paths: int,
+                                 max_delay: float) -> list:
+        """
+        The max_paths lowest delay paths from source to every vertex, in a single pass
+        over the topological order: in a DAG the k shortest paths of a vertex only
+        extend the k shortest paths of its predecessors. Ties are broken by the
+        adjacency order (as in __first_paths_acyclic()). Partial paths over max_delay
+        are dropped.
+
+        :returns: index -> [(delay, rank, path)]
+        """
+        best = [None] * len(self.vertices)
+        incoming = [[] for _ in self.vertices]
+        incoming[source] = [(0.0, (), (source,))]
+        for vertex in order:
+            candidates = heapq.nsmallest(max_paths, incoming[vertex])
+            best[vertex] = candidates
+            incoming[vertex] = None
+            for position, neighbour in enumerate(self.adjacency[vertex]):
+                edge_delay = delays[vertex][position]
+                incoming[neighbour].extend((delay + edge_delay, rank + (position,), path + (neighbour,))
+                                           for delay, rank, path in candidates
+                                           if max_delay is None or delay + edge_delay <= max_delay)
+        return best
+
+
+    def __shortest_paths_best_first(self, source: int, destination: int, delays: list, max_paths: int,
+                                    max_delay: float) -> list:
+        """
+        The max_paths lowest delay simple paths from source to destination (any graph),
+        by extending the lowest delay partial path first. Partial paths over max_delay
+        are dropped.
+        """
+        paths = []
+        frontier = [(0.0, (), (source,))]
+        while frontier and len(paths) < max_paths:
+            delay, rank, path = heapq.heappop(frontier)
+            vertex = path[-1]
+            if vertex == destination:
+                paths.append((delay, rank, path))
+                continue
+            for position, neighbour in enumerate(self.adjacency[vertex]):
+                next_delay = delay + delays[vertex][position]
+                if neighbour not in path and (max_delay is None or next_delay <= max_delay):
+                    heapq.heappush(frontier, (next_delay, rank + (position,), path + (neighbour,)))
+        return paths
+
+
+    def find_shortest_paths(self, source, destinations: list, max_paths: int = 3,
+                            max_delay: float = None) -> dict:
+        """
+        Find the max_paths lowest delay paths (k shortest paths by the 'delay' cost of
+        add_edge()) from source to each destination, ignoring paths with more than
+        max_delay delay.
+
+        Acyclic graphs are solved in a single traversal for all destinations; graphs
+        with cycles fall back to a best-first search per destination.
+
+        :returns: destination -> [[vertex key]], from the lowest delay path
+        """
+        self.__sort_adjacency()
+        source_index = self.vertex_index[source]
+        order = self.__topological_order(source_index)
+        delays = self.__edge_delays()
+        if order is not None:
+            best = self.__shortest_paths_acyclic(source_index, order, delays, max_paths, max_delay)
+
+        result = {}
+        for destination in destinations:
+            destination_index = self.vertex_index.get(destination)
+            if destination_index is None:
+                found = []
+            elif order is not None:
+                found = best[destination_index] or []
+            else:
+                found = self.__shortest_paths_best_first(source_index, destination_index, delays,
+                                                         max_paths, max_delay)
+            result[destination] = [[self.vertices[index] for index in path] for _, _, path in found]
+        return result
+
 
-    def find_all_paths(self, source: int, destination: int, k: int = 4):
-        has_been_visited = {key: False for key in self.vertices}
-        path = []
-        self.actual_paths_counter = 0
-        self.__find_all_paths(source, destination, has_been_visited, path, k)
\ No newline at end of file
+    def find_all_paths(self, source, destination, k: int = 4):
+        """ Append to paths the first k-1 paths from source to destination. """
+        self.paths += self.find_paths(source, [destination], k - 1)[destination]
@@ -0,0 +1,316 @@
+from core.presolve import *
+import core.drc as package_drc
+import time
+
+
+class _Assignment:
+    """
+    One (route, DRC) key per base station, with the resources it uses kept up to
+    date so a move is evaluated without recomputing the whole objective.
+    """
+
+    def __init__(self, topo: Topology, profiles: dict, centralization_cap: int, penalty: float):
+        self.profiles = profiles
+        self.centralization_cap = centralization_cap
+        self.penalty = penalty
+        index = topo.get_index()
+        link_max_ports = index.link_max_ports.tolist()
+        self.link_capacity = {link_key: link_max_ports[link_id] for link_key, link_id in index.link_ids.items()}
+        self.cpu_capacity = dict(zip(index.hardware_keys, index.hardware_cpu_cores.tolist()))
+        self.hw_static_power = dict(zip(index.hardware_keys, index.hardware_static_power.tolist()))
+
+        self.keys = {}                  # bs_key -> DecisionVariableKey
+        self.link_usage = {}
+        self.cpu_usage = {}
+        self.host_count = {}            # hw_key -> number of keys hosting VNFs on it
+        self.pair_count = {}            # CeilVariableKey -> number of keys hosting it
+        self.key_cost = 0.0
+        self.hostings = 0
+
+
+    # ----- Objective Terms -----
+
+    def powered_hardware_cost(self) -> float:
+        return sum(self.hw_static_power[hw_key] for hw_key, count in self.host_count.items() if count > 0)
+
+
+    def objective(self) -> float:
+        return self.key_cost + self.powered_hardware_cost()
+
+
+    def centralization(self) -> int:
+        return self.hostings - sum(1 for count in self.pair_count.values() if count > 0)
+
+
+    def fits(self, profile: CandidateProfile, released: CandidateProfile = None) -> bool:
+        """ Check the link and processing capacity of adding profile after removing released. """
+        for link_key, usage in profile.links.items():
+            freed = released.links.get(link_key, 0.0) if released is not None else 0.0
+            if self.link_usage.get(link_key, 0.0) - freed + usage > self.link_capacity[link_key] + 1e-9:
+                return False
+        for hw_key, usage in profile.cpu.items():
+            freed = released.cpu.get(hw_key, 0.0) if released is not None else 0.0
+            if self.cpu_usage.get(hw_key, 0.0) - freed + usage > self.cpu_capacity[hw_key] + 1e-9:
+                return False
+        return True
+
+
+    def delta(self, profile: CandidateProfile, released: CandidateProfile = None) -> tuple:
+        """ :returns: (objective change, centralization change) of replacing released by profile. """
+        if released is None:
+            released = CandidateProfile(None)
+
+        cost = profile.static_cost + profile.load_cost - released.static_cost - released.load_cost
+        for hw_key in profile.hosts - released.hosts:
+            if self.host_count.get(hw_key, 0) == 0:
+                cost += self.hw_static_power[hw_key]
+        for hw_key in released.hosts - profile.hosts:
+            if self.host_count[hw_key] == 1:
+                cost -= self.hw_static_power[hw_key]
+
+        centralization = len(profile.node_functions) - len(released.node_functions)
+        for pair in profile.node_functions - released.node_functions:
+            if self.pair_count.get(pair, 0) == 0:
+                centralization -= 1
+        for pair in released.node_functions - profile.node_functions:
+            if self.pair_count[pair] == 1:
+                centralization += 1
+
+        return cost, centralization
+
+
+    def score(self, cost_delta: float, centralization_delta: int) -> float:
+        """ Objective change plus the change of the penalty for a missing centralization. """
+        current = self.centralization()
+        before = max(0, self.centralization_cap - current)
+        after = max(0, self.centralization_cap - (current + centralization_delta))
+        return cost_delta + self.penalty * (after - before)
+
+
+    def total_score(self) -> float:
+        return self.objective() + self.penalty * max(0, self.centralization_cap - self.centralization())
+
+
+    # ----- Moves -----
+
+    def add(self, bs_key: str, key: DecisionVariableKey) -> None:
+        profile = self.profiles[key]
+        self.keys[bs_key] = key
+        self.key_cost += profile.static_cost + profile.load_cost
+        self.hostings += len(profile.node_functions)
+        for link_key, usage in profile.links.items():
+            self.link_usage[link_key] = self.link_usage.get(link_key, 0.0) + usage
+        for hw_key, usage in profile.cpu.items():
+            self.cpu_usage[hw_key] = self.cpu_usage.get(hw_key, 0.0) + usage
+        for hw_key in profile.hosts:
+            self.host_count[hw_key] = self.host_count.get(hw_key, 0) + 1
+        for pair in profile.node_functions:
+            self.pair_count[pair] = self.pair_count.get(pair, 0) + 1
+
+
+    def remove(self, bs_key: str) -> None:
+        profile = self.profiles[self.keys.pop(bs_key)]
+        self.key_cost -= profile.static_cost + profile.load_cost
+        self.hostings -= len(profile.node_functions)
+        for link_key, usage in profile.links.items():
+            self.link_usage[link_key] -= usage
+        for hw_key, usage in profile.cpu.items():
+            self.cpu_usage[hw_key] -= usage
+        for hw_key in profile.hosts:
+            self.host_count[hw_key] -= 1
+        for pair in profile.node_functions:
+            self.pair_count[pair] -= 1
+
+
+    def replace(self, bs_key: str, key: DecisionVariableKey) -> None:
+        self.remove(bs_key)
+        self.add(bs_key, key)
+
+
+def _greedy(state: _Assignment, registry: VariableRegistry) -> list:
+    """ Assign the most constrained base stations first, each to its cheapest feasible key. """
+    unassigned = []
+    order = sorted(registry.by_base_station.items(), key=lambda item: (len(item[1]), item[0]))
+    for bs_key, keys in order:
+        best = None
+        for key in keys:
+            profile = state.profiles[key]
+            if not state.fits(profile):
+                continue
+            score = state.score(*state.delta(profile))
+            if best is None or score < best[0]:
+                best = (score, key)
+        if best is None:
+            unassigned.append(bs_key)
+        else:
+            state.add(bs_key, best[1])
+    return unassigned
+
+
+def _improve_base_stations(state: _Assignment, registry: VariableRegistry) -> bool:
+    """ Reroute or change the DRC of single base stations, first improvement. """
+    improved = False
+    for bs_key, current in list(state.keys.items()):
+        released = state.profiles[current]
+        best = None
+        for key in registry.by_base_station[bs_key]:
+            if key == current:
+                continue
+            profile = state.profiles[key]
+            score = state.score(*state.delta(profile, released))
+            if score < -1e-9 and (best is None or score < best[0]) and state.fits(profile, released):
+                best = (score, key)
+        if best is not None:
+            state.replace(bs_key, best[1])
+            improved = True
+    return improved
+
+
+def _move_group(state: _Assignment, moves: dict) -> bool:
+    """
+    Move each base station of moves (bs_key -> candidate keys) to its best feasible
+    candidate, keeping the moves only if together they lower the score.
+    """
+    before = state.total_score()
+    previous = {bs_key: state.keys[bs_key] for bs_key in moves}
+
+    for bs_key, keys in moves.items():
+        released = state.profiles[state.keys[bs_key]]
+        best = None
+        for key in keys:
+            profile = state.profiles[key]
+            if not state.fits(profile, released):
+                continue
+            score = state.score(*state.delta(profile, released))
+            if best is None or score < best[0]:
+                best = (score, key)
+        if best is None:
+            break
+        state.replace(bs_key, best[1])
+    else:
+        if state.total_score() - before < -1e-9:
+            return True
+
+    for bs_key, key in previous.items():
+        if state.keys[bs_key] != key:
+            state.replace(bs_key, key)
+    return False
+
+
+def _consolidate_hardware(state: _Assignment, registry: VariableRegistry, hosting_keys: dict) -> bool:
+    """
+    Switch off a powered hardware by moving every base station hosting VNFs on it
+    elsewhere, or gather on a hardware every base station that can host VNFs on it,
+    with any DRC or all with the same DRC (sharing (node, VNF) pairs raises the
+    centralization).
+
+    hosting_keys : dict
+        hw_key -> bs_key -> [keys hosting VNFs on hw_key]
+    """
+    improved = False
+    for hw_key, candidates in sorted(hosting_keys.items()):
+        if state.host_count.get(hw_key, 0) > 0:
+            moves = {bs_key: [key for key in registry.by_base_station[bs_key]
+                              if hw_key not in state.profiles[key].hosts]
+                     for bs_key, key in state.keys.items() if hw_key in state.profiles[key].hosts}
+            improved = _move_group(state, moves) or improved
+
+        drcs = sorted({key.drc_id for keys in candidates.values() for key in keys})
+        for drc_id in [None] + drcs:
+            moves = {}
+            for bs_key, keys in candidates.items():
+                if bs_key not in state.keys:
+                    continue
+                keys = [key for key in keys if drc_id is None or key.drc_id == drc_id]
+                if len(keys) > 0 and state.keys[bs_key] not in keys:
+                    moves[bs_key] = keys
+            if len(moves) > 0:
+                improved = _move_group(state, moves) or improved
+    return improved
+
+
+def solve_heuristic(topo: Topology, centralization_cap: int = 0, max_passes: int = 50,
+                    presolve: bool = False) -> dict:
+    """
+    Solve the EEP-RAN problem without a MIP solver: a greedy assignment under the
+    link (max_ports) and processing (num_cpu_cores) capacities, improved by local
+    search until no move lowers the total power.
+
+    Moves
+    -----
+
+    reroute / swap DRC
+        Replace the key of a single base station by any other of its keys.
+    consolidate
+        Move every base station hosting VNFs on a hardware away from it, so the
+        hardware static power is saved, or onto it, so fewer hardware are powered
+        and more (node, VNF) pairs are shared.
+
+    A missing centralization is penalized in the move evaluation, so the search is
+    driven towards assignments that meet the cap.
+
+    Parameters
+    ----------
+
+    topo : Topology
+        Topology with routes already generated or imported.
+    centralization_cap : int
+        Minimum centralization of the assignment.
+    max_passes : int
+        Maximum number of local search passes over all moves.
+    presolve : bool
+        Remove dominated candidates first (core.presolve).
+
+    Returns
+    -------
+
+    A dict with objective [w] and centralization (computed as in the EEP-RAN model),
+    feasible, unassigned (base stations without a feasible key), assignment
+    (bs_key -> (route_id, drc_id)) and keys (the selected DecisionVariableKeys, to be
+    used as MIP start with core.model.add_assignment_mip_start()).
+
+    """
+    heuristic_start = time.time()
+
+    splits = package_drc.get_drc_list()
+    drc_dict = {drc.identifier: drc for drc in splits}
+    vnf_cpu_usage = package_drc.get_vnf_dict()
+    registry = VariableRegistry(topo, splits, vnf_cpu_usage.keys())
+    if presolve:
+        prune_dominated_keys(registry, topo, drc_dict, vnf_cpu_usage, centralization_cap,
+                             fixed_loads=True)
+    profiles = get_candidate_profiles(registry, topo, drc_dict, vnf_cpu_usage)
+    hosting_keys = {}
+    for bs_key, keys in registry.by_base_station.items():
+        for key in keys:
+            for hw_key in profiles[key].hosts:
+                hosting_keys.setdefault(hw_key, {}).setdefault(bs_key, []).append(key)
+
+    penalty = max((profile.static_cost + profile.load_cost for profile in profiles.values()), default=0.0)
+    penalty += sum(topo.get_index().hardware_power.tolist())
+    state = _Assignment(topo, profiles, centralization_cap, penalty)
+
+    unassigned = _greedy(state, registry)
+    greedy_objective = state.objective()
+
+    passes = 0
+    while passes < max_passes:
+        passes += 1
+        improved = _improve_base_stations(state, registry)
+        improved = _consolidate_hardware(state, registry, hosting_keys) or improved
+        if not improved:
+            break
+
+    heuristic_end = time.time()
+    result = {
+        'objective': state.objective(),
+        'centralization': state.centralization(),
+        'feasible': len(unassigned) == 0 and state.centralization() >= centralization_cap,
+        'unassigned': unassigned,
+        'assignment': {bs_key: (key.route_id, key.drc_id) for bs_key, key in state.keys.items()},
+        'keys': list(state.keys.values()),
+        'solve_time': heuristic_end - heuristic_start,
+    }
+    logging.info('Heuristic: {}s, greedy {} [w], local search {} [w] after {} passes'.format(
+        result['solve_time'], greedy_objective, result['objective'], passes))
+    return result
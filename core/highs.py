@@ -0,0 +1,353 @@
+from core.matrix import *
+import time
+
+
+class HighsColumn:
+    """ A column of a HighsModel, read like a docplex variable. """
+
+    def __init__(self, model, index: int, name: str):
+        self.model = model
+        self.index = index
+        self.name = name
+
+
+    @property
+    def solution_value(self) -> float:
+        return self.model.solution.get_value(self)
+
+
+class HighsRowExpression:
+    """ The left-hand side of a row, read like a docplex linear expression. """
+
+    def __init__(self, model, row: int):
+        self.model = model
+        self.row = row
+
+
+class HighsConstraint:
+    """ A row of a HighsModel; setting rhs changes the row bounds in place. """
+
+    def __init__(self, model, row: int, name: str, sense: str, rhs: float):
+        self.model = model
+        self.row = row
+        self.name = name
+        self.sense = sense
+        self.left_expr = HighsRowExpression(model, row)
+        self.__rhs = rhs
+
+
+    @property
+    def rhs(self) -> float:
+        return self.__rhs
+
+
+    @rhs.setter
+    def rhs(self, value: float) -> None:
+        self.__rhs = float(value)
+        self.model.highs.changeRowBounds(int(self.model.row_positions[self.row]),
+                                         *_row_bounds(self.sense, self.__rhs))
+
+
+class HighsSolution:
+    def __init__(self, objective: float, column_values: numpy.ndarray, row_values: numpy.ndarray):
+        self.objective = objective
+        self.column_values = column_values
+        self.row_values = row_values
+
+
+    def get_objective_value(self) -> float:
+        return self.objective
+
+
+    def get_value(self, item) -> float:
+        if isinstance(item, HighsColumn):
+            return float(self.column_values[item.index])
+        if isinstance(item, HighsRowExpression):
+            return float(self.row_values[item.row])
+        raise TypeError('Cannot read the value of {!r}'.format(item))
+
+
+    def get_values(self, items) -> list:
+        return [self.get_value(item) for item in items]
+
+
+class HighsSolveDetails:
+    def __init__(self, status: str, time: float, best_bound: float, mip_relative_gap: float):
+        self.status = status
+        self.time = time
+        self.best_bound = best_bound
+        self.mip_relative_gap = mip_relative_gap
+
+
+class HighsParameters:
+    """ The docplex parameters used by this package, applied to HiGHS on solve(). """
+
+    def __init__(self):
+        self.timelimit = None
+        self.threads = None
+
+
+def _row_bounds(sense: str, rhs: float) -> tuple:
+    if sense == EepranMatrix.LESS_EQUAL:
+        return -numpy.inf, rhs
+    if sense == EepranMatrix.GREATER_EQUAL:
+        return rhs, numpy.inf
+    return rhs, rhs
+
+
+def _delete_positions(delete, positions: numpy.ndarray, removed: numpy.ndarray) -> numpy.ndarray:
+    """
+    Delete the HiGHS columns/rows at positions[removed] with delete (deleteCols or
+    deleteRows).
+
+    :returns: positions shifted over the deleted ones (meaningless at removed).
+    """
+    removed_positions = numpy.sort(positions[removed])
+    if len(removed_positions) == 0:
+        return positions
+    delete(len(removed_positions), removed_positions.astype(numpy.int32))
+    return positions - numpy.searchsorted(removed_positions, positions)
+
+
+class HighsModel:
+    """
+    EEP-RAN model of an EepranMatrix solved by HiGHS.
+
+    Mirrors the part of the docplex Model API used in this package: x/y/z dicts of
+    columns with solution_value, row_constraints with left_expr and a settable rhs,
+    solve(), solution.get_objective_value() / get_value(), solve_details, parameters
+    (timelimit, threads), change_var_upper_bounds(), add_mip_start() and update_loads()
+    for core.multiperiod.
+
+    Columns and rows are indexed as in the matrix; column_positions and row_positions
+    give their position in HiGHS, which differs once apply_delta() has added and
+    deleted columns and rows.
+    """
+
+    def __init__(self, matrix: EepranMatrix, name: str = 'EEP-Ran Problem', log_output: bool = False):
+        import highspy
+
+        self.name = name
+        self.matrix = matrix
+        self.log_output = log_output
+        self.parameters = HighsParameters()
+        self.solution = None
+        self.solve_details = None
+        self.build_timings = {}
+        if matrix.build_time is not None:
+            self.build_timings['Matrix Assembly'] = matrix.build_time
+
+        model_start = time.time()
+        self.highs = highspy.Highs()
+        self.highs.setOptionValue('output_flag', log_output)
+
+        columns = matrix.rows.tocsc()
+        bounds = numpy.array([_row_bounds(sense, rhs) for sense, rhs in zip(matrix.row_senses, matrix.rhs)])
+        lp = highspy.HighsLp()
+        lp.num_col_ = matrix.num_columns
+        lp.num_row_ = len(matrix.row_names)
+        lp.col_cost_ = matrix.objective
+        lp.col_lower_ = numpy.zeros(matrix.num_columns)
+        lp.col_upper_ = numpy.array([1.0 if column_type == 'B' else numpy.inf
+                                     for column_type in matrix.column_types])
+        lp.row_lower_ = bounds[:, 0] if len(bounds) > 0 else numpy.zeros(0)
+        lp.row_upper_ = bounds[:, 1] if len(bounds) > 0 else numpy.zeros(0)
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+        lp.a_matrix_.start_ = columns.indptr
+        lp.a_matrix_.index_ = columns.indices
+        lp.a_matrix_.value_ = columns.data
+        lp.integrality_ = [highspy.HighsVarType.kContinuous if column_type == 'C'
+                           else highspy.HighsVarType.kInteger for column_type in matrix.column_types]
+        self.highs.passModel(lp)
+
+        self.column_positions = numpy.arange(matrix.num_columns)
+        self.row_positions = numpy.arange(len(matrix.row_names))
+        names = matrix.column_names
+        self.columns = [HighsColumn(self, column, name) for column, name in enumerate(names)]
+        self.x = dict(zip(matrix.x_keys, self.columns[:matrix.num_x]))
+        self.y = dict(zip(matrix.y_keys, self.columns[matrix.num_x:matrix.num_x+matrix.num_y]))
+        self.z = dict(zip(matrix.z_keys, self.columns[matrix.num_x+matrix.num_y:]))
+        self.row_constraints = [HighsConstraint(self, row, name, sense, rhs) for row, (name, sense, rhs)
+                                in enumerate(zip(matrix.row_names, matrix.row_senses, matrix.rhs.tolist()))]
+
+        model_end = time.time()
+        logging.info('    HiGHS Model: {}s'.format(model_end - model_start))
+        self.build_timings['HiGHS Model'] = model_end - model_start
+
+
+    @property
+    def number_of_variables(self) -> int:
+        return self.matrix.num_columns
+
+
+    @property
+    def number_of_constraints(self) -> int:
+        return len(self.row_constraints)
+
+
+    def solve(self, log_output: bool = None) -> HighsSolution:
+        highs = self.highs
+        highs.setOptionValue('output_flag', self.log_output if log_output is None else bool(log_output))
+        # unset parameters go back to the HiGHS defaults, as a previous solve may have set them
+        timelimit, threads = self.parameters.timelimit, self.parameters.threads
+        highs.setOptionValue('time_limit', numpy.inf if timelimit is None else float(timelimit))
+        highs.setOptionValue('threads', 0 if threads is None else int(threads))
+
+        solve_start = time.time()
+        highs.run()
+        solve_end = time.time()
+
+        status = highs.getModelStatus()
+        info = highs.getInfo()
+        self.solve_details = HighsSolveDetails(highs.modelStatusToString(status), solve_end - solve_start,
+                                               info.mip_dual_bound, info.mip_gap)
+        self.solution = None
+        if info.primal_solution_status == 2:    # feasible point
+            solution = highs.getSolution()
+            self.solution = HighsSolution(info.objective_function_value,
+                                          numpy.asarray(solution.col_value)[self.column_positions],
+                                          numpy.asarray(solution.row_value)[self.row_positions])
+        return self.solution
+
+
+    def add_mip_start(self, solution, effort_level=None) -> None:
+        """ Start from a previous solution (effort_level is ignored by HiGHS). """
+        if isinstance(solution, HighsSolution):
+            values = solution.column_values
+        else:
+            values = numpy.asarray([solution.get_value(column) for column in self.columns])
+        col_value = numpy.zeros(self.highs.getNumCol())
+        col_value[self.column_positions] = values
+        start = self.highs.getSolution()
+        start.col_value = list(col_value)
+        self.highs.setSolution(start)
+
+
+    def clear_mip_starts(self) -> None:
+        pass
+
+
+    def change_var_upper_bounds(self, columns: list, ubs) -> None:
+        """ Set the upper bound of columns (HighsColumn) to ubs (one value or one per column). """
+        if len(columns) == 0:
+            return
+        positions = self.column_positions[[column.index for column in columns]].astype(numpy.int32)
+        upper = numpy.broadcast_to(numpy.asarray(ubs, dtype=float), positions.shape)
+        self.highs.changeColsBounds(len(positions), positions, numpy.zeros(len(positions)),
+                                    numpy.ascontiguousarray(upper))
+
+
+    def update_objective(self) -> None:
+        """ Push the objective of the matrix. """
+        matrix = self.matrix
+        self.highs.changeColsCost(matrix.num_columns, self.column_positions.astype(numpy.int32),
+                                  matrix.objective)
+
+
+    def update_loads(self) -> None:
+        """ Push the load dependent coefficients of the matrix (see EepranMatrix.set_loads()). """
+        matrix = self.matrix
+        self.update_objective()
+
+        # the load dependent rows are deleted and added again, as in apply_delta()
+        rows = matrix.load_dependent_rows
+        if len(rows) == 0:
+            return
+        self.row_positions = _delete_positions(self.highs.deleteRows, self.row_positions, rows)
+        self.row_positions[rows] = self.highs.getNumRow() + numpy.arange(len(rows))
+        self.__add_rows(rows)
+
+
+    def __add_rows(self, rows: numpy.ndarray) -> None:
+        """ Add the rows of the matrix at the end of the HiGHS model. """
+        matrix = self.matrix
+        block = matrix.rows[rows].tocsr()
+        bounds = numpy.array([_row_bounds(matrix.row_senses[row], matrix.rhs[row]) for row in rows.tolist()])
+        self.highs.addRows(len(rows), bounds[:, 0], bounds[:, 1], block.nnz, block.indptr[:-1].astype(numpy.int32),
+                           self.column_positions[block.indices].astype(numpy.int32), block.data)
+
+
+    def apply_delta(self, matrix: EepranMatrix, delta: MatrixDelta) -> None:
+        """
+        Move the model from self.matrix to matrix, touching only what delta (the
+        MatrixDelta between them) lists. See core.model.update_model_topology().
+        """
+        import highspy
+
+        highs = self.highs
+        previous_constraints = self.row_constraints
+
+        # ----- Removed Columns and Rows -----
+        # changed rows are deleted and added again: HiGHS keeps the matrix by column, so
+        # rewriting a row in place costs a shift of the matrix per coefficient
+        replaced_rows = numpy.concatenate((delta.removed_rows, delta.row_map[delta.changed_rows]))
+        previous_column_positions = _delete_positions(highs.deleteCols, self.column_positions,
+                                                      delta.removed_columns)
+        previous_row_positions = _delete_positions(highs.deleteRows, self.row_positions, replaced_rows)
+
+        # ----- Added Columns and Objective -----
+        column_positions = numpy.empty(matrix.num_columns, dtype=numpy.int64)
+        kept = delta.column_map >= 0
+        column_positions[kept] = previous_column_positions[delta.column_map[kept]]
+        added = delta.added_columns
+        column_positions[added] = highs.getNumCol() + numpy.arange(len(added))
+        if len(added) > 0:
+            upper = numpy.array([1.0 if matrix.column_types[column] == 'B' else numpy.inf
+                                 for column in added.tolist()])
+            highs.addCols(len(added), matrix.objective[added], numpy.zeros(len(added)), upper, 0,
+                          numpy.zeros(len(added), dtype=numpy.int32), numpy.zeros(0, dtype=numpy.int32),
+                          numpy.zeros(0))
+            integrality = [highspy.HighsVarType.kContinuous if matrix.column_types[column] == 'C'
+                           else highspy.HighsVarType.kInteger for column in added.tolist()]
+            highs.changeColsIntegrality(len(added), column_positions[added].astype(numpy.int32), integrality)
+        highs.changeColsCost(matrix.num_columns, column_positions.astype(numpy.int32), matrix.objective)
+        self.column_positions = column_positions
+
+        # ----- Added and Changed Rows -----
+        row_positions = numpy.empty(len(matrix.row_names), dtype=numpy.int64)
+        kept = (delta.row_map >= 0)
+        kept[delta.changed_rows] = False
+        row_positions[kept] = previous_row_positions[delta.row_map[kept]]
+        added = numpy.concatenate((delta.added_rows, delta.changed_rows))
+        row_positions[added] = highs.getNumRow() + numpy.arange(len(added))
+        if len(added) > 0:
+            rows = matrix.rows[added].tocsr()
+            bounds = numpy.array([_row_bounds(matrix.row_senses[row], matrix.rhs[row]) for row in added.tolist()])
+            highs.addRows(len(added), bounds[:, 0], bounds[:, 1], rows.nnz, rows.indptr[:-1].astype(numpy.int32),
+                          column_positions[rows.indices].astype(numpy.int32), rows.data)
+        self.row_positions = row_positions
+
+        # ----- Columns and Constraints -----
+        previous_columns = self.columns
+        self.columns = []
+        for column, (previous_column, name) in enumerate(zip(delta.column_map.tolist(), matrix.column_names)):
+            item = previous_columns[previous_column] if previous_column >= 0 else HighsColumn(self, column, name)
+            item.index = column
+            self.columns.append(item)
+        self.x = dict(zip(matrix.x_keys, self.columns[:matrix.num_x]))
+        self.y = dict(zip(matrix.y_keys, self.columns[matrix.num_x:matrix.num_x+matrix.num_y]))
+        self.z = dict(zip(matrix.z_keys, self.columns[matrix.num_x+matrix.num_y:]))
+
+        self.row_constraints = []
+        for row, (previous_row, name, sense, rhs) in enumerate(zip(delta.row_map.tolist(), matrix.row_names,
+                                                                  matrix.row_senses, matrix.rhs.tolist())):
+            if previous_row >= 0:
+                constraint = previous_constraints[previous_row]
+                constraint.row = row
+                constraint.left_expr.row = row
+            else:
+                constraint = HighsConstraint(self, row, name, sense, rhs)
+            self.row_constraints.append(constraint)
+        for row in delta.changed_rows.tolist():
+            self.row_constraints[row].rhs = matrix.rhs[row]
+
+        self.matrix = matrix
+        self.solution = None
+
+
+    def export_as_lp(self, path: str) -> None:
+        self.highs.writeModel(path)
+
+
+    def end(self) -> None:
+        self.highs.clear()
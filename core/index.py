@@ -0,0 +1,109 @@
+import numpy
+from core.link import *
+from core.node import *
+
+
+class TopologyIndex:
+    """
+    Dense integer ids of the nodes, hardware, base stations and links of a Topology,
+    with their attributes in NumPy arrays indexed by id.
+
+    String keys ('node3', 'node3_hw1', 'node3_bs1', "('node1', 'node3')") are only
+    kept to translate from and to routes, files and model names: *_keys[id] is the key
+    of an id and *_ids[key] the id of a key (*_key_types[key] is the Topology
+    identifier of its type, for scalar lookups). Every link gets a single id,
+    reachable from the key of both directions.
+
+    Built by Topology.get_index(), which rebuilds it when the topology changes.
+    """
+
+    def __init__(self, nodes: dict, hardwares: dict, base_stations: dict, links: dict):
+        # ----- Nodes -----
+        self.node_keys = list(nodes.keys())
+        self.node_ids = {key: idx for idx, key in enumerate(self.node_keys)}
+        self.node_static_percentage = numpy.array([node.static_percentage for node in nodes.values()],
+                                                  dtype=float)
+
+        # ----- Hardware -----
+        self.hardware_keys = []
+        hardware_node = []
+        hardware_types = []
+        for node_id, node in enumerate(nodes.values()):
+            self.hardware_keys += node.get_hardware_keys()
+            hardware_node += [node_id] * len(node.hardwares)
+            hardware_types += node.get_hardware_type_identifiers()
+        self.hardware_ids = {key: idx for idx, key in enumerate(self.hardware_keys)}
+        self.hardware_node = numpy.array(hardware_node, dtype=numpy.int64)
+        self.hardware_type = numpy.array(hardware_types, dtype=numpy.int64)
+        self.hardware_key_types = dict(zip(self.hardware_keys, hardware_types))
+        self.hardware_cpu_cores = numpy.array([hardwares[hw_type].num_cpu_cores for hw_type in hardware_types],
+                                              dtype=float)
+        self.hardware_power = numpy.array([hardwares[hw_type].power_consumption for hw_type in hardware_types],
+                                          dtype=float)
+        static_percentage = self.node_static_percentage[self.hardware_node]
+        self.hardware_static_power = self.hardware_power * static_percentage
+        self.hardware_dynamic_power_per_core = (self.hardware_power * (1 - static_percentage) /
+                                                self.hardware_cpu_cores)
+
+        # ----- Base Stations -----
+        self.base_station_keys = []
+        base_station_node = []
+        base_station_types = []
+        for node_id, node in enumerate(nodes.values()):
+            self.base_station_keys += node.get_base_station_keys()
+            base_station_node += [node_id] * len(node.base_stations)
+            base_station_types += node.get_base_station_identifiers()
+        self.base_station_ids = {key: idx for idx, key in enumerate(self.base_station_keys)}
+        self.base_station_node = numpy.array(base_station_node, dtype=numpy.int64)
+        self.base_station_type = numpy.array(base_station_types, dtype=numpy.int64)
+        self.base_station_key_types = dict(zip(self.base_station_keys, base_station_types))
+        # power of a base station at full load, split in its static and load dependent part
+        self.base_station_static_power = numpy.array(
+            [base_stations[bs_type].num_sectors * (
+                base_stations[bs_type].num_rf_chains * base_stations[bs_type].rf_chain_power_consumption +
+                base_stations[bs_type].static_power_consumption) for bs_type in base_station_types], dtype=float)
+        self.base_station_load_power = numpy.array(
+            [base_stations[bs_type].num_sectors * (
+                base_stations[bs_type].transmission_power / base_stations[bs_type].power_amplifier_efficiency)
+             for bs_type in base_station_types], dtype=float)
+
+        # ----- Links -----
+        self.link_keys = []
+        self.link_ids = {}
+        unique_links = []
+        for key, link in links.items():
+            link_id = self.link_ids.get(str((link.node1, link.node2)))
+            if link_id is None:
+                link_id = len(unique_links)
+                unique_links.append(link)
+                self.link_keys.append(str((link.node1, link.node2)))
+                self.link_ids[self.link_keys[-1]] = link_id
+            self.link_ids[key] = link_id
+        self.link_port_capacity = numpy.array([link.port_capacity for link in unique_links], dtype=float)
+        self.link_max_ports = numpy.array([link.max_ports for link in unique_links], dtype=float)
+        self.link_delay = numpy.array([link.delay for link in unique_links], dtype=float)
+        self.link_port_power = numpy.array(
+            [(2 * link.pluggable_transceiver_power_consumption) +
+             (link.switch_port_power_consumption * ((1 if link.is_node1_switch else 0) +
+                                                    (1 if link.is_node2_switch else 0)))
+             for link in unique_links], dtype=float)
+
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_keys)
+
+
+    @property
+    def num_hardwares(self) -> int:
+        return len(self.hardware_keys)
+
+
+    @property
+    def num_base_stations(self) -> int:
+        return len(self.base_station_keys)
+
+
+    @property
+    def num_links(self) -> int:
+        return len(self.link_keys)
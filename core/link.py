@@ -37,4 +37,50 @@ class Link:
         if self.is_node2_switch:
             power_consumption += self.switch_port_power_consumption
         
-        return power_consumption
\ No newline at end of file
+        return power_consumption
+
+class LinkTable:
+    """
+    Interns directed links (node1, node2) to integer ids, so routes keep tuples of
+    ids instead of node name tuples.
+
+    links[id] is the (node1, node2) tuple, keys[id] its string key (as in
+    Topology.get_link()) and ids maps both the tuple and the string key to the id.
+    Equal crosshauls of different routes share one tuple of ids.
+    """
+
+    __slots__ = ('links', 'keys', 'ids', 'segments')
+
+    def __init__(self):
+        self.links = []
+        self.keys = []
+        self.ids = {}
+        self.segments = {}      # tuple of links -> tuple of ids
+
+
+    def __len__(self) -> int:
+        return len(self.links)
+
+
+    def intern(self, link: tuple) -> int:
+        link_id = self.ids.get(link)
+        if link_id is None:
+            link = (link[0], link[1])
+            key = str(link)
+            link_id = self.ids.get(key)
+            if link_id is None:
+                link_id = len(self.links)
+                self.links.append(link)
+                self.keys.append(key)
+                self.ids[key] = link_id
+            self.ids[link] = link_id
+        return link_id
+
+
+    def intern_all(self, links: list) -> tuple:
+        links = tuple(links)
+        link_ids = self.segments.get(links)
+        if link_ids is None:
+            link_ids = tuple(self.intern(link) for link in links)
+            self.segments[links] = link_ids
+        return link_ids
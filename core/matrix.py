@@ -0,0 +1,533 @@
+from core.topology import *
+from core.registry import *
+from core.presolve import *
+import core.drc as package_drc
+import numpy
+import os
+import re
+import scipy.sparse
+import time
+
+class EepranMatrix:
+    """
+    EEP-RAN problem assembled directly as SciPy CSR arrays.
+
+    Columns are ordered as x (decision variables), y (hardware ceil, psi_1) and
+    z (centralization ceil, psi_2). Rows follow the order in which
+    core.model.build_eepran_model() adds its constraints, so both builders describe
+    the same model.
+
+    Traffic dependent terms (crosshaul bandwidth, VNF CPU usage and the base station
+    transmission power) are kept apart from the static ones, so the matrix can be
+    rescaled by the load of each base station with set_loads(). At full load (the
+    default) the model is the static snapshot solved by eepran.py.
+
+    With presolve, dominated route/DRC candidates are removed before the columns are
+    created (see core.presolve). The pruning is exact only for the given centralization
+    cap and the full load, so keep it off when either changes after the build.
+
+    A registry already built for topo (e.g. updated with VariableRegistry.update())
+    is used instead of building a new one.
+
+    The rows of each block are kept in hardware_ceil_rows and pair_ceil_rows (the low
+    row of each y/z key, followed by its high row), link_rows, single_route_rows and
+    processing_rows, with the keys of the last three in link_keys, single_route_keys
+    and processing_keys.
+    """
+
+    LESS_EQUAL = 'L'
+    GREATER_EQUAL = 'G'
+    EQUAL = 'E'
+
+    # attributes with the rows of each block, in the order they are assembled
+    ROW_BLOCKS = ('hardware_ceil_rows', 'link_rows', 'pair_ceil_rows', 'single_route_rows', 'processing_rows')
+    ROW_BLOCK_KEYS = ('link_keys', 'single_route_keys', 'processing_keys')
+
+    def __init__(self, topo: Topology, centralization_cap: int = 0, presolve: bool = False,
+                 registry: VariableRegistry = None):
+        self.__set_catalog(topo, centralization_cap)
+
+        self.registry = registry
+        if registry is None:
+            self.registry = VariableRegistry(topo, self.splits, self.virtual_network_functions)
+        self.presolve_report = None
+        if presolve:
+            self.presolve_report = prune_dominated_keys(self.registry, topo, self.drc_dict,
+                                                        self.vnf_cpu_usage, centralization_cap,
+                                                        fixed_loads=True)
+        self.__set_columns(self.registry.keys, list(topo.get_hardware_keys()), self.registry.ceil_keys)
+
+        self.objective = None
+        self.rows = None
+        self.row_names = []
+        self.row_senses = []
+        self.rhs = []
+        self.centralization_row = None
+        self.build_time = None
+
+        # rows of each block and the keys they stand for, see __assemble()
+        self.hardware_ceil_rows = []    # low row of each y key, the high row follows
+        self.link_rows = []
+        self.link_keys = []
+        self.pair_ceil_rows = []        # low row of each z key, the high row follows
+        self.single_route_rows = []
+        self.single_route_keys = []
+        self.processing_rows = []
+        self.processing_keys = []
+
+        self.__row_idx = []
+        self.__col_idx = []
+        self.__values = []
+        self.__load_row_idx = []
+        self.__load_col_idx = []
+        self.__load_values = []
+
+        self.__assemble()
+
+
+    def __set_catalog(self, topo: Topology, centralization_cap: int) -> None:
+        self.topo = topo
+        self.centralization_cap = centralization_cap
+
+        self.splits = package_drc.get_drc_list()
+        self.drc_dict = {drc.identifier: drc for drc in self.splits}
+        self.vnf_cpu_usage = package_drc.get_vnf_dict()
+        self.virtual_network_functions = self.vnf_cpu_usage.keys()
+        self.maximum_centralization = (len(self.virtual_network_functions) *
+                                       len(topo.get_base_station_keys()))
+        self.integer_feasibility_tolerance = 1 / self.maximum_centralization
+
+
+    def __set_columns(self, x_keys: list, y_keys: list, z_keys: list) -> None:
+        self.x_keys = x_keys
+        self.y_keys = y_keys
+        self.z_keys = z_keys
+
+        self.num_x = len(self.x_keys)
+        self.num_y = len(self.y_keys)
+        self.num_z = len(self.z_keys)
+        self.num_columns = self.num_x + self.num_y + self.num_z
+
+        self.x_index = {key: idx for idx, key in enumerate(self.x_keys)}
+        self.y_index = {key: self.num_x + idx for idx, key in enumerate(self.y_keys)}
+        self.z_index = {key: self.num_x + self.num_y + idx for idx, key in enumerate(self.z_keys)}
+
+        self.column_names = (
+            ['x_path{}_drc{}_{}'.format(key.route_id, key.drc_id, key.bs_key) for key in self.x_keys] +
+            ['y_{}'.format(key) for key in self.y_keys] +
+            ['z_{}_{}'.format(key.node_key, key.function_key) for key in self.z_keys]
+        )
+        self.column_types = ['B'] * self.num_x + ['I'] * (self.num_y + self.num_z)
+        self.loads = numpy.ones(self.num_columns)
+        self.x_base_station = [key.bs_key for key in self.x_keys]
+
+
+    def __add_row(self, name: str, sense: str, rhs: float) -> int:
+        self.row_names.append(name)
+        self.row_senses.append(sense)
+        self.rhs.append(rhs)
+        return len(self.row_names) - 1
+
+
+    def __add_terms(self, row: int, columns: list, values: list) -> None:
+        self.__row_idx.extend([row] * len(columns))
+        self.__col_idx.extend(columns)
+        self.__values.extend(values)
+
+
+    def __add_load_terms(self, row: int, columns: list, values: list) -> None:
+        self.__load_row_idx.extend([row] * len(columns))
+        self.__load_col_idx.extend(columns)
+        self.__load_values.extend(values)
+
+
+    def __assemble(self) -> None:
+        topo = self.topo
+        maximum_centralization = self.maximum_centralization
+        tolerance = self.integer_feasibility_tolerance
+
+        registry = self.registry
+        x_index = self.x_index
+        objective = numpy.zeros(self.num_columns)
+        load_objective = numpy.zeros(self.num_columns)
+
+        index = topo.get_index()
+        base_station_ids = index.base_station_ids
+        base_station_static_power = index.base_station_static_power.tolist()
+        base_station_load_power = index.base_station_load_power.tolist()
+        hardware_ids = index.hardware_ids
+        hardware_cpu_cores = index.hardware_cpu_cores.tolist()
+        hardware_static_power = index.hardware_static_power.tolist()
+        hardware_dynamic_power_per_core = index.hardware_dynamic_power_per_core.tolist()
+        link_ids = index.link_ids
+        link_port_capacity = index.link_port_capacity.tolist()
+        link_max_ports = index.link_max_ports.tolist()
+        link_port_power = index.link_port_power.tolist()
+
+        # ---------- Base Station Consumption ----------
+        for bs_key, keys in registry.by_base_station.items():
+            bs_id = base_station_ids[bs_key]
+            bs_static_power_consumption = base_station_static_power[bs_id]
+            bs_load_power_consumption = base_station_load_power[bs_id]
+            for key in keys:
+                relief = 1.0 - self.drc_dict[key.drc_id].bs_relief
+                objective[x_index[key]] += relief * bs_static_power_consumption
+                load_objective[x_index[key]] += relief * bs_load_power_consumption
+
+        # ---------- vRAN Consumption and Processing ----------
+        psi_1 = {}                  # hw_key -> ([x column], [coefficient])
+        hardware_processing = {}    # hw_key -> ([x column], [cpu usage])
+        static_power_consumptions = {}
+        for hw_key, entries in registry.by_hardware.items():
+            hw_id = hardware_ids[hw_key]
+            dynamic_power_per_core = hardware_dynamic_power_per_core[hw_id]
+            static_power_consumptions[hw_key] = hardware_static_power[hw_id]
+
+            psi_columns, psi_values = psi_1.setdefault(hw_key, ([], []))
+            cpu_columns, cpu_values = hardware_processing.setdefault(hw_key, ([], []))
+            for key, functions in entries:
+                column = x_index[key]
+                cpu_usage = sum(self.vnf_cpu_usage[function] for function in functions)
+                cpu_columns.append(column)
+                cpu_values.append(cpu_usage)
+                if len(functions) > 0:
+                    load_objective[column] += cpu_usage * dynamic_power_per_core
+                    psi_columns.append(column)
+                    psi_values.append(len(functions) / maximum_centralization)
+
+        # ---------- psi_1 Ceil Rows ----------
+        for hw_key in self.y_keys:
+            columns, values = psi_1.get(hw_key, ([], []))
+            y_column = self.y_index[hw_key]
+            objective[y_column] = static_power_consumptions.get(hw_key, 0.0)
+
+            self.hardware_ceil_rows.append(len(self.row_names))
+            for sense, rhs, name in ((self.GREATER_EQUAL, 0.0, 'low_ceil_restriction_{}'),
+                                     (self.LESS_EQUAL, 1.0 - tolerance, 'high_ceil_restriction_{}')):
+                row = self.__add_row(name.format(hw_key), sense, rhs)
+                self.__add_terms(row, [y_column] + columns, [1.0] + [-value for value in values])
+
+        # ---------- Link Capacity Rows ----------
+        for link_key, entries in registry.by_link.items():
+            link_id = link_ids[link_key]
+            port_capacity = link_port_capacity[link_id]
+            port_power_consumption = link_port_power[link_id]
+
+            columns = [x_index[key] for key, _ in entries]
+            values = [bandwidth / port_capacity for _, bandwidth in entries]
+            numpy.add.at(load_objective, columns, numpy.asarray(values) * port_power_consumption)
+
+            row = self.__add_row('qty_ports_link_{}'.format(link_key), self.LESS_EQUAL, link_max_ports[link_id])
+            self.__add_load_terms(row, columns, values)
+            self.link_rows.append(row)
+            self.link_keys.append(link_key)
+
+        # ---------- psi_2 Ceil Rows ----------
+        centralization_terms = numpy.zeros(self.num_x)
+        for key in self.z_keys:
+            columns = [x_index[var_key] for var_key in registry.by_node_function.get(key, [])]
+            z_column = self.z_index[key]
+            numpy.add.at(centralization_terms, columns, 1)
+
+            self.pair_ceil_rows.append(len(self.row_names))
+            for sense, rhs, name in ((self.GREATER_EQUAL, 0.0, 'low_ceil_restriction_{}_{}'),
+                                     (self.LESS_EQUAL, 1.0 - tolerance, 'high_ceil_restriction_{}_{}')):
+                row = self.__add_row(name.format(key.node_key, key.function_key), sense, rhs)
+                self.__add_terms(row, [z_column] + columns,
+                                 [1.0] + [-1.0 / maximum_centralization] * len(columns))
+
+        # ---------- Centralization Row ----------
+        self.centralization_row = self.__add_row('centralization_constraint', self.GREATER_EQUAL,
+                                                 self.centralization_cap)
+        x_columns = numpy.flatnonzero(centralization_terms)
+        self.__add_terms(self.centralization_row, x_columns.tolist(),
+                         centralization_terms[x_columns].tolist())
+        self.__add_terms(self.centralization_row, [self.z_index[key] for key in self.z_keys],
+                         [-1.0] * self.num_z)
+
+        # ---------- Single Route Rows ----------
+        for bs_key, keys in registry.by_base_station.items():
+            row = self.__add_row('single_route_{}'.format(bs_key), self.EQUAL, 1.0)
+            self.__add_terms(row, [x_index[key] for key in keys], [1.0] * len(keys))
+            self.single_route_rows.append(row)
+            self.single_route_keys.append(bs_key)
+
+        # ---------- Processing Capacity Rows ----------
+        for hw_key, (columns, values) in hardware_processing.items():
+            row = self.__add_row('processing_capacity_{}'.format(hw_key), self.LESS_EQUAL,
+                                 hardware_cpu_cores[hardware_ids[hw_key]])
+            self.__add_load_terms(row, columns, values)
+            self.processing_rows.append(row)
+            self.processing_keys.append(hw_key)
+
+        # ----- CSR Assembly -----
+        # Duplicated (row, column) entries are summed, as docplex does when a variable
+        # is added twice to the same expression.
+        self.static_objective = objective
+        self.load_objective = load_objective
+        self.static_rows = self.__to_csr(self.__row_idx, self.__col_idx, self.__values)
+        self.load_rows = self.__to_csr(self.__load_row_idx, self.__load_col_idx, self.__load_values)
+        self.load_dependent_rows = numpy.flatnonzero(numpy.diff(self.load_rows.indptr))
+        self.rhs = numpy.asarray(self.rhs, dtype=float)
+        self.__set_row_blocks()
+        self.__apply_loads()
+
+        self.__row_idx = []
+        self.__col_idx = []
+        self.__values = []
+        self.__load_row_idx = []
+        self.__load_col_idx = []
+        self.__load_values = []
+
+
+    def __set_row_blocks(self) -> None:
+        for block in self.ROW_BLOCKS:
+            setattr(self, block, numpy.asarray(getattr(self, block), dtype=numpy.int64))
+
+
+    def __to_csr(self, row_idx: list, col_idx: list, values: list) -> scipy.sparse.csr_matrix:
+        matrix = scipy.sparse.csr_matrix(
+            (numpy.asarray(values, dtype=float),
+             (numpy.asarray(row_idx, dtype=numpy.int64), numpy.asarray(col_idx, dtype=numpy.int64))),
+            shape=(len(self.row_names), self.num_columns)
+        )
+        matrix.sum_duplicates()
+        return matrix
+
+
+    def __apply_loads(self) -> None:
+        self.objective = self.static_objective + self.load_objective * self.loads
+        self.rows = (self.static_rows + self.load_rows @ scipy.sparse.diags(self.loads)).tocsr()
+        self.rows.sort_indices()
+
+
+    def set_loads(self, loads: dict) -> None:
+        """
+        Rescale the traffic dependent coefficients by the load of each base station.
+
+        Parameters
+        ----------
+
+        loads : dict
+            bs_key -> load factor (1.0 is the full load of the static model). 
+            Missing base stations keep their current load.
+
+        """
+        for column, bs_key in enumerate(self.x_base_station):
+            if bs_key in loads:
+                self.loads[column] = loads[bs_key]
+        self.__apply_loads()
+
+
+    def save(self, path: str) -> None:
+        """
+        Write the assembled matrix (at full load) to the directory path: the keys and
+        row descriptions as json, the objectives and right-hand side as npz and the
+        static and load dependent rows as SciPy npz.
+        """
+        os.makedirs(path, exist_ok=True)
+        description = {
+            'centralization_cap': self.centralization_cap,
+            'presolve_report': self.presolve_report,
+            'x_keys': self.x_keys,
+            'y_keys': self.y_keys,
+            'z_keys': self.z_keys,
+            'row_names': self.row_names,
+            'row_senses': self.row_senses,
+            'centralization_row': self.centralization_row,
+        }
+        description.update({block: getattr(self, block).tolist() for block in self.ROW_BLOCKS})
+        description.update({keys: getattr(self, keys) for keys in self.ROW_BLOCK_KEYS})
+        with open(os.path.join(path, 'matrix.json'), 'w') as description_file:
+            json.dump(description, description_file)
+        numpy.savez(os.path.join(path, 'vectors.npz'), static_objective=self.static_objective,
+                    load_objective=self.load_objective, rhs=self.rhs)
+        scipy.sparse.save_npz(os.path.join(path, 'static_rows.npz'), self.static_rows)
+        scipy.sparse.save_npz(os.path.join(path, 'load_rows.npz'), self.load_rows)
+
+
+    @classmethod
+    def load(cls, path: str, topo: Topology):
+        """
+        Read a matrix written by save(), for the same topology and routes, without
+        assembling it again. The loaded matrix has no registry.
+        """
+        with open(os.path.join(path, 'matrix.json'), 'r') as description_file:
+            description = json.load(description_file)
+
+        matrix = cls.__new__(cls)
+        matrix.__set_catalog(topo, description['centralization_cap'])
+        matrix.registry = None
+        matrix.presolve_report = description['presolve_report']
+        matrix.__set_columns([DecisionVariableKey(*key) for key in description['x_keys']],
+                             description['y_keys'],
+                             [CeilVariableKey(*key) for key in description['z_keys']])
+
+        matrix.row_names = description['row_names']
+        matrix.row_senses = description['row_senses']
+        matrix.centralization_row = description['centralization_row']
+        for attribute in cls.ROW_BLOCKS + cls.ROW_BLOCK_KEYS:
+            setattr(matrix, attribute, description[attribute])
+        matrix.__set_row_blocks()
+        vectors = numpy.load(os.path.join(path, 'vectors.npz'))
+        matrix.static_objective = vectors['static_objective']
+        matrix.load_objective = vectors['load_objective']
+        matrix.rhs = vectors['rhs']
+        matrix.static_rows = scipy.sparse.load_npz(os.path.join(path, 'static_rows.npz')).tocsr()
+        matrix.load_rows = scipy.sparse.load_npz(os.path.join(path, 'load_rows.npz')).tocsr()
+        matrix.load_dependent_rows = numpy.flatnonzero(numpy.diff(matrix.load_rows.indptr))
+        matrix.build_time = None
+        matrix.__apply_loads()
+        return matrix
+
+
+    def get_load_dependent_terms(self, row: int) -> tuple:
+        """ :returns: The (columns, coefficients) of a load dependent row at the current loads. """
+        start, end = self.load_rows.indptr[row], self.load_rows.indptr[row+1]
+        columns = self.load_rows.indices[start:end]
+        return columns, self.load_rows.data[start:end] * self.loads[columns]
+
+
+    def get_row_terms(self, row: int) -> tuple:
+        """ :returns: The (columns, coefficients) of a single row. """
+        start, end = self.rows.indptr[row], self.rows.indptr[row+1]
+        return self.rows.indices[start:end], self.rows.data[start:end]
+
+
+    def write_mps(self, path: str) -> None:
+        """
+        Write the model in free MPS format straight from the CSR arrays.
+
+        Parameters
+        ----------
+
+        path : str
+            The path of the output file.
+
+        """
+        names = [_mps_name(name) for name in self.column_names]
+        row_names = [_mps_name(name) for name in self.row_names]
+        columns = self.rows.tocsc()
+
+        lines = ['NAME EEP-Ran_Problem', 'ROWS', ' N obj']
+        lines += [' {} {}'.format(sense, name) for sense, name in zip(self.row_senses, row_names)]
+
+        lines.append('COLUMNS')
+        in_integer_block = False
+        for column in range(self.num_columns):
+            if self.column_types[column] != 'C' and not in_integer_block:
+                lines.append(' MARKER \'MARKER\' \'INTORG\'')
+                in_integer_block = True
+
+            if self.objective[column] != 0:
+                lines.append(' {} obj {!r}'.format(names[column], float(self.objective[column])))
+            start, end = columns.indptr[column], columns.indptr[column+1]
+            for row, value in zip(columns.indices[start:end], columns.data[start:end]):
+                lines.append(' {} {} {!r}'.format(names[column], row_names[row], float(value)))
+
+        if in_integer_block:
+            lines.append(' MARKER \'MARKER\' \'INTEND\'')
+
+        lines.append('RHS')
+        for row, value in enumerate(self.rhs):
+            if value != 0:
+                lines.append(' rhs {} {!r}'.format(row_names[row], float(value)))
+
+        lines.append('BOUNDS')
+        for column in range(self.num_columns):
+            if self.column_types[column] == 'B':
+                lines.append(' BV bnd {}'.format(names[column]))
+            else:
+                lines.append(' PL bnd {}'.format(names[column]))
+        lines.append('ENDATA')
+
+        with open(path, 'w') as mps_file:
+            mps_file.write('\n'.join(lines) + '\n')
+
+
+class MatrixDelta:
+    """
+    Difference between a previous and a current EepranMatrix of the same problem,
+    with columns and rows matched by name. Indexes are columns/rows of the matrix
+    they belong to.
+
+    Attributes
+    ----------
+
+    column_map, row_map : numpy.ndarray
+        Current column/row -> previous column/row, -1 when added.
+    added_columns, added_rows : numpy.ndarray
+        Current columns/rows without a previous one.
+    removed_columns, removed_rows : numpy.ndarray
+        Previous columns/rows without a current one.
+    changed_rows : numpy.ndarray
+        Current rows kept from the previous matrix with a different right-hand side
+        or different terms (a removed column counts as a different term).
+    changed_objective : numpy.ndarray
+        Current columns kept from the previous matrix with a different objective
+        coefficient.
+    """
+
+    def __init__(self, previous: EepranMatrix, current: EepranMatrix):
+        self.column_map = _match_names(previous.column_names, current.column_names)
+        self.row_map = _match_names(previous.row_names, current.row_names)
+
+        kept_columns = numpy.flatnonzero(self.column_map >= 0)
+        previous_to_current = numpy.full(previous.num_columns, -1, dtype=numpy.int64)
+        previous_to_current[self.column_map[kept_columns]] = kept_columns
+        kept_rows = numpy.flatnonzero(self.row_map >= 0)
+        previous_rows = numpy.ones(len(previous.row_names), dtype=bool)
+        previous_rows[self.row_map[kept_rows]] = False
+
+        self.added_columns = numpy.flatnonzero(self.column_map < 0)
+        self.removed_columns = numpy.flatnonzero(previous_to_current < 0)
+        self.added_rows = numpy.flatnonzero(self.row_map < 0)
+        self.removed_rows = numpy.flatnonzero(previous_rows)
+
+        # previous terms of the kept rows, in current columns
+        terms = previous.rows[self.row_map[kept_rows]].tocoo()
+        columns = previous_to_current[terms.col]
+        lost_terms = numpy.zeros(len(kept_rows), dtype=bool)
+        lost_terms[terms.row[columns < 0]] = True
+        aligned = scipy.sparse.csr_matrix(
+            (terms.data[columns >= 0], (terms.row[columns >= 0], columns[columns >= 0])),
+            shape=(len(kept_rows), current.num_columns))
+        difference = (current.rows[kept_rows] - aligned).tocsr()
+        difference.eliminate_zeros()
+
+        changed = (lost_terms | (numpy.diff(difference.indptr) > 0) |
+                   (current.rhs[kept_rows] != previous.rhs[self.row_map[kept_rows]]))
+        self.changed_rows = kept_rows[changed]
+        self.changed_objective = kept_columns[current.objective[kept_columns] !=
+                                              previous.objective[self.column_map[kept_columns]]]
+
+
+    def is_empty(self) -> bool:
+        return (len(self.added_columns) + len(self.removed_columns) + len(self.added_rows) +
+                len(self.removed_rows) + len(self.changed_rows) + len(self.changed_objective)) == 0
+
+
+    def __str__(self) -> str:
+        return ('columns +{} -{}, rows +{} -{} ~{}, objective ~{}'.format(
+            len(self.added_columns), len(self.removed_columns), len(self.added_rows),
+            len(self.removed_rows), len(self.changed_rows), len(self.changed_objective)))
+
+
+def _match_names(previous: list, current: list) -> numpy.ndarray:
+    """ :returns: current index -> previous index of the same name, -1 if none. """
+    previous_index = {name: idx for idx, name in enumerate(previous)}
+    return numpy.array([previous_index.get(name, -1) for name in current], dtype=numpy.int64)
+
+
+def _mps_name(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_]+', '_', name).strip('_')
+
+
+def build_eepran_matrix(topo: Topology, centralization_cap: int = 0,
+                        presolve: bool = False) -> EepranMatrix:
+    matrix_start = time.time()
+    matrix = EepranMatrix(topo, centralization_cap, presolve)
+    matrix_end = time.time()
+    matrix.build_time = matrix_end - matrix_start
+    logging.info('    Matrix Assembly: {}s'.format(matrix.build_time))
+    return matrix
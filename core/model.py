@@ -1,15 +1,29 @@
+from __future__ import annotations
 from collections import defaultdict, namedtuple
-from docplex.mp.constr import AbstractConstraint
-from docplex.mp.model import Model
 from core.topology import *
 from core.link import *
 from core.node import *
 from core.route import *
+from core.matrix import *
+from core.registry import *
+from core.highs import *
 import core.drc as package_drc
+import numpy
 import time
 
-def build_eepran_model(topo: Topology, centralization_cap: int = 0) -> {Model, AbstractConstraint}:
+# docplex (which loads pandas) is imported by the functions building a docplex model,
+# so the HiGHS backend and the tools only reading topologies or matrices do not pay for it
+
+def build_eepran_model(topo: Topology, centralization_cap: int = 0,
+                       lp_path: str = 'data/model_opt.lp') -> {Model, AbstractConstraint}:
+    """
+    Build the EEP-RAN model term by term with docplex expressions and export it as LP
+    to lp_path (None skips the export).
+    """
+    from docplex.mp.model import Model
+
     model = Model(name='EEP-Ran Problem', log_output=True)
+    model.build_timings = {}
     logging.info('Model Creation Time:')
 
     # -----------
@@ -31,6 +45,7 @@ def build_eepran_model(topo: Topology, centralization_cap: int = 0) -> {Model, A
 
     data_defining_end = time.time()
     logging.info('    Data Definition: {}s'.format(data_defining_end - data_defining_start))
+    model.build_timings['Data Definition'] = data_defining_end - data_defining_start
 
     # --------------------------
     # Define Decision Variable X
@@ -38,26 +53,12 @@ def build_eepran_model(topo: Topology, centralization_cap: int = 0) -> {Model, A
 
     var_definition_start = time.time()
 
-    # list with keys for decision variables
-    DecisionVariableKey = namedtuple('DecisionVariableKey', ['route_id', 'drc_id', 'bs_key'])
-    decision_var_keys = [
-        DecisionVariableKey(route.identifier, drc.identifier, bs_key)
-        for route in topo.get_routes()
-        for drc in splits
-        for bs_key in topo.get_base_station_keys()
-        if route.is_destination(bs_key)
-        and drc.num_needed_nodes() == route.qty_nodes()
-        and route.delay_backhaul <= drc.delay_bh
-        and route.delay_midhaul <= drc.delay_mh
-        and route.delay_fronthaul <= drc.delay_fh
-    ]
+    # keys for decision variables, indexed by bs, hardware, (node, vnf) and link
+    registry = VariableRegistry(topo, splits, virtual_network_functions)
+    decision_var_keys = registry.keys
 
     # list with keys for ceil variables in psi_2
-    CeilVariableKey = namedtuple('CeilVariableKey', ['node_key', 'function_key'])
-    ceil_var_keys = [CeilVariableKey(node_key, function_key) 
-                     for node_key in topo.get_node_keys() 
-                     for function_key in virtual_network_functions
-                     if topo.get_node(node_key).has_hardware()]
+    ceil_var_keys = registry.ceil_keys
     
     model.x = model.binary_var_dict(
         keys=decision_var_keys, 
@@ -65,9 +66,11 @@ def build_eepran_model(topo: Topology, centralization_cap: int = 0) -> {Model, A
     )
     model.y = model.integer_var_dict(keys=topo.get_hardware_keys(), name='y')
     model.z = model.integer_var_dict(keys=ceil_var_keys, name='z')
+    model.registry = registry
 
     var_definition_end = time.time()
     logging.info('    Variables Definition: {}s'.format(var_definition_end - var_definition_start))
+    model.build_timings['Variables Definition'] = var_definition_end - var_definition_start
 
     # -------------------------
     # Define Objective Function
@@ -79,64 +82,36 @@ def build_eepran_model(topo: Topology, centralization_cap: int = 0) -> {Model, A
     base_station_power_expression = model.linear_expr()
     dynamic_power_expression = model.linear_expr()
     static_power_consumptions = {}
-    link_usage_expressions = {}
     psi_1 = {}
 
-    for key in decision_var_keys:
-        route = topo.get_route(key.route_id)
-
-        # ---------- vRAN Consumption ----------
-        for function in virtual_network_functions:
-            if route.has_backhaul() and function in drc_dict[key.drc_id].fs_cu:
-                node_key = route.get_backhaul_node_key()
-                hw_key = route.get_backhaul_hardware_key()
-
-                hw = topo.get_hardware_by_key(hw_key)
-                node = topo.get_node(node_key)
-                dynamic_power_consumption = hw.power_consumption * (1 - node.static_percentage)
-
-                dynamic_power_expression.add_term(
-                    model.x[key], 
-                    (vnf_cpu_usage[function] * dynamic_power_consumption / hw.num_cpu_cores)
-                )
-
-                psi_1.setdefault(hw_key, model.linear_expr()).add_term(
-                    model.x[key],
-                    1.0 / maximum_centralization
-                )
-
-                if hw_key not in static_power_consumptions.keys():
-                    static_power_consumptions[hw_key] = hw.power_consumption * node.static_percentage
-
-            if route.has_midhaul() and function in drc_dict[key.drc_id].fs_du:
-                node_key = route.get_midhaul_node_key()
-                hw_key = route.get_midhaul_hardware_key()
+    index = topo.get_index()
 
-                hw = topo.get_hardware_by_key(hw_key)
-                node = topo.get_node(node_key)
-                dynamic_power_consumption = hw.power_consumption * (1 - node.static_percentage)
+    # ---------- vRAN Consumption ----------
+    for hw_key, entries in registry.by_hardware.items():
+        hw = topo.get_hardware_by_key(hw_key)
+        static_percentage = float(index.node_static_percentage[index.hardware_node[index.hardware_ids[hw_key]]])
+        dynamic_power_consumption = hw.power_consumption * (1 - static_percentage)
+        static_power_consumptions[hw_key] = hw.power_consumption * static_percentage
 
-                dynamic_power_expression.add_term(
-                    model.x[key], 
-                    (vnf_cpu_usage[function] * dynamic_power_consumption / hw.num_cpu_cores)
-                )
+        psi_1[hw_key] = model.linear_expr()
+        for key, functions in entries:
+            if len(functions) == 0:
+                continue
 
-                psi_1.setdefault(hw_key, model.linear_expr()).add_term(
-                    model.x[key],
-                    1.0 / maximum_centralization
-                )
-
-                if hw_key not in static_power_consumptions.keys():
-                    static_power_consumptions[hw_key] = hw.power_consumption * node.static_percentage
+            dynamic_power_expression.add_term(
+                model.x[key], 
+                (sum(vnf_cpu_usage[function] for function in functions) * 
+                 dynamic_power_consumption / hw.num_cpu_cores)
+            )
 
-        
-        # ---------- Base Station Consumption ----------
-        node_key = route.get_fronthaul_node_key()
-        node = topo.get_node(node_key)
+            psi_1[hw_key].add_term(
+                model.x[key],
+                len(functions) / maximum_centralization
+            )
 
-        base_station_key = route.get_target_base_station()
-        base_station_id = node.get_base_station_identifier(base_station_key)
-        base_station = topo.get_base_station(base_station_id)
+    # ---------- Base Station Consumption ----------
+    for bs_key, keys in registry.by_base_station.items():
+        base_station = topo.get_base_station_by_key(bs_key)
 
         bs_power_consumption = base_station.num_sectors * (
             (base_station.transmission_power / base_station.power_amplifier_efficiency) + 
@@ -144,47 +119,30 @@ def build_eepran_model(topo: Topology, centralization_cap: int = 0) -> {Model, A
             base_station.static_power_consumption 
         )
 
-        base_station_power_expression.add_term(
-            model.x[key],
-            (1.0 - drc_dict[key.drc_id].bs_relief) * bs_power_consumption
-        )
-
-        # ---------- Network Link Usage ----------
-        route = topo.get_route(key.route_id)
-
-        for link_key in route.get_backhaul_links():
-            link_usage_expressions.setdefault(link_key, model.linear_expr()).add_term(
-                model.x[key],
-                drc_dict[key.drc_id].bandwidth_bh
-            ) 
-
-        for link_key in route.get_midhaul_links():
-            link_usage_expressions.setdefault(link_key, model.linear_expr()).add_term(
+        for key in keys:
+            base_station_power_expression.add_term(
                 model.x[key],
-                drc_dict[key.drc_id].bandwidth_mh
-            )
-
-        for link_key in route.get_fronthaul_links():
-            link_usage_expressions.setdefault(link_key, model.linear_expr()).add_term(
-                model.x[key],
-                drc_dict[key.drc_id].bandwidth_fh
+                (1.0 - drc_dict[key.drc_id].bs_relief) * bs_power_consumption
             )
 
     # ---------- RAN Power Consumption Definition ----------
     ran_power_consumption.add(base_station_power_expression)
     ran_power_consumption.add(dynamic_power_expression)
     for hw_key in topo.get_hardware_keys():
-        model.add_constraint(model.y[hw_key] - psi_1[hw_key] >= 0.0, 
+        model.add_constraint(model.y[hw_key] - psi_1.get(hw_key, EMPTY_EXPR) >= 0.0, 
                                 'low_ceil_restriction_{}'.format(hw_key))
-        model.add_constraint(model.y[hw_key] - psi_1[hw_key] <= 1.0 - INTEGER_FEASIBILITY_TOLERANCE, 
+        model.add_constraint(model.y[hw_key] - psi_1.get(hw_key, EMPTY_EXPR) <= 1.0 - INTEGER_FEASIBILITY_TOLERANCE, 
                                 'high_ceil_restriction_{}'.format(hw_key))
 
-        ran_power_consumption.add_term(model.y[hw_key], static_power_consumptions[hw_key])
+        ran_power_consumption.add_term(model.y[hw_key], static_power_consumptions.get(hw_key, 0.0))
         
     # ---------- Network Power Consumption Definition ----------
     net_power_consumption = model.linear_expr()
-    for link_key, expression in link_usage_expressions.items():
+    for link_key, entries in registry.by_link.items():
         link = topo.get_link(link_key)
+        expression = model.linear_expr()
+        for key, bandwidth in entries:
+            expression.add_term(model.x[key], bandwidth)
 
         # ----- Link Capacity Constraint -----
         model.add_constraint(expression / link.port_capacity <= link.max_ports, 
@@ -193,18 +151,20 @@ def build_eepran_model(topo: Topology, centralization_cap: int = 0) -> {Model, A
         # ----- Network Power Consumption -----
         is_node1_switch = 1 if link.is_node1_switch else 0
         is_node2_switch = 1 if link.is_node2_switch else 0
-        net_power_consumption += (
-            (expression / link.port_capacity) * (
-                (2 * link.pluggable_transceiver_power_consumption) +
-                (link.switch_port_power_consumption * (is_node1_switch + is_node2_switch))
-            )
+        port_power_consumption = (
+            (2 * link.pluggable_transceiver_power_consumption) +
+            (link.switch_port_power_consumption * (is_node1_switch + is_node2_switch))
         )
+        for key, bandwidth in entries:
+            net_power_consumption.add_term(model.x[key], 
+                                           bandwidth / link.port_capacity * port_power_consumption)
     
     # --------- Objective Definition ----------
     model.minimize(ran_power_consumption + net_power_consumption)
 
     objective_function_end = time.time()
     logging.info('    Objective Definition: {}s'.format(objective_function_end - objective_function_start))
+    model.build_timings['Objective Definition'] = objective_function_end - objective_function_start
 
 
     # --------------------------------
@@ -214,29 +174,10 @@ def build_eepran_model(topo: Topology, centralization_cap: int = 0) -> {Model, A
     centralization_function_start = time.time()
 
     centralization = model.linear_expr()
-    vnf_count_expressions = {}
-    for key in decision_var_keys:
-        route = topo.get_route(key.route_id)
-
-        for function in virtual_network_functions:
-            if route.has_backhaul() and function in drc_dict[key.drc_id].fs_cu:
-                node_key = route.get_backhaul_node_key()
-
-                vnf_count_expressions.setdefault(CeilVariableKey(node_key, function), 
-                                                 model.linear_expr()).add(model.x[key])
-
-            elif route.has_midhaul() and function in drc_dict[key.drc_id].fs_du:
-                node_key = route.get_midhaul_node_key()
-
-                vnf_count_expressions.setdefault(CeilVariableKey(node_key, function), 
-                                                 model.linear_expr()).add(model.x[key])
-
-
     for key in ceil_var_keys:
-        if key in vnf_count_expressions.keys():
-            expression = vnf_count_expressions[key]
-        else:
-            expression = 0
+        expression = model.linear_expr()
+        for var_key in registry.by_node_function.get(key, []):
+            expression.add_term(model.x[var_key], 1)
 
         # Psi_2 Ceil Function Restriction
         model.add_constraint(
@@ -250,13 +191,15 @@ def build_eepran_model(topo: Topology, centralization_cap: int = 0) -> {Model, A
         )
 
         # centralization is calculated by CR (not by Hardware)
-        centralization += model.sum(expression - model.z[key])
+        centralization.add(expression)
+        centralization.add_term(model.z[key], -1)
     
     centralization_constraint = model.add_constraint(centralization >= centralization_cap, 
                                                      'centralization_constraint')
 
     centralization_function_end = time.time()
     logging.info('    Centralization Definition: {}s'.format(centralization_function_end - centralization_function_start))
+    model.build_timings['Centralization Definition'] = centralization_function_end - centralization_function_start
 
     # ------------------------------
     # Define Single Route Constraint
@@ -266,13 +209,12 @@ def build_eepran_model(topo: Topology, centralization_cap: int = 0) -> {Model, A
 
     # each bs must use a single route/drc combination
     for bs_key in topo.get_base_station_keys():
-        paths_count = model.sum(model.x[key] 
-                                for key in decision_var_keys 
-                                if key.bs_key == bs_key)
+        paths_count = model.sum_vars(model.x[key] for key in registry.by_base_station[bs_key])
         model.add_constraint(paths_count == 1, 'single_route_{}'.format(bs_key))
 
     single_route_end = time.time()
     logging.info('    Single Route Definition: {}s'.format(single_route_end - single_route_start))
+    model.build_timings['Single Route Definition'] = single_route_end - single_route_start
 
     # -------------------------------
     # Define Link Capacity Constraint
@@ -336,16 +278,11 @@ def build_eepran_model(topo: Topology, centralization_cap: int = 0) -> {Model, A
     processing_function_start = time.time()
 
     hardware_processing_expressions = {}
-    for var_key in decision_var_keys:
-        route = topo.get_route(var_key.route_id)
-        for hw_key in route.get_hardware_keys():
-            hardware_processing_expressions.setdefault(hw_key, model.linear_expr())
-            hardware_processing_expressions[hw_key] += model.sum(
-                model.x[var_key] * vnf_cpu_usage[function] 
-                for function in virtual_network_functions 
-                if (route.is_cu(hw_key) and function in drc_dict[var_key.drc_id].fs_cu) 
-                or (route.is_du(hw_key) and function in drc_dict[var_key.drc_id].fs_du) 
-            )
+    for hw_key, entries in registry.by_hardware.items():
+        expression = model.linear_expr()
+        for key, functions in entries:
+            expression.add_term(model.x[key], sum(vnf_cpu_usage[function] for function in functions))
+        hardware_processing_expressions[hw_key] = expression
 
     for key, expr in hardware_processing_expressions.items():
         hw = topo.get_hardware_by_key(key)
@@ -353,11 +290,329 @@ def build_eepran_model(topo: Topology, centralization_cap: int = 0) -> {Model, A
 
     processing_function_end = time.time()
     logging.info('    Processing Definition: {}s'.format(processing_function_end - processing_function_start))
+    model.build_timings['Processing Definition'] = processing_function_end - processing_function_start
     
     # ------------------------------
     #         Model Export
     # ------------------------------
 
-    model.export_as_lp('data/model_opt.lp')
+    if lp_path is not None:
+        model_export_start = time.time()
+        model.export_as_lp(lp_path)
+        model_export_end = time.time()
+        model.build_timings['Model Export'] = model_export_end - model_export_start
+
+    return model, centralization_constraint
+
+
+SOLVER_BACKENDS = ('cplex', 'highs')
+
+
+def build_eepran_model_sparse(topo: Topology, centralization_cap: int = 0,
+                              lp_path: str = 'data/model_opt.lp',
+                              presolve: bool = False, 
+                              backend: str = 'cplex') -> {Model, AbstractConstraint}:
+    """
+    Build the same model as build_eepran_model(), but from the CSR arrays of
+    core.matrix.EepranMatrix, handing every row to docplex in a single batch.
+
+    Parameters
+    ----------
+
+    topo : Topology
+        Topology with routes already generated or imported.
+    centralization_cap : int
+        Right-hand side of the centralization constraint.
+    lp_path : str
+        Where to export the model as LP. None skips the export.
+    presolve : bool
+        Remove dominated route/DRC candidates before creating the variables
+        (core.presolve). The optimum is kept for this centralization cap.
+    backend : str
+        Solver of the model, one of SOLVER_BACKENDS (see create_model_from_matrix()).
+
+    """
+    logging.info('Model Creation Time (sparse):')
+
+    matrix = build_eepran_matrix(topo, centralization_cap, presolve)
+    return create_model_from_matrix(matrix, backend, log_output=True, lp_path=lp_path)
+
+
+def create_model_from_matrix(matrix: EepranMatrix, backend: str = 'cplex', log_output: bool = False,
+                             lp_path: str = None) -> {Model, AbstractConstraint}:
+    """
+    Create the solver model of an EepranMatrix.
+
+    Parameters
+    ----------
+
+    backend : str
+        'cplex' builds a docplex Model. 'highs' builds a core.highs.HighsModel, with
+        the same variable/constraint semantics and the same solution reading API
+        (x/y/z[key].solution_value, solution.get_objective_value(), solution.get_value()
+        of a constraint left_expr), without the limits of a CPLEX licence.
+    lp_path : str
+        Where to export the model as LP. None skips the export.
 
-    return model, centralization_constraint
\ No newline at end of file
+    The centralization constraint returned is None for a matrix without a
+    centralization row (e.g. a subproblem of core.decomposition).
+
+    """
+    if backend == 'cplex':
+        from docplex.mp.model import Model
+
+        model = Model(name='EEP-Ran Problem', log_output=log_output)
+        return populate_model_from_matrix(model, matrix, lp_path)
+
+    if backend == 'highs':
+        model = HighsModel(matrix, log_output=log_output)
+        if lp_path is not None:
+            model_export_start = time.time()
+            model.export_as_lp(lp_path)
+            model_export_end = time.time()
+            model.build_timings['Model Export'] = model_export_end - model_export_start
+        return model, (model.row_constraints[matrix.centralization_row]
+                       if matrix.centralization_row is not None else None)
+
+    raise ValueError('Unknown solver backend {!r}, expected one of {}'.format(backend, SOLVER_BACKENDS))
+
+
+def populate_model_from_matrix(model: Model, matrix: EepranMatrix, 
+                               lp_path: str = None) -> {Model, AbstractConstraint}:
+    model.build_timings = {}
+    if matrix.build_time is not None:
+        model.build_timings['Matrix Assembly'] = matrix.build_time
+
+    var_definition_start = time.time()
+
+    names = matrix.column_names
+    x_vars = model.binary_var_list(matrix.num_x, name=names[:matrix.num_x])
+    y_vars = model.integer_var_list(matrix.num_y, 
+                                    name=names[matrix.num_x:matrix.num_x+matrix.num_y])
+    z_vars = model.integer_var_list(matrix.num_z, name=names[matrix.num_x+matrix.num_y:])
+    model.x = dict(zip(matrix.x_keys, x_vars))
+    model.y = dict(zip(matrix.y_keys, y_vars))
+    model.z = dict(zip(matrix.z_keys, z_vars))
+    model.matrix = matrix
+    columns = x_vars + y_vars + z_vars
+
+    var_definition_end = time.time()
+    logging.info('    Variables Definition: {}s'.format(var_definition_end - var_definition_start))
+    model.build_timings['Variables Definition'] = var_definition_end - var_definition_start
+
+    constraint_definition_start = time.time()
+
+    model.columns = columns
+    _set_matrix_objective(model, matrix)
+
+    constraints = model.add_constraints(_matrix_constraints(model, matrix, range(len(matrix.row_names))),
+                                        matrix.row_names)
+    model.row_constraints = constraints
+    centralization_constraint = (constraints[matrix.centralization_row]
+                                 if matrix.centralization_row is not None else None)
+
+    constraint_definition_end = time.time()
+    logging.info('    Constraints Definition: {}s'.format(constraint_definition_end - constraint_definition_start))
+    model.build_timings['Constraints Definition'] = constraint_definition_end - constraint_definition_start
+
+    if lp_path is not None:
+        model_export_start = time.time()
+        model.export_as_lp(lp_path)
+        model_export_end = time.time()
+        model.build_timings['Model Export'] = model_export_end - model_export_start
+
+    return model, centralization_constraint
+
+
+def _matrix_constraints(model: Model, matrix: EepranMatrix, rows) -> list:
+    """ :returns: The docplex constraints of rows of matrix, over model.columns. """
+    columns = model.columns
+    indptr = matrix.rows.indptr
+    indices = matrix.rows.indices.tolist()
+    data = matrix.rows.data.tolist()
+    rhs = matrix.rhs.tolist()
+    constraints = []
+    for row in rows:
+        start, end = indptr[row], indptr[row+1]
+        if start == end:
+            expression = model.linear_expr()
+        else:
+            expression = model.scal_prod_vars_all_different(
+                [columns[column] for column in indices[start:end]], data[start:end])
+
+        sense = matrix.row_senses[row]
+        if sense == EepranMatrix.LESS_EQUAL:
+            constraints.append(expression <= rhs[row])
+        elif sense == EepranMatrix.GREATER_EQUAL:
+            constraints.append(expression >= rhs[row])
+        else:
+            constraints.append(expression == rhs[row])
+    return constraints
+
+
+def _set_matrix_objective(model: Model, matrix: EepranMatrix) -> None:
+    objective_columns = numpy.flatnonzero(matrix.objective)
+    model.minimize(model.scal_prod_vars_all_different(
+        [model.columns[column] for column in objective_columns],
+        matrix.objective[objective_columns].tolist()
+    ))
+
+
+def update_model_objective(model: Model) -> None:
+    """ Push the objective of model.matrix, after it changed, into a model built from it. """
+    if isinstance(model, HighsModel):
+        model.update_objective()
+    else:
+        _set_matrix_objective(model, model.matrix)
+
+
+def update_model_loads(model: Model) -> None:
+    """
+    Push the load dependent coefficients of model.matrix (after EepranMatrix.set_loads())
+    into a model built by populate_model_from_matrix(), modifying it in place.
+    Only the objective, link capacity and processing capacity rows are touched.
+    """
+    if isinstance(model, HighsModel):
+        model.update_loads()
+        return
+
+    matrix = model.matrix
+    _set_matrix_objective(model, matrix)
+
+    for row in matrix.load_dependent_rows:
+        columns, values = matrix.get_load_dependent_terms(row)
+        model.row_constraints[row].left_expr.set_coefficients(
+            zip([model.columns[column] for column in columns], values.tolist()))
+
+
+def update_model_topology(model: Model, route_delta: RouteDelta,
+                          rebuild_fraction: float = 0.5) -> {Model, MatrixDelta}:
+    """
+    Bring a model built by this module up to date after Topology mutations (add_link(),
+    set_link_delay(), add_node_hardware(), ...) and Topology.update_routes(), without
+    building it again.
+
+    A copy of the registry of model.matrix follows route_delta (only the keys of the
+    replaced routes change), the matrix is assembled from it and compared with
+    model.matrix, and only the difference (see core.matrix.MatrixDelta) is applied to
+    the model: new columns and rows are added, removed ones deleted (docplex variables
+    cannot be deleted, they are fixed to 0 and left out of every row and of the
+    objective), changed rows and objective coefficients updated in place. Unchanged
+    variables and constraints are kept, so references to them (e.g. the
+    centralization constraint) stay valid. The base station loads of model.matrix
+    are kept.
+
+    The matrix is still assembled in full (its registry is not), only the solver
+    model is patched. An edit close to the origin replaces the routes of most base
+    stations, and applying such a delta costs more than building the model again:
+    when more than rebuild_fraction of the x columns of the new matrix are new, a new
+    model is built from it instead (with the backend of model, default solver
+    parameters and no LP export), and model is left as it was. 1.0 never rebuilds.
+
+    A matrix built with presolve is assembled from a new registry, since the pruning
+    depends on every candidate.
+
+    :returns: (the updated or the rebuilt model, the MatrixDelta between their matrices)
+    """
+    previous = model.matrix
+    topo = previous.topo
+    presolve = previous.presolve_report is not None
+
+    logging.info('Model Update:')
+    matrix_start = time.time()
+    registry = None
+    if previous.registry is not None and not presolve:
+        registry = previous.registry.copy()
+        registry.update(topo, route_delta)
+    matrix = EepranMatrix(topo, previous.centralization_cap, presolve, registry)
+    if numpy.any(previous.loads != 1.0):
+        matrix.set_loads(dict(zip(previous.x_base_station, previous.loads[:previous.num_x].tolist())))
+    delta = MatrixDelta(previous, matrix)
+    matrix_end = time.time()
+    logging.info('    Matrix Delta: {} ({}s)'.format(delta, matrix_end - matrix_start))
+
+    new_x = numpy.count_nonzero(delta.added_columns < matrix.num_x)
+    if new_x > rebuild_fraction * matrix.num_x:
+        backend = 'highs' if isinstance(model, HighsModel) else 'cplex'
+        model, _ = create_model_from_matrix(matrix, backend)
+        logging.info('    Model Rebuild: {} of {} x new ({}s)'.format(new_x, matrix.num_x,
+                                                                        time.time() - matrix_end))
+        return model, delta
+
+    if isinstance(model, HighsModel):
+        model.apply_delta(matrix, delta)
+    else:
+        _apply_matrix_delta(model, matrix, delta)
+    model_end = time.time()
+    logging.info('    Model Delta: {}s'.format(model_end - matrix_end))
+    return model, delta
+
+
+def _apply_matrix_delta(model: Model, matrix: EepranMatrix, delta: MatrixDelta) -> None:
+    previous = model.matrix
+    previous_columns = model.columns
+
+    # ----- Columns -----
+    columns = [previous_columns[column] if column >= 0 else None for column in delta.column_map.tolist()]
+    added = delta.added_columns.tolist()
+    binaries = [column for column in added if matrix.column_types[column] == 'B']
+    integers = [column for column in added if matrix.column_types[column] != 'B']
+    for new_columns, variables in (
+            (binaries, model.binary_var_list(len(binaries), name=[matrix.column_names[column]
+                                                                  for column in binaries])),
+            (integers, model.integer_var_list(len(integers), name=[matrix.column_names[column]
+                                                                   for column in integers]))):
+        for column, variable in zip(new_columns, variables):
+            columns[column] = variable
+    if len(delta.removed_columns) > 0:
+        model.change_var_upper_bounds([previous_columns[column] for column in delta.removed_columns.tolist()], 0)
+
+    model.columns = columns
+    model.x = dict(zip(matrix.x_keys, columns[:matrix.num_x]))
+    model.y = dict(zip(matrix.y_keys, columns[matrix.num_x:matrix.num_x+matrix.num_y]))
+    model.z = dict(zip(matrix.z_keys, columns[matrix.num_x+matrix.num_y:]))
+
+    # ----- Rows -----
+    constraints = [model.row_constraints[row] if row >= 0 else None for row in delta.row_map.tolist()]
+    if len(delta.removed_rows) > 0:
+        model.remove_constraints([model.row_constraints[row] for row in delta.removed_rows.tolist()])
+
+    rhs = matrix.rhs.tolist()
+    for row in delta.changed_rows.tolist():
+        new_columns, values = matrix.get_row_terms(row)
+        terms = dict(zip([columns[column] for column in new_columns.tolist()], values.tolist()))
+        previous_terms, _ = previous.get_row_terms(delta.row_map[row])
+        for column in previous_terms.tolist():
+            terms.setdefault(previous_columns[column], 0)
+        constraints[row].left_expr.set_coefficients(terms.items())
+        constraints[row].rhs = rhs[row]
+
+    added = delta.added_rows.tolist()
+    if len(added) > 0:
+        new_constraints = model.add_constraints(_matrix_constraints(model, matrix, added),
+                                                [matrix.row_names[row] for row in added])
+        for row, constraint in zip(added, new_constraints):
+            constraints[row] = constraint
+    model.row_constraints = constraints
+
+    model.matrix = matrix
+    if len(delta.added_columns) + len(delta.removed_columns) + len(delta.changed_objective) > 0:
+        _set_matrix_objective(model, matrix)
+
+
+def add_assignment_mip_start(model: Model, keys: list, 
+                             effort_level: EffortLevel = None) -> None:
+    """
+    Use an assignment (e.g. core.heuristic.solve_heuristic()['keys']) as MIP start
+    of a model built by this module. Only the x variables are given; CPLEX completes
+    the ceil variables. Keys without a variable in the model (e.g. removed by presolve)
+    are ignored. effort_level defaults to EffortLevel.Repair.
+    """
+    from docplex.mp.constants import EffortLevel
+    from docplex.mp.solution import SolveSolution
+
+    if effort_level is None:
+        effort_level = EffortLevel.Repair
+    selected = set(keys)
+    start = SolveSolution(model, {var: 1 if key in selected else 0 for key, var in model.x.items()})
+    model.add_mip_start(start, effort_level=effort_level)
@@ -0,0 +1,101 @@
+"""
+Multi-period EEP-RAN solve over the BS usage time series.
+
+The usage csv gives the usage of every node per time slot. The load of a base station
+in a slot is the usage of its node over the peak usage of that node over all slots
+(see Topology.get_base_station_loads()), so 1.0 is the static snapshot of
+core.model. The load scales linearly, base station by base station, the terms that
+follow its traffic (see EepranMatrix.set_loads()):
+
+- the transmission power of the base station (its static power is kept);
+- the crosshaul bandwidth of its route/DRC candidates: their ports in the link
+  capacity rows and the port power of the objective;
+- the CPU usage of their VNFs: their cores in the processing capacity rows and the
+  dynamic power of the hardware.
+
+The right-hand sides, the hardware static power and the ceil and centralization rows
+do not depend on the load.
+"""
+from core.model import *
+import time
+
+def solve_multi_period(topo: Topology, centralization_cap: int = 0, slots: list = None,
+                       time_limit: float = None, log_output: bool = False,
+                       backend: str = 'cplex') -> list:
+    """
+    Solve the EEP-RAN problem for each time slot of the BS usage csv.
+
+    The model is built once; every following slot only rescales the load dependent
+    coefficients in place (see EepranMatrix.set_loads()) and is solved with the
+    previous slot assignment as MIP start.
+
+    Parameters
+    ----------
+
+    topo : Topology
+        Topology with routes already generated or imported.
+    centralization_cap : int
+        Right-hand side of the centralization constraint, shared by all slots.
+    slots : list
+        Slots to solve, in order. Default: every slot of the usage csv.
+    time_limit : float
+        Solver time limit per slot [s].
+    backend : str
+        Solver backend, see core.model.create_model_from_matrix().
+
+    Returns
+    -------
+
+    A list with one dict per slot: slot, status, objective, centralization, solve_time
+    and assignment (bs_key -> (route_id, drc_id)).
+
+    """
+    if slots is None:
+        slots = list(range(topo.get_num_usage_slots()))
+    if len(slots) == 0:
+        return []
+
+    build_start = time.time()
+    matrix = build_eepran_matrix(topo, centralization_cap)
+    matrix.set_loads(topo.get_base_station_loads(slots[0]))
+    model, centralization_constraint = create_model_from_matrix(matrix, backend, log_output)
+    if time_limit is not None:
+        model.parameters.timelimit = time_limit
+    effort_level = None
+    if backend == 'cplex':
+        from docplex.mp.constants import EffortLevel
+        effort_level = EffortLevel.Repair
+    build_end = time.time()
+    logging.info('Multi-period Model Built: {}s'.format(build_end - build_start))
+
+    results = []
+    previous_solution = None
+    for idx, slot in enumerate(slots):
+        update_start = time.time()
+        if idx > 0:
+            matrix.set_loads(topo.get_base_station_loads(slot))
+            update_model_loads(model)
+
+        if previous_solution is not None:
+            model.clear_mip_starts()
+            model.add_mip_start(previous_solution, effort_level=effort_level)
+        update_end = time.time()
+
+        solution = model.solve(log_output=log_output)
+        result = {'slot': slot, 'status': model.solve_details.status, 
+                  'update_time': update_end - update_start,
+                  'solve_time': model.solve_details.time,
+                  'objective': None, 'centralization': None, 'assignment': {}}
+
+        if solution is not None:
+            result['objective'] = solution.get_objective_value()
+            result['centralization'] = solution.get_value(centralization_constraint.left_expr)
+            for key, var in model.x.items():
+                if solution.get_value(var) > 0.5:
+                    result['assignment'][key.bs_key] = (key.route_id, key.drc_id)
+            previous_solution = solution
+
+        logging.info('Slot {}: {} [w], {}s'.format(slot, result['objective'], result['solve_time']))
+        results.append(result)
+
+    return results
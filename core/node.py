@@ -6,6 +6,10 @@ class Node:
         self.base_stations = base_stations
         self.static_percentage = static_percentage
 
+        # keys are built once, they are read for every route and model row
+        self.__hardware_keys = ['node{}_hw{}'.format(number, idx) for idx in range(1, len(hardwares)+1)]
+        self.__base_station_keys = ['node{}_bs{}'.format(number, idx) for idx in range(1, len(base_stations)+1)]
+
         self.hardwares_key_to_id = {}
         for idx, value in enumerate(self.get_hardware_keys()):
             self.hardwares_key_to_id[value] = self.hardwares[idx]
@@ -25,10 +29,10 @@ class Node:
         return False
 
     def get_hardware_keys(self) -> list:
-        return ['node{}_hw{}'.format(self.number, idx) for idx in range(1, len(self.hardwares)+1)]
+        return list(self.__hardware_keys)
     
     def get_base_station_keys(self) -> list:
-        return ['node{}_bs{}'.format(self.number, idx) for idx in range(1, len(self.base_stations)+1)]
+        return list(self.__base_station_keys)
 
     def get_hardware_type_identifiers(self) -> list:
         return self.hardwares
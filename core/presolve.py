@@ -0,0 +1,174 @@
+from core.registry import *
+import time
+
+ROUTE_DOMINANCE = 'dominated_route'
+DRC_DOMINANCE = 'dominated_drc'
+
+
+class CandidateProfile:
+    """ Everything a decision variable key contributes to the EEP-RAN model. """
+
+    def __init__(self, key: DecisionVariableKey):
+        self.key = key
+        self.links = {}                 # link_key -> bandwidth
+        self.cpu = {}                   # hw_key -> cpu usage
+        self.hosts = set()              # hw_keys hosting at least one VNF
+        self.node_functions = set()     # (node, VNF) pairs hosted by the key
+        self.static_cost = 0.0
+        self.load_cost = 0.0
+
+
+def _dominates(a: CandidateProfile, b: CandidateProfile, check_centralization: bool,
+               fixed_loads: bool) -> bool:
+    """
+    Check whether a can replace b in any feasible solution without increasing the
+    objective or breaking a constraint.
+    """
+    if fixed_loads:
+        if a.static_cost + a.load_cost > b.static_cost + b.load_cost:
+            return False
+    elif a.static_cost > b.static_cost or a.load_cost > b.load_cost:
+        return False
+    if not a.hosts <= b.hosts:
+        return False
+    if check_centralization and not a.node_functions >= b.node_functions:
+        return False
+    for link_key, bandwidth in a.links.items():
+        if bandwidth > b.links.get(link_key, 0.0):
+            return False
+    for hw_key, usage in a.cpu.items():
+        if usage > b.cpu.get(hw_key, 0.0):
+            return False
+    return True
+
+
+def _prune_group(candidates: list, check_centralization: bool, fixed_loads: bool) -> list:
+    """
+    :returns: The candidates dominated by another candidate of the group. Candidates
+              dominating each other are resolved by key order (the lowest key is
+              kept), so one of them always survives.
+    """
+    dominated = []
+    for b in candidates:
+        for a in candidates:
+            if a is b or not _dominates(a, b, check_centralization, fixed_loads):
+                continue
+            if a.key > b.key and _dominates(b, a, check_centralization, fixed_loads):
+                continue
+            dominated.append(b)
+            break
+    return dominated
+
+
+def get_candidate_profiles(registry: VariableRegistry, topo: Topology, drc_dict: dict,
+                           vnf_cpu_usage: dict) -> dict:
+    """ :returns: DecisionVariableKey -> CandidateProfile, for every key of the registry. """
+    candidates = {key: CandidateProfile(key) for key in registry.keys}
+    index = topo.get_index()
+
+    for bs_key, keys in registry.by_base_station.items():
+        bs_id = index.base_station_ids[bs_key]
+        bs_static_power = float(index.base_station_static_power[bs_id])
+        bs_load_power = float(index.base_station_load_power[bs_id])
+        for key in keys:
+            relief = 1.0 - drc_dict[key.drc_id].bs_relief
+            candidates[key].static_cost += relief * bs_static_power
+            candidates[key].load_cost += relief * bs_load_power
+
+    for hw_key, entries in registry.by_hardware.items():
+        dynamic_power_per_core = float(index.hardware_dynamic_power_per_core[index.hardware_ids[hw_key]])
+        for key, functions in entries:
+            usage = sum(vnf_cpu_usage[function] for function in functions)
+            candidates[key].cpu[hw_key] = usage
+            if len(functions) > 0:
+                candidates[key].hosts.add(hw_key)
+                candidates[key].load_cost += usage * dynamic_power_per_core
+
+    for ceil_key, keys in registry.by_node_function.items():
+        for key in keys:
+            candidates[key].node_functions.add(ceil_key)
+
+    for link_key, entries in registry.by_link.items():
+        link_id = index.link_ids[link_key]
+        port_capacity = float(index.link_port_capacity[link_id])
+        port_power_consumption = float(index.link_port_power[link_id])
+        for key, bandwidth in entries:
+            usage = bandwidth / port_capacity
+            candidates[key].links[link_key] = usage
+            candidates[key].load_cost += usage * port_power_consumption
+
+    return candidates
+
+
+def prune_dominated_keys(registry: VariableRegistry, topo: Topology, drc_dict: dict,
+                         vnf_cpu_usage: dict, centralization_cap: int = None,
+                         fixed_loads: bool = False) -> dict:
+    """
+    Remove from the registry the route/DRC candidates that can never be needed
+    in an optimal solution.
+
+    Rules
+    -----
+
+    dominated_route
+        Same base station, DRC and CU/DU hardware, with a link usage at least as
+        high on every link (the same or a superset of links).
+    dominated_drc
+        Same route, with a DRC at least as expensive, using at least as much bandwidth
+        on every link and CPU on every hardware, powering on a superset of hardware
+        and, unless the centralization cap is 0, centralizing a subset of (node, VNF)
+        pairs.
+
+    Parameters
+    ----------
+
+    centralization_cap : int
+        The cap the model will be solved with. None means it may still change after
+        the build (core.sweep), so (node, VNF) pairs are always compared.
+    fixed_loads : bool
+        When the base station loads will not change after the build, DRCs are compared
+        on their total power. Otherwise (core.multiperiod) the static and the load
+        dependent power are compared separately, which holds for any load.
+
+    Returns
+    -------
+
+    A dict with the number of keys removed by each rule.
+
+    """
+    presolve_start = time.time()
+    candidates = get_candidate_profiles(registry, topo, drc_dict, vnf_cpu_usage)
+    check_centralization = centralization_cap is None or centralization_cap > 0
+    report = {ROUTE_DOMINANCE: 0, DRC_DOMINANCE: 0}
+
+    # ----- Same BS, DRC and hardware, different routes -----
+    groups = {}
+    for key in registry.keys:
+        route = topo.get_route(key.route_id)
+        groups.setdefault((key.bs_key, key.drc_id, tuple(route.sequence[:2])), []).append(candidates[key])
+
+    removed = set()
+    for group in groups.values():
+        if len(group) > 1:
+            removed.update(candidate.key for candidate in _prune_group(group, check_centralization,
+                                                                       fixed_loads))
+    report[ROUTE_DOMINANCE] = len(removed)
+
+    # ----- Same route, different DRCs -----
+    groups = {}
+    for key in registry.keys:
+        if key not in removed:
+            groups.setdefault(key.route_id, []).append(candidates[key])
+
+    for group in groups.values():
+        if len(group) > 1:
+            dominated = _prune_group(group, check_centralization, fixed_loads)
+            report[DRC_DOMINANCE] += len(dominated)
+            removed.update(candidate.key for candidate in dominated)
+
+    registry.remove_keys(removed)
+
+    presolve_end = time.time()
+    logging.info('    Presolve: {}s, removed {} of {} keys {}'.format(
+        presolve_end - presolve_start, len(removed), len(registry) + len(removed), report))
+    return report
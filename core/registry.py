@@ -0,0 +1,171 @@
+from collections import namedtuple
+import copy
+from core.topology import *
+
+DecisionVariableKey = namedtuple('DecisionVariableKey', ['route_id', 'drc_id', 'bs_key'])
+CeilVariableKey = namedtuple('CeilVariableKey', ['node_key', 'function_key'])
+
+
+class VariableRegistry:
+    """
+    Decision variable keys of the EEP-RAN model, indexed by every entity a
+    constraint family sums over.
+
+    Indexes
+    -------
+
+    by_base_station : dict
+        bs_key -> [DecisionVariableKey], the candidates of the single route constraint.
+    by_hardware : dict
+        hw_key -> [(DecisionVariableKey, functions)], where functions are the VNFs the
+        key places on that hardware (CU functions on the backhaul hardware, DU functions
+        on the midhaul hardware).
+    by_node_function : dict
+        CeilVariableKey -> [DecisionVariableKey], the keys hosting that VNF on that node.
+    by_link : dict
+        link_key -> [(DecisionVariableKey, bandwidth)], with the bandwidth of the
+        crosshaul segment that crosses the link.
+
+    All indexes are filled in a single pass over the routes, so building them is
+    linear on the number of keys. routes restricts the registry to some routes of
+    topo (default: all of them).
+    """
+
+    def __init__(self, topo: Topology, splits: list, virtual_network_functions, routes: list = None):
+        self.keys = []
+        self.ceil_keys = get_ceil_variable_keys(topo, virtual_network_functions)
+        self.by_base_station = {bs_key: [] for bs_key in topo.get_base_station_keys()}
+        self.by_hardware = {}
+        self.by_node_function = {}
+        self.by_link = {}
+
+        self.__splits = splits
+        self.__virtual_network_functions = virtual_network_functions
+        self.__cu_functions = {}
+        self.__du_functions = {}
+        for drc in splits:
+            self.__cu_functions[drc.identifier] = [f for f in virtual_network_functions if f in drc.fs_cu]
+            self.__du_functions[drc.identifier] = [f for f in virtual_network_functions if f in drc.fs_du]
+
+        self.__add_routes(topo.get_routes() if routes is None else routes)
+
+
+    def __add_routes(self, routes) -> None:
+        splits = self.__splits
+        cu_functions = self.__cu_functions
+        du_functions = self.__du_functions
+        for route in routes:
+            bs_key = route.get_target_base_station()
+            if bs_key not in self.by_base_station:
+                continue
+
+            drcs = get_route_drcs(route, splits)
+            if len(drcs) == 0:
+                continue
+
+            hardware_keys = route.get_hardware_keys()
+            backhaul_links = route.get_backhaul_links()
+            midhaul_links = route.get_midhaul_links()
+            fronthaul_links = route.get_fronthaul_links()
+            backhaul_node_key = route.get_backhaul_node_key()
+            midhaul_node_key = route.get_midhaul_node_key()
+
+            for drc in drcs:
+                key = DecisionVariableKey(route.identifier, drc.identifier, bs_key)
+                self.keys.append(key)
+                self.by_base_station[bs_key].append(key)
+
+                for hw_key in hardware_keys:
+                    functions = []
+                    if route.is_cu(hw_key):
+                        functions += cu_functions[drc.identifier]
+                    if route.is_du(hw_key):
+                        functions += du_functions[drc.identifier]
+                    self.by_hardware.setdefault(hw_key, []).append((key, functions))
+
+                if route.has_backhaul():
+                    for function in cu_functions[drc.identifier]:
+                        self.by_node_function.setdefault(
+                            CeilVariableKey(backhaul_node_key, function), []).append(key)
+                if route.has_midhaul():
+                    for function in du_functions[drc.identifier]:
+                        self.by_node_function.setdefault(
+                            CeilVariableKey(midhaul_node_key, function), []).append(key)
+
+                for link_key in backhaul_links:
+                    self.by_link.setdefault(link_key, []).append((key, drc.bandwidth_bh))
+                for link_key in midhaul_links:
+                    self.by_link.setdefault(link_key, []).append((key, drc.bandwidth_mh))
+                for link_key in fronthaul_links:
+                    self.by_link.setdefault(link_key, []).append((key, drc.bandwidth_fh))
+
+
+    def copy(self) -> 'VariableRegistry':
+        """ A registry with its own key list and indexes, so update() leaves this one intact. """
+        registry = copy.copy(self)
+        registry.keys = list(self.keys)
+        registry.ceil_keys = list(self.ceil_keys)
+        registry.by_base_station = {bs_key: list(keys) for bs_key, keys in self.by_base_station.items()}
+        registry.by_node_function = {ceil_key: list(keys) for ceil_key, keys in self.by_node_function.items()}
+        registry.by_hardware = {hw_key: list(entries) for hw_key, entries in self.by_hardware.items()}
+        registry.by_link = {link_key: list(entries) for link_key, entries in self.by_link.items()}
+        return registry
+
+
+    def update(self, topo: Topology, route_delta: RouteDelta) -> None:
+        """
+        Follow a Topology.update_routes() delta in place: the keys of removed routes
+        are dropped, the keys of added routes appended, and the base stations and
+        ceil keys taken again from topo. Keys of the other routes are untouched.
+        """
+        removed_routes = set(route_delta.removed)
+        self.remove_keys({key for key in self.keys if key.route_id in removed_routes})
+        self.by_base_station = {bs_key: self.by_base_station.get(bs_key, [])
+                                for bs_key in topo.get_base_station_keys()}
+        self.ceil_keys = get_ceil_variable_keys(topo, self.__virtual_network_functions)
+        self.__add_routes(route_delta.added)
+
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+    def remove_keys(self, removed: set) -> None:
+        """ Drop keys from the registry and from every index. """
+        if len(removed) == 0:
+            return
+
+        self.keys = [key for key in self.keys if key not in removed]
+        for bs_key, keys in self.by_base_station.items():
+            self.by_base_station[bs_key] = [key for key in keys if key not in removed]
+        for ceil_key, keys in list(self.by_node_function.items()):
+            keys = [key for key in keys if key not in removed]
+            if len(keys) > 0:
+                self.by_node_function[ceil_key] = keys
+            else:
+                del self.by_node_function[ceil_key]
+        for index in (self.by_hardware, self.by_link):
+            for entity_key, entries in list(index.items()):
+                entries = [entry for entry in entries if entry[0] not in removed]
+                if len(entries) > 0:
+                    index[entity_key] = entries
+                else:
+                    del index[entity_key]
+
+
+def get_route_drcs(route: Route, splits: list) -> list:
+    """ The DRCs of splits whose number of nodes and delay budgets route fits. """
+    num_nodes = route.qty_nodes()
+    return [drc for drc in splits
+            if drc.num_needed_nodes() == num_nodes
+            and route.delay_backhaul <= drc.delay_bh
+            and route.delay_midhaul <= drc.delay_mh
+            and route.delay_fronthaul <= drc.delay_fh]
+
+
+def get_ceil_variable_keys(topo: Topology, virtual_network_functions) -> list:
+    """ (node, VNF) pairs of the psi_2 ceil variables. """
+    return [CeilVariableKey(node_key, function_key)
+            for node_key in topo.get_node_keys()
+            for function_key in virtual_network_functions
+            if topo.get_node(node_key).has_hardware()]
@@ -1,95 +1,151 @@
 from core.node import *
+from core.link import *
+
+# Routes built without a table (e.g. by hand) share this one
+_DEFAULT_LINK_TABLE = LinkTable()
+
 
 class Route:
+    """
+    Route from the core (source) to a base station (target), split in backhaul,
+    midhaul and fronthaul.
+
+    The links of each crosshaul are kept as tuples of ids interned in a LinkTable
+    (the one of the Topology that generated the route); fronthaul, midhaul and
+    backhaul and the get_*_links() string keys are views over them. The hardware
+    and node keys at the end of each crosshaul are computed once, at construction.
+    """
+
+    __slots__ = ('identifier', 'source', 'target', 'sequence', 'delay_fronthaul', 'delay_midhaul',
+                 'delay_backhaul', 'link_table', 'fronthaul_ids', 'midhaul_ids', 'backhaul_ids',
+                 '__hardware_keys', '__endpoints', '__hash')
+
     def __init__(self, identifier: int, source: str, target: str, sequence: list, fronthaul: list,
-                 midhaul: list, backhaul: list, delay_fronthaul: float, delay_midhaul: float, delay_backhaul: float):
+                 midhaul: list, backhaul: list, delay_fronthaul: float, delay_midhaul: float, delay_backhaul: float,
+                 link_table: LinkTable = None):
         self.identifier = identifier
         self.source = source
         self.target = target
-        self.sequence = sequence
-        self.fronthaul = fronthaul
-        self.midhaul = midhaul
-        self.backhaul = backhaul
         self.delay_fronthaul = delay_fronthaul
         self.delay_midhaul = delay_midhaul
         self.delay_backhaul = delay_backhaul
 
+        self.link_table = link_table if link_table is not None else _DEFAULT_LINK_TABLE
+        self.fronthaul_ids = self.link_table.intern_all(fronthaul)
+        self.midhaul_ids = self.link_table.intern_all(midhaul)
+        self.backhaul_ids = self.link_table.intern_all(backhaul)
+
+        # (node, hardware) at the end of backhaul, midhaul and fronthaul; the sequence
+        # takes its keys from the interned links, so routes share the strings
+        links = self.link_table.links
+        self.__endpoints = tuple(links[ids[-1]] if len(ids) > 0 else (None, None)
+                                 for ids in (self.backhaul_ids, self.midhaul_ids, self.fronthaul_ids))
+        self.sequence = tuple(endpoint[1] if endpoint[1] is not None else node
+                              for endpoint, node in zip(self.__endpoints, sequence))
+        self.__hardware_keys = tuple(node for node in self.sequence[:2] if node != source)
+        self.__hash = None
+
+
+    @property
+    def fronthaul(self) -> list:
+        links = self.link_table.links
+        return [links[link_id] for link_id in self.fronthaul_ids]
+
+
+    @property
+    def midhaul(self) -> list:
+        links = self.link_table.links
+        return [links[link_id] for link_id in self.midhaul_ids]
+
+
+    @property
+    def backhaul(self) -> list:
+        links = self.link_table.links
+        return [links[link_id] for link_id in self.backhaul_ids]
+
+
+    def to_dict(self) -> dict:
+        """ The route as stored in the routes json (see Topology.export_routes()). """
+        return {'identifier': self.identifier, 'source': self.source, 'target': self.target,
+                'sequence': list(self.sequence), 'fronthaul': self.fronthaul, 'midhaul': self.midhaul,
+                'backhaul': self.backhaul, 'delay_fronthaul': self.delay_fronthaul,
+                'delay_midhaul': self.delay_midhaul, 'delay_backhaul': self.delay_backhaul}
+
 
     def __hash__(self) -> int:
-        hash_key = [j for i in (self.fronthaul + self.midhaul + self.backhaul + self.sequence) 
-                        for j in i]
-        return hash(frozenset(hash_key))
+        if self.__hash is None:
+            hash_key = [j for i in (self.fronthaul + self.midhaul + self.backhaul + list(self.sequence)) 
+                            for j in i]
+            self.__hash = hash(frozenset(hash_key))
+        return self.__hash
 
 
     def __str__(self) -> str:
         return ('{}: {} -- {}\n'.format(self.identifier, self.source, self.target) +
-                'Sequence: {}\n'.format(self.sequence) +
+                'Sequence: {}\n'.format(list(self.sequence)) +
                 'Backhaul: {}\n  - Delay: {}\n'.format(self.backhaul, self.delay_backhaul) +
                 'Midhaul: {}\n  - Delay: {}\n'.format(self.midhaul, self.delay_midhaul) +
                 'Fronthaul: {}\n  - Delay: {}'.format(self.fronthaul, self.delay_fronthaul))
 
 
     def __eq__(self, other) -> bool:
-        return (self.backhaul == other.backhaul and 
-                self.midhaul == other.midhaul and 
-                self.fronthaul == other.fronthaul and 
+        if self.link_table is not other.link_table:
+            return (self.backhaul == other.backhaul and 
+                    self.midhaul == other.midhaul and 
+                    self.fronthaul == other.fronthaul and 
+                    self.sequence == other.sequence)
+        return (self.backhaul_ids == other.backhaul_ids and 
+                self.midhaul_ids == other.midhaul_ids and 
+                self.fronthaul_ids == other.fronthaul_ids and 
                 self.sequence == other.sequence)
 
 
-    def get_all_links(self) -> bool:
-        return [str(link) for link in self.fronthaul + self.midhaul + self.backhaul]
+    def get_all_links(self) -> list:
+        keys = self.link_table.keys
+        return [keys[link_id] for link_id in self.fronthaul_ids + self.midhaul_ids + self.backhaul_ids]
 
 
     def get_fronthaul_links(self) -> list:
-        return [str(link) for link in self.fronthaul]
+        keys = self.link_table.keys
+        return [keys[link_id] for link_id in self.fronthaul_ids]
 
 
     def get_midhaul_links(self) -> list:
-        return [str(link) for link in self.midhaul]
+        keys = self.link_table.keys
+        return [keys[link_id] for link_id in self.midhaul_ids]
 
 
     def get_backhaul_links(self) -> list:
-        return [str(link) for link in self.backhaul]
+        keys = self.link_table.keys
+        return [keys[link_id] for link_id in self.backhaul_ids]
 
 
     def get_hardware_keys(self) -> list:
-        return [node for node in self.sequence[:2] if node != self.source]
+        return list(self.__hardware_keys)
 
 
     def get_backhaul_hardware_key(self) -> str:
-        if self.has_backhaul():
-            return self.backhaul[-1][1]
-        return None
+        return self.__endpoints[0][1]
 
 
     def get_backhaul_node_key(self) -> str:
-        if self.has_backhaul():
-            return self.backhaul[-1][0]
-        return None
+        return self.__endpoints[0][0]
 
 
     def get_midhaul_hardware_key(self) -> str:
-        if self.has_midhaul():
-            return self.midhaul[-1][1]
-        return None
+        return self.__endpoints[1][1]
 
 
     def get_midhaul_node_key(self) -> str:
-        if self.has_midhaul():
-            return self.midhaul[-1][0]
-        return None
+        return self.__endpoints[1][0]
 
 
     def get_fronthaul_hardware_key(self) -> str:
-        if self.has_fronthaul():
-            return self.fronthaul[-1][1]
-        return None
+        return self.__endpoints[2][1]
 
 
     def get_fronthaul_node_key(self) -> str:
-        if self.has_fronthaul():
-            return self.fronthaul[-1][0]
-        return None
+        return self.__endpoints[2][0]
 
     
     def get_target_base_station(self) -> str:
@@ -127,27 +183,27 @@ class Route:
 
 
     def has_fronthaul(self) -> bool:
-        return len(self.fronthaul) > 0
+        return len(self.fronthaul_ids) > 0
 
 
     def has_midhaul(self) -> bool:
-        return len(self.midhaul) > 0
+        return len(self.midhaul_ids) > 0
 
 
     def has_backhaul(self) -> bool:
-        return len(self.backhaul) > 0
+        return len(self.backhaul_ids) > 0
 
 
     def is_fronthaul(self, link: str) -> bool:
-        return link in [str(link) for link in self.fronthaul]
+        return self.link_table.ids.get(link) in self.fronthaul_ids
 
 
     def is_midhaul(self, link: str) -> bool:
-        return link in [str(link) for link in self.midhaul]
+        return self.link_table.ids.get(link) in self.midhaul_ids
 
 
     def is_backhaul(self, link: str) -> bool:
-        return link in [str(link) for link in self.backhaul]
+        return self.link_table.ids.get(link) in self.backhaul_ids
 
 
     def is_destination(self, ru: str) -> bool:
@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import numpy
+from core.route import *
+
+
+# ----- JSON Routes -----
+
+def write_routes_json(routes, path: str) -> int:
+    """
+    Write routes (any iterable) as a json list, one record at a time.
+
+    :returns: The number of routes written.
+    """
+    num_routes = 0
+    with open(path, 'w') as route_file:
+        route_file.write('[\n')
+        for route in routes:
+            if num_routes > 0:
+                route_file.write(',')
+            route_file.write(json.dumps(route.to_dict(), indent=4))
+            num_routes += 1
+        route_file.write('\n]')
+    return num_routes
+
+
+def read_routes_json(path: str, link_table: LinkTable = None) -> list:
+    with open(path, 'r') as route_file:
+        records = json.load(route_file)
+
+    routes = []
+    for record in records:
+        fronthaul = [(link[0], link[1]) for link in record['fronthaul']]
+        midhaul = [(link[0], link[1]) for link in record['midhaul']]
+        backhaul = [(link[0], link[1]) for link in record['backhaul']]
+        routes.append(Route(record['identifier'], record['source'], record['target'],
+                            record['sequence'], fronthaul, midhaul, backhaul,
+                            record['delay_fronthaul'], record['delay_midhaul'], record['delay_backhaul'],
+                            link_table))
+    return routes
+
+
+# ----- Columnar Routes -----
+
+class RouteStore:
+    """
+    Routes stored column by column in a directory of .npy files, loaded memory
+    mapped (nothing is parsed until a route is built).
+
+    Files
+    -----
+
+    identifiers.npy : int64 [routes]
+    delays.npy : float64 [routes, 3]
+        Fronthaul, midhaul and backhaul delay.
+    endpoints.npy : int32 [routes, 5]
+        Source, target and the three keys of the sequence, as indexes of nodes.
+    route_segments.npy : int32 [routes, 3]
+        Fronthaul, midhaul and backhaul, as indexes of the segment table; equal
+        crosshauls of different routes are stored once.
+    segment_offsets.npy : int64 [segments + 1]
+        Segment s is link_pool[segment_offsets[s]:segment_offsets[s+1]].
+    link_pool.npy : int32
+        Links of all segments, as indexes of links.
+    links.npy : int32 [links, 2]
+        Both ends of each link, as indexes of nodes.
+    nodes.npy : unicode [nodes]
+        Node, hardware and base station keys.
+    """
+
+    COLUMNS = ('identifiers', 'delays', 'endpoints', 'route_segments', 'segment_offsets',
+               'link_pool', 'links', 'nodes')
+
+    def __init__(self, path: str, mmap: bool = True):
+        self.path = path
+        mmap_mode = 'r' if mmap else None
+        for column in RouteStore.COLUMNS:
+            setattr(self, column, numpy.load(os.path.join(path, column + '.npy'), mmap_mode=mmap_mode))
+
+
+    def __len__(self) -> int:
+        return len(self.identifiers)
+
+
+    def iter_routes(self, link_table: LinkTable = None):
+        """ Build the stored routes, in order, interning their links in link_table. """
+        nodes = self.nodes.tolist()
+        links = [(nodes[first], nodes[second]) for first, second in self.links.tolist()]
+        link_pool = self.link_pool.tolist()
+        offsets = self.segment_offsets.tolist()
+        segments = [[links[link] for link in link_pool[offsets[segment]:offsets[segment+1]]]
+                    for segment in range(len(offsets) - 1)]
+
+        for identifier, delays, endpoints, route_segments in zip(
+                self.identifiers.tolist(), self.delays.tolist(),
+                self.endpoints.tolist(), self.route_segments.tolist()):
+            fronthaul, midhaul, backhaul = (segments[segment] for segment in route_segments)
+            # an empty crosshaul has no delay (the integer 0 of a generated route)
+            yield Route(identifier, nodes[endpoints[0]], nodes[endpoints[1]],
+                        [nodes[node] for node in endpoints[2:]], fronthaul, midhaul, backhaul,
+                        delays[0] if len(fronthaul) > 0 else 0, delays[1] if len(midhaul) > 0 else 0,
+                        delays[2] if len(backhaul) > 0 else 0, link_table)
+
+
+def write_route_store(routes, path: str) -> int:
+    """
+    Write routes (any iterable) to a RouteStore directory, creating it if needed.
+
+    :returns: The number of routes written.
+    """
+    node_index = {}
+    link_index = {}
+    segment_index = {}
+    link_pool = []
+    segment_offsets = [0]
+    identifiers = []
+    delays = []
+    endpoints = []
+    route_segments = []
+
+    def node(key: str) -> int:
+        return node_index.setdefault(key, len(node_index))
+
+    def segment(links: list) -> int:
+        links = tuple(links)
+        index = segment_index.get(links)
+        if index is None:
+            index = segment_index[links] = len(segment_index)
+            for link in links:
+                link_pool.append(link_index.setdefault(link, len(link_index)))
+            segment_offsets.append(len(link_pool))
+        return index
+
+    for route in routes:
+        identifiers.append(route.identifier)
+        delays.append((route.delay_fronthaul, route.delay_midhaul, route.delay_backhaul))
+        endpoints.append([node(route.source), node(route.target)] + [node(key) for key in route.sequence])
+        route_segments.append((segment(route.fronthaul), segment(route.midhaul), segment(route.backhaul)))
+
+    links = [(node(first), node(second)) for first, second in link_index]
+    columns = {
+        'identifiers': numpy.array(identifiers, dtype=numpy.int64),
+        'delays': numpy.array(delays, dtype=numpy.float64).reshape(-1, 3),
+        'endpoints': numpy.array(endpoints, dtype=numpy.int32).reshape(-1, 5),
+        'route_segments': numpy.array(route_segments, dtype=numpy.int32).reshape(-1, 3),
+        'segment_offsets': numpy.array(segment_offsets, dtype=numpy.int64),
+        'link_pool': numpy.array(link_pool, dtype=numpy.int32),
+        'links': numpy.array(links, dtype=numpy.int32).reshape(-1, 2),
+        'nodes': numpy.array(list(node_index), dtype=numpy.str_),
+    }
+
+    os.makedirs(path, exist_ok=True)
+    for column in RouteStore.COLUMNS:
+        numpy.save(os.path.join(path, column + '.npy'), columns[column])
+    return len(identifiers)
+
+
+# ----- Conversion -----
+
+def convert_routes_json_to_store(json_path: str, store_path: str) -> int:
+    return write_route_store(read_routes_json(json_path), store_path)
+
+
+def convert_route_store_to_json(store_path: str, json_path: str) -> int:
+    return write_routes_json(RouteStore(store_path).iter_routes(), json_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert routes between the json and the columnar (.npy) format.')
+    parser.add_argument('source', help='A routes json file or a route store directory.')
+    parser.add_argument('destination')
+    args = parser.parse_args()
+
+    if os.path.isdir(args.source):
+        num_routes = convert_route_store_to_json(args.source, args.destination)
+    else:
+        num_routes = convert_routes_json_to_store(args.source, args.destination)
+    print('{} routes: {} -> {}'.format(num_routes, args.source, args.destination))
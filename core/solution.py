@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+from core.evaluator import *
+from core.highs import *
+
+SOLUTION_TABLES = ('placement', 'hardware', 'links', 'centralization')
+
+
+def get_column_values(model) -> numpy.ndarray:
+    """ :returns: The values of all matrix columns in the solution of model, read in one call. """
+    solution = model.solution
+    if solution is None:
+        raise ValueError('The model has no solution')
+    if isinstance(solution, HighsSolution):
+        return numpy.array(solution.column_values, dtype=float)
+    return numpy.asarray(solution.get_values(model.columns), dtype=float)
+
+
+def extract_solution(model, evaluator: SolutionEvaluator = None) -> dict:
+    """
+    Tables of the solution of a model built from an EepranMatrix (any backend).
+
+    The column values are read in one call and only the selected x, powered y and
+    used z are kept; loads, capacities and power come from the candidate tables of
+    evaluator (built from model.matrix if None), routes and DRCs are joined once per
+    base station.
+
+    Tables
+    ------
+
+    placement : one row per base station
+        base_station, route, drc, cu, du (end of backhaul and midhaul, as in the
+        route sequence), fs_cu and fs_du (the VNFs, comma separated), delay_backhaul,
+        delay_midhaul, delay_fronthaul, base_station_power, dynamic_power, link_power.
+    hardware : one row per hardware powered or hosting VNFs
+        hardware, node, powered (y), hosted_functions, cpu_usage, cpu_cores,
+        cpu_utilisation, static_power, dynamic_power.
+    links : one row per link carrying traffic
+        link, node1, node2, ports (bandwidth over port capacity), max_ports,
+        utilisation, power.
+    centralization : one row per hosted (node, VNF) pair
+        node, function, hosted (number of base stations), z.
+
+    :returns: {'summary': {objective, centralization, status, solve_time},
+               table: {column: numpy.ndarray}}
+    """
+    matrix = model.matrix
+    topo = matrix.topo
+    index = topo.get_index()
+    if evaluator is None:
+        evaluator = SolutionEvaluator(matrix)
+
+    values = get_column_values(model)
+    num_x, num_y = matrix.num_x, matrix.num_y
+    selected = numpy.flatnonzero(values[:num_x] > 0.5)
+    y_values = numpy.rint(values[num_x:num_x+num_y])
+    z_values = numpy.rint(values[num_x+num_y:])
+
+    # ----- Placement -----
+    keys = [matrix.x_keys[column] for column in selected.tolist()]
+    routes = [topo.get_route(key.route_id) for key in keys]
+    drcs = numpy.array([key.drc_id for key in keys], dtype=numpy.int64)
+    drc_position = numpy.zeros(max(drc.identifier for drc in matrix.splits) + 1, dtype=numpy.int64)
+    drc_position[[drc.identifier for drc in matrix.splits]] = numpy.arange(len(matrix.splits))
+    fs_cu = numpy.array([','.join(drc.fs_cu) for drc in matrix.splits], dtype=numpy.str_)
+    fs_du = numpy.array([','.join(drc.fs_du) for drc in matrix.splits], dtype=numpy.str_)
+    placement = {
+        'base_station': numpy.array([key.bs_key for key in keys], dtype=numpy.str_),
+        'route': numpy.array([key.route_id for key in keys], dtype=numpy.int64),
+        'drc': drcs,
+        'cu': numpy.array([route.sequence[0] for route in routes], dtype=numpy.str_),
+        'du': numpy.array([route.sequence[1] for route in routes], dtype=numpy.str_),
+        'fs_cu': fs_cu[drc_position[drcs]],
+        'fs_du': fs_du[drc_position[drcs]],
+        'delay_backhaul': numpy.array([route.delay_backhaul for route in routes], dtype=float),
+        'delay_midhaul': numpy.array([route.delay_midhaul for route in routes], dtype=float),
+        'delay_fronthaul': numpy.array([route.delay_fronthaul for route in routes], dtype=float),
+        'base_station_power': evaluator.base_station_power[selected],
+        'dynamic_power': evaluator.dynamic_power[selected],
+        'link_power': evaluator.link_power[selected],
+    }
+
+    # ----- Hardware -----
+    def column_sums(table: scipy.sparse.csr_matrix) -> numpy.ndarray:
+        return numpy.asarray(table[selected].sum(axis=0)).reshape(-1)
+
+    cpu_usage = numpy.zeros(index.num_hardwares)
+    cpu_usage[evaluator.cpu_hardware_ids] = column_sums(evaluator.cpu_usage)
+    powered = numpy.zeros(index.num_hardwares)
+    powered[evaluator.hardware_ids] = y_values
+    hosted_functions = numpy.zeros(index.num_hardwares, dtype=numpy.int64)
+    hosted_functions[evaluator.hardware_ids] = column_sums(evaluator.hosted_functions)
+    static_power = numpy.zeros(index.num_hardwares)
+    static_power[evaluator.hardware_ids] = evaluator.hardware_static_power
+
+    hardware = numpy.flatnonzero((powered > 0) | (cpu_usage > 0))
+    node_keys = numpy.array(index.node_keys, dtype=numpy.str_)
+    hardware_table = {
+        'hardware': numpy.array(index.hardware_keys, dtype=numpy.str_)[hardware],
+        'node': node_keys[index.hardware_node[hardware]],
+        'powered': powered[hardware],
+        'hosted_functions': hosted_functions[hardware],
+        'cpu_usage': cpu_usage[hardware],
+        'cpu_cores': index.hardware_cpu_cores[hardware],
+        'cpu_utilisation': cpu_usage[hardware] / index.hardware_cpu_cores[hardware],
+        'static_power': powered[hardware] * static_power[hardware],
+        'dynamic_power': cpu_usage[hardware] * index.hardware_dynamic_power_per_core[hardware],
+    }
+
+    # ----- Links -----
+    ports = column_sums(evaluator.link_ports)
+    used = numpy.flatnonzero(ports > 0)
+    link_ids = evaluator.link_ids[used]
+    link_keys = [index.link_keys[link_id] for link_id in link_ids.tolist()]
+    link_nodes = [topo.get_link(link_key) for link_key in link_keys]
+    links_table = {
+        'link': numpy.array(link_keys, dtype=numpy.str_),
+        'node1': numpy.array([link.node1 for link in link_nodes], dtype=numpy.str_),
+        'node2': numpy.array([link.node2 for link in link_nodes], dtype=numpy.str_),
+        'ports': ports[used],
+        'max_ports': evaluator.max_ports[used],
+        'utilisation': ports[used] / evaluator.max_ports[used],
+        'power': ports[used] * index.link_port_power[link_ids],
+    }
+
+    # ----- Centralization -----
+    hosted = column_sums(evaluator.hosted_pairs)
+    pairs = numpy.flatnonzero(hosted > 0)
+    centralization_table = {
+        'node': numpy.array([matrix.z_keys[pair].node_key for pair in pairs.tolist()], dtype=numpy.str_),
+        'function': numpy.array([matrix.z_keys[pair].function_key for pair in pairs.tolist()],
+                                dtype=numpy.str_),
+        'hosted': hosted[pairs],
+        'z': z_values[pairs],
+    }
+
+    summary = {
+        'objective': model.solution.get_objective_value(),
+        'centralization': int(hosted.sum() - z_values.sum()),
+        'status': str(model.solve_details.status) if model.solve_details is not None else None,
+        'solve_time': model.solve_details.time if model.solve_details is not None else None,
+    }
+    return {'summary': summary, 'placement': placement, 'hardware': hardware_table,
+            'links': links_table, 'centralization': centralization_table}
+
+
+# ----- Solution Store -----
+
+def write_solution_store(solution: dict, path: str) -> None:
+    """
+    Write the tables of extract_solution() to the directory path: one directory per
+    table with one .npy file per column (strings as fixed width unicode), and the
+    summary as summary.json.
+    """
+    for table in SOLUTION_TABLES:
+        table_path = os.path.join(path, table)
+        os.makedirs(table_path, exist_ok=True)
+        for column, values in solution[table].items():
+            numpy.save(os.path.join(table_path, column + '.npy'), values)
+    with open(os.path.join(path, 'summary.json'), 'w') as summary_file:
+        json.dump(solution['summary'], summary_file)
+
+
+def read_solution_store(path: str, mmap: bool = True) -> dict:
+    """ Read a directory written by write_solution_store(), columns memory mapped. """
+    mmap_mode = 'r' if mmap else None
+    solution = {}
+    for table in SOLUTION_TABLES:
+        table_path = os.path.join(path, table)
+        solution[table] = {name[:-len('.npy')]: numpy.load(os.path.join(table_path, name), mmap_mode=mmap_mode)
+                           for name in sorted(os.listdir(table_path)) if name.endswith('.npy')}
+    with open(os.path.join(path, 'summary.json'), 'r') as summary_file:
+        solution['summary'] = json.load(summary_file)
+    return solution
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarize a solution store written by write_solution_store().')
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    solution = read_solution_store(args.path)
+    print(json.dumps(solution['summary']))
+    for table in SOLUTION_TABLES:
+        columns = solution[table]
+        num_rows = len(next(iter(columns.values()))) if len(columns) > 0 else 0
+        print('{}: {} rows ({})'.format(table, num_rows, ', '.join(columns)))
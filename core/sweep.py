@@ -0,0 +1,122 @@
+from core.model import *
+import concurrent.futures
+import math
+import os
+import time
+
+# ----- Worker state, one model per process -----
+_worker_model = None
+_worker_centralization_constraint = None
+
+
+def _init_worker(topo: Topology, threads: int, time_limit: float, backend: str) -> None:
+    global _worker_model, _worker_centralization_constraint
+
+    logging.getLogger().setLevel(logging.WARNING)
+    matrix = build_eepran_matrix(topo)
+    _worker_model, _worker_centralization_constraint = create_model_from_matrix(matrix, backend)
+    _worker_model.parameters.threads = threads
+    if time_limit is not None:
+        _worker_model.parameters.timelimit = time_limit
+
+
+def _solve_cap(centralization_cap: int) -> dict:
+    _worker_centralization_constraint.rhs = centralization_cap
+    solution = _worker_model.solve()
+
+    result = {'cap': centralization_cap, 'status': _worker_model.solve_details.status,
+              'solve_time': _worker_model.solve_details.time,
+              'objective': None, 'centralization': None}
+    if solution is not None:
+        result['objective'] = solution.get_objective_value()
+        result['centralization'] = solution.get_value(_worker_centralization_constraint.left_expr)
+    return result
+
+
+def _interval_priority(left: dict, right: dict) -> float:
+    if left['objective'] is None and right['objective'] is None:
+        return 0.0
+    if left['objective'] is None or right['objective'] is None:
+        return math.inf
+    return abs(right['objective'] - left['objective'])
+
+
+def sweep_centralization(topo: Topology, caps: list = None, num_points: int = 16,
+                         workers: int = None, threads_per_worker: int = 1,
+                         time_limit: float = None, backend: str = 'cplex') -> list:
+    """
+    Solve the EEP-RAN problem for several centralization caps in a process pool.
+
+    Every worker receives the loaded topology and routes once, builds the model once
+    and only changes the right-hand side of the centralization constraint between solves.
+
+    Parameters
+    ----------
+
+    topo : Topology
+        Topology with routes already generated or imported.
+    caps : list
+        Centralization caps to solve. If None, caps are chosen by adaptive bisection
+        between 0 and the maximum centralization, refining first the intervals with
+        the largest objective change (or a feasibility change).
+    num_points : int
+        Number of caps solved by the adaptive bisection.
+    workers : int
+        Number of worker processes. Default: cpu count / threads_per_worker.
+    threads_per_worker : int
+        CPLEX threads of each worker, so workers do not oversubscribe the cores.
+    time_limit : float
+        Solver time limit per cap [s].
+    backend : str
+        Solver backend, see core.model.create_model_from_matrix(). With 'highs' the
+        workers need no CPLEX licence.
+
+    Returns
+    -------
+
+    The solved caps sorted by cap, each one a dict with cap, status, objective,
+    centralization, solve_time and dominated (True when another cap reaches at least
+    the same centralization with a lower objective).
+
+    """
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+    sweep_start = time.time()
+    results = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                initargs=(topo, threads_per_worker,
+                                                          time_limit, backend)) as executor:
+        if caps is not None:
+            for result in executor.map(_solve_cap, caps):
+                results[result['cap']] = result
+        else:
+            maximum_centralization = (len(package_drc.get_vnf_dict()) *
+                                      len(topo.get_base_station_keys()))
+            pending = [0, maximum_centralization]
+            while len(pending) > 0:
+                for result in executor.map(_solve_cap, pending):
+                    results[result['cap']] = result
+
+                budget = num_points - len(results)
+                if budget <= 0:
+                    break
+
+                solved = sorted(results)
+                intervals = [(_interval_priority(results[left], results[right]), left, right)
+                             for left, right in zip(solved, solved[1:]) if right - left > 1]
+                intervals = [interval for interval in intervals if interval[0] > 0]
+                intervals.sort(reverse=True)
+                pending = [(left + right) // 2 for _, left, right in intervals[:min(budget, workers)]]
+
+    table = [results[cap] for cap in sorted(results)]
+    for row in table:
+        row['dominated'] = row['objective'] is None or any(
+            other is not row and other['objective'] is not None
+            and other['centralization'] >= row['centralization']
+            and other['objective'] < row['objective']
+            for other in table)
+
+    sweep_end = time.time()
+    logging.info('Centralization Sweep: {} caps, {}s'.format(len(table), sweep_end - sweep_start))
+    return table
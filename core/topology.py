@@ -1,17 +1,26 @@
 import json
-import pandas
-import itertools
-import re
+import numpy
+from collections import namedtuple
+import concurrent.futures
+import functools
+import hashlib
 import logging
 import time
 from core.link import *
 from core.graph import *
 from core.node import *
-from core.route import *
+from core.index import *
+from core.routestore import *
+from core.usage import *
+import core.drc as package_drc
+
+# Routes replaced by Topology.update_routes(): identifiers of the removed routes, added Routes
+RouteDelta = namedtuple('RouteDelta', ['removed', 'added'])
 
 class Topology:
     def __init__(self, usage_csv: str):
-        self.__usage_df = pandas.read_csv(usage_csv)
+        # read on first use (see core.usage), a csv or a directory of convert_usage_csv()
+        self.__usage = BaseStationUsage(usage_csv)
         self.__base_station_keys = None
         self.__base_stations = {}
         self.__node_levels = {}
@@ -21,197 +30,136 @@ class Topology:
         self.__routes = []
         self.__id_to_route = {}
         self.__links = None
+        self.__link_table = LinkTable()
         self.__graph = None
+        self.__index = None
+        self.__route_origin = None
+        self.__route_shortest_paths = False
+        self.__stale_base_stations = set()
 
 
-    def __process_links_from_generator(self, node_names: list, port_capacities: list,
+    def __process_links_from_generator(self, links: numpy.ndarray, node_names: list, port_capacities: list,
                                  num_links: list, delays: list, 
                                  pluggable_transceivers_power_consumption: list,
                                  switch_ports_power_consumption: list) -> None:
-        # Sorting the values guarantee that we find all links from a level before changing to 
-        # next in one iteration over links_df
-        self.__links_df.sort_values(by=self.__links_df.columns[0], inplace=True)
-
-        # Parameter values will be attributed according 
-        # to node level in the hierarchical topology
-        self.__node_levels = {0: [0], 1: []}
-        current_node_level = 1
-        for idx, row in self.__links_df.iterrows():
-            upper_node_level = self.__node_levels[current_node_level-1]
-            if row.values[0] not in upper_node_level:
-                # -- We changed level --
-                current_node_level += 1
-                upper_node_level = self.__node_levels[current_node_level-1]
-                self.__node_levels[current_node_level] = []
-
-            # -- We are in current level --
-            # Adding destination node to current level list
-            self.__node_levels[current_node_level].append([node for node in row.values 
-                                                                 if node not in upper_node_level])
-
-            # Adding new link to the list
-            capacity_idx = min(current_node_level-1, len(port_capacities)-1)
-            num_links_idx = min(current_node_level-1, len(num_links)-1)
-            delay_idx = min(current_node_level-1, len(delays)-1)
-            ptpc_idx = min(current_node_level-1, len(pluggable_transceivers_power_consumption)-1)
-            sppc_idx = min(current_node_level-1, len(switch_ports_power_consumption)-1)
-            new_link = Link(port_capacities[capacity_idx], num_links[num_links_idx], 
-                            delays[delay_idx], node_names[row[0]], True, 
-                            node_names[row[1]], True,
-                            pluggable_transceivers_power_consumption[ptpc_idx],
-                            switch_ports_power_consumption[sppc_idx])
-
-            link_key_1 = (node_names[row[0]], node_names[row[1]])
-            link_key_2 = (node_names[row[1]], node_names[row[0]])
-
-            self.__links[str(link_key_1)] = new_link
-            self.__links[str(link_key_2)] = new_link
+        """
+        Create the links of a generator csv, given as an int array [links, 2] of node
+        numbers. Parameters are picked by the level of the link, the BFS depth from
+        node 0 of its deeper end (core links are level 1); levels past the end of a
+        parameter list take its last value.
+        """
+        import scipy.sparse
+
+        # Rows sorted by upper node, so links are added level by level as before
+        links = links[numpy.argsort(links[:, 0], kind='stable')]
+        num_nodes = int(links.max()) + 1 if len(links) > 0 else 1
+        adjacency = scipy.sparse.coo_matrix((numpy.ones(2 * len(links), dtype=numpy.int8),
+                                             (numpy.concatenate((links[:, 0], links[:, 1])),
+                                              numpy.concatenate((links[:, 1], links[:, 0])))),
+                                            shape=(num_nodes, num_nodes)).tocsr()
+
+        # ----- Node Levels (BFS) -----
+        depth = numpy.full(num_nodes, -1, dtype=numpy.int64)
+        depth[0] = 0
+        frontier = numpy.array([0])
+        self.__node_levels = {0: [0]}
+        while len(frontier) > 0:
+            neighbours = adjacency[frontier].indices
+            frontier = numpy.unique(neighbours[depth[neighbours] < 0])
+            if len(frontier) > 0:
+                depth[frontier] = len(self.__node_levels)
+                self.__node_levels[len(self.__node_levels)] = frontier.tolist()
+        # links out of reach of node 0 take the parameters of the deepest level
+        depth[depth < 0] = num_nodes
+
+        # ----- Link Table -----
+        levels = numpy.maximum(depth[links[:, 0]], depth[links[:, 1]])
+
+        def by_level(values: list) -> list:
+            return [values[idx] for idx in numpy.minimum(levels - 1, len(values) - 1).tolist()]
+
+        names = [(node_names[first], node_names[second]) for first, second in links.tolist()]
+        for (name1, name2), capacity, ports, delay, ptpc, sppc in zip(
+                names, by_level(port_capacities), by_level(num_links), by_level(delays),
+                by_level(pluggable_transceivers_power_consumption), by_level(switch_ports_power_consumption)):
+            new_link = Link(capacity, ports, delay, name1, True, name2, True, ptpc, sppc)
+            self.__links[str((name1, name2))] = new_link
+            self.__links[str((name2, name1))] = new_link
             
 
     def __process_links_from_nodes(self) -> None:
         for key in self.__nodes.keys():
-            node = self.__nodes[key]
-            if not node.has_base_station():
-                continue
-            
-            for hw in node.get_hardware_keys():
-                link_key_1 = (key, hw)
-                link_key_2 = (hw, key)
-                new_link = Link(10, 8, 0.0, key, True, hw, False, 10.0, 4.2)
-                self.__links[str(link_key_1)] = new_link
-                self.__links[str(link_key_2)] = new_link
-            
-            for bs in node.get_base_station_keys():
-                link_key_1 = (key, bs)
-                link_key_2 = (bs, key)
-                new_link = Link(10, 8, 0.0, key, True, bs, False, 10.0, 4.2)
-                self.__links[str(link_key_1)] = new_link
-                self.__links[str(link_key_2)] = new_link
+            self.__process_node_links(key)
 
 
-    def __construct_graph(self) -> None:
-        self.__graph = Graph()
-
-        links = set(link for link in self.__links.values())
-        for link in links:
-            self.__graph.add_edge(link.node1, link.node2, link.delay)
+    def __process_node_links(self, key: str) -> None:
+        """ Link a node to its hardware and base stations (only nodes with base stations). """
+        node = self.__nodes[key]
+        if not node.has_base_station():
+            return
 
-    
-    def __find_crosshaul_routes(self, path: list) -> list:
-        """
-        Generates routes for all possible combinations of crosshaul of the given path.
-        """
-        # Converting Nodes to Indexes
-        # Example:
-        #   ['node1', 'node2', 'node4', 'node5'] -> [0, 1, 2, 3]
-        path_indexes = [idx for idx, _ in enumerate(path)]
-
-        # Size 2 combinations in chain format
-        # Example:
-        #   [0, 1, 2, 3] -> [(0, 1), (1, 2), (2, 3)]
-        subsets = [subset for subset in itertools.combinations(path_indexes, 2)
-                        if subset[1] - subset[0] == 1]
-
-        # All combinations of the subsets
-        # Example:
-        #   [(0, 1), (1, 2), (2, 3)] -> [[(0, 1)], [(1, 2)], ..., [(0, 1), (1, 2)],
-        #    [(0, 1), (2, 3)], ..., [(0, 1), (1, 2), (2, 3)]]
-        subsets = [list(subset) for L in range(len(subsets)+1) 
-                        for subset in itertools.combinations(subsets, L)]
-        subsets = subsets[1:]
-
-        # Get only the subsets that forms a chain
-        # Example:
-        # [[(0, 1)], [(1, 2)], ..., [(0, 1), (1, 2)], [(1, 2), (2, 3)], 
-        #  ..., [(1, 2), (2, 3), (3, 4)], [(0, 1), (1, 2), (2, 3), (3, 4)]]
-        chained_subsets = []
-        for subset in subsets:
-            should_remain = True
-            for idx in range(len(subset)-1):
-                if(subset[idx][-1] != subset[idx+1][0]):
-                    should_remain = False
-            if should_remain:
-                chained_subsets.append(subset)
-
-        # Combine chained subsets into paths from start to end
-        # Example:
-        #   path_len_2 = [[(0, 1)], [(1, 2), (2, 3), (3, 4)]]
-        #   path_len_3 = [[(0, 1)], [(1, 2), (2, 3)], [(3, 5)]]
-        routes_len_1 = [[route] for route in chained_subsets if len(route) == len(path)-1]
-        routes_len_2 = []
-        routes_len_3 = []
-        for subset_a in chained_subsets:
-            for subset_b in chained_subsets:
-                if (subset_a[-1][-1] == subset_b[0][0] and 
-                        len(subset_a) + len(subset_b) == len(path)-1):
-                    routes_len_2.append([subset_a, subset_b])
-                for subset_c in chained_subsets:
-                    if (subset_a[-1][-1] == subset_b[0][0] and 
-                            subset_b[-1][-1] == subset_c[0][0] and
-                            len(subset_a) + len(subset_b) + len(subset_c) == len(path)-1):
-                        routes_len_3.append([subset_a, subset_b, subset_c])
-
-        # Converting Indexes back to Nodes
-        routes_len_1 = [[[(path[i], path[j]) for i, j in xhaul] 
-                            for xhaul in route] for route in routes_len_1]
-        routes_len_2 = [[[(path[i], path[j]) for i, j in xhaul] 
-                            for xhaul in route] for route in routes_len_2]
-        routes_len_3 = [[[(path[i], path[j]) for i, j in xhaul] 
-                            for xhaul in route] for route in routes_len_3]
+        for hw in node.get_hardware_keys():
+            link_key_1 = (key, hw)
+            link_key_2 = (hw, key)
+            new_link = Link(10, 8, 0.0, key, True, hw, False, 10.0, 4.2)
+            self.__links[str(link_key_1)] = new_link
+            self.__links[str(link_key_2)] = new_link
         
-        return routes_len_3 + routes_len_2 + routes_len_1
+        for bs in node.get_base_station_keys():
+            link_key_1 = (key, bs)
+            link_key_2 = (bs, key)
+            new_link = Link(10, 8, 0.0, key, True, bs, False, 10.0, 4.2)
+            self.__links[str(link_key_1)] = new_link
+            self.__links[str(link_key_2)] = new_link
 
-    
-    def __process_crosshaul_routes(self, routes: list) -> list:
+
+    def __remove_node_links(self, key: str) -> None:
+        """ Remove the links of a node to its hardware and base stations. """
+        node = self.__nodes[key]
+        for end in node.get_hardware_keys() + node.get_base_station_keys():
+            self.__links.pop(str((key, end)), None)
+            self.__links.pop(str((end, key)), None)
+
+
+    def __check_link_orientation(self, core: str) -> None:
         """
-        Make all crosshauls (except Fronthaul) of each route end in a hardware, 
-        and set empty list for suppressed crosshauls.
+        Check that every link goes from node1, towards the core, to node2, one hop
+        further from it: routes are only generated from node1 to node2 and the
+        mutations (see __descendant_base_stations()) rely on it.
         """
+        links = {id(link): link for link in self.__links.values()}.values()
+        neighbours = {}
+        for link in links:
+            neighbours.setdefault(link.node1, []).append(link.node2)
+            neighbours.setdefault(link.node2, []).append(link.node1)
+
+        # hops from the core; links out of its reach are not checked
+        depth = {core: 0}
+        frontier = [core]
+        while frontier:
+            next_frontier = []
+            for vertex in frontier:
+                for neighbour in neighbours.get(vertex, []):
+                    if neighbour not in depth:
+                        depth[neighbour] = depth[vertex] + 1
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
 
-        # Midhaul
-        for route in routes.copy():
-            if len(route) < 2:
-                continue
-            
-            routes.remove(route)
-
-            midhaul = route[-2]
-            endpoint_node_key = midhaul[-1][-1]
-            endpoint_node = self.__nodes[endpoint_node_key]
-            for hw in endpoint_node.get_hardware_keys():
-                new_route = route.copy()
-                new_route[-2] = midhaul + [(endpoint_node_key, hw)]
-                routes.append(new_route)
-        
-        # Backhaul
-        for route in routes.copy():
-            if len(route) < 3:
-                continue
+        for link in links:
+            if link.node1 in depth and depth[link.node1] >= depth[link.node2]:
+                raise ValueError('Link {} -> {} does not point away from the core {}'.format(
+                    link.node1, link.node2, core))
 
-            routes.remove(route)
-            
-            backhaul = route[-3]
-            endpoint_node_key = backhaul[-1][-1]
-            endpoint_node = self.__nodes[endpoint_node_key]
-            for hw in endpoint_node.get_hardware_keys():
-                new_route = route.copy()
-                new_route[-3] = backhaul + [(endpoint_node_key, hw)]
-                routes.append(new_route)
-
-        # Empty Crosshauls
-        for route in routes.copy():
-            if len(route) < 2:
-                routes.remove(route)
-                new_route = [[], [], route[-1]]
-                routes.append(new_route)
-            elif len(route) < 3:
-                routes.remove(route)
-                new_route = [[], route[-2], route[-1]]
-                routes.append(new_route)
-
-        return routes
 
+    def __construct_graph(self) -> None:
+        self.__graph = Graph()
 
+        # both directions of a link share the same object
+        links = {id(link): link for link in self.__links.values()}
+        for link in links.values():
+            self.__graph.add_edge(link.node1, link.node2, link.delay)
+
+    
     def set_links_from_generator(self, links_csv: str, node_names: list,  port_capacities: list,
                                  num_links: list, delays: list, 
                                  pluggable_transceivers_power_consumption: list,
@@ -230,12 +178,16 @@ class Topology:
             A list of link delay values in hierarchical level order, from core to leaf nodes.
 
         """
+        import pandas
+
         self.__links = {}
-        self.__links_df = pandas.read_csv(links_csv)
-        self.__process_links_from_generator(node_names, port_capacities, num_links,
+        self.__index = None
+        links = pandas.read_csv(links_csv).iloc[:, :2].to_numpy(dtype=numpy.int64)
+        self.__process_links_from_generator(links, node_names, port_capacities, num_links,
                                             delays, pluggable_transceivers_power_consumption,
                                             switch_ports_power_consumption)
         self.__process_links_from_nodes()
+        self.__check_link_orientation(node_names[0])
     
 
     def load_nodes_for_eepran(self, nodes_path: str, id_pattern: str = 'node{}') -> None:
@@ -256,6 +208,7 @@ class Topology:
         load_nodes_start = time.time()
 
         self.__nodes = {}
+        self.__invalidate_nodes()
         json_input = ''
         with open(nodes_path, 'r') as node_file:
             json_input = node_file.read()
@@ -294,6 +247,7 @@ class Topology:
         load_links_start = time.time()
 
         self.__links = {}
+        self.__index = None
         json_input = ''
         with open(links_path, 'r') as link_file:
             json_input = link_file.read()
@@ -322,6 +276,7 @@ class Topology:
             self.__links[str(link_key2)] = new_link
         
         self.__process_links_from_nodes()
+        self.__check_link_orientation(node_id_pattern.format(0))
 
         logging.debug("Processed Links:")
         for link in set(self.__links.values()):
@@ -333,6 +288,7 @@ class Topology:
 
     def add_hardware(self, identifier: int, cpu: int, power_consumption: float) -> None:      
         self.__hardwares[identifier] = Hardware(cpu, power_consumption)
+        self.__index = None
 
 
     def add_base_station(self, identifier: int, num_rf_chains: int, num_sectors: int, 
@@ -344,14 +300,31 @@ class Topology:
                                                               static_power_consumption, 
                                                               rf_chain_power_consumption,
                                                               power_amplifier_efficiency)
+        self.__index = None
     
 
     def set_nodes_from_dict(self, nodes: dict) -> None:
         self.__nodes = nodes.copy()
+        self.__invalidate_nodes()
 
     
     def set_links_from_list(self, links: dict) -> None:
         self.__links = links
+        self.__index = None
+
+
+    def __invalidate_nodes(self) -> None:
+        self.__hardware_keys = None
+        self.__base_station_keys = None
+        self.__index = None
+
+
+    def get_index(self) -> TopologyIndex:
+        """ The integer ids and attribute arrays of the topology, rebuilt after it changes. """
+        if self.__index is None:
+            self.__index = TopologyIndex(self.__nodes, self.__hardwares, self.__base_stations,
+                                         self.__links or {})
+        return self.__index
 
 
     def get_links(self) -> list:
@@ -361,6 +334,11 @@ class Topology:
     def get_link(self, key: str) -> Link:
         return self.__links[key]
 
+
+    def get_link_table(self) -> LinkTable:
+        """ The table the links of the routes of this topology are interned in. """
+        return self.__link_table
+
     
     def get_routes(self) -> list:
         return self.__routes
@@ -390,10 +368,19 @@ class Topology:
 
 
     def get_hardware_by_key(self, key: str) -> Hardware:
-        result = re.search('(?:(?!_).)*', key)
-        node = self.get_node(result.group())
-        hw_id = node.get_hardware_identifier(key)
-        return self.__hardwares[hw_id]
+        return self.__hardwares[self.get_index().hardware_key_types[key]]
+
+
+    def get_base_station_by_key(self, key: str) -> BaseStation:
+        return self.__base_stations[self.get_index().base_station_key_types[key]]
+
+
+    def get_node_key(self, key: str) -> str:
+        """ :returns: The key of the node of a hardware or base station key. """
+        index = self.get_index()
+        if key in index.hardware_ids:
+            return index.node_keys[index.hardware_node[index.hardware_ids[key]]]
+        return index.node_keys[index.base_station_node[index.base_station_ids[key]]]
 
 
     def get_base_station(self, key: int) -> BaseStation:
@@ -409,10 +396,71 @@ class Topology:
             self.__base_station_keys = [key for node in self.__nodes.values() for key in node.get_base_station_keys()]
         return self.__base_station_keys
 
+
+    def fingerprint(self) -> str:
+        """
+        sha256 of everything the routes and the model are built from: the hardware and
+        base station definitions, the nodes, the links and the DRC catalog of core.drc.
+        The usage csv is left out (it only rescales the loads, see core.multiperiod).
+        """
+        description = {
+            'hardwares': {identifier: vars(hw) for identifier, hw in self.__hardwares.items()},
+            'base_stations': {identifier: vars(bs) for identifier, bs in self.__base_stations.items()},
+            'nodes': {key: [node.number, node.hardwares, node.static_percentage, node.base_stations]
+                      for key, node in self.__nodes.items()},
+            'links': {key: vars(link) for key, link in (self.__links or {}).items()},
+            'drcs': [vars(drc) for drc in package_drc.get_drc_list()],
+            'vnfs': package_drc.get_vnf_dict(),
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True, default=str).encode()).hexdigest()
+
+
+    def get_num_usage_slots(self) -> int:
+        return self.__usage.num_slots
+
+
+    def get_base_station_loads(self, slot: int) -> dict:
+        """
+        Load factor of every base station in a time slot of the usage csv.
+
+        The usage of each node is normalized by its peak over all slots, so a load of 1.0
+        matches the static snapshot built by core.model. All base stations of a node share
+        the node usage; nodes without a usage column are left out.
+        """
+        loads = {}
+        for node in self.__nodes.values():
+            if not self.__usage.has_node(node.number):
+                continue
+
+            load = self.__usage.get_load(node.number, slot)
+            for bs_key in node.get_base_station_keys():
+                loads[bs_key] = load
+        return loads
+
     
-    def generate_routes(self, origin_node) -> None:
-        
-        route_gen_start = time.time()
+    def __route_tables(self) -> tuple:
+        """
+        :returns: (node_key -> [hw_key], (node1, node2) -> delay, the delay budgets of
+                  core.drc.get_delay_budgets()), the read-only data of route generation.
+
+        Only the hardware of nodes with base stations is linked (see
+        __process_node_links()), the hardware of other nodes is not listed.
+        """
+        hardware_keys = {key: node.get_hardware_keys() if node.has_base_station() else []
+                         for key, node in self.__nodes.items()}
+        link_delays = {}
+        for link in {id(link): link for link in self.__links.values()}.values():
+            link_delays[(link.node1, link.node2)] = link.delay
+            link_delays[(link.node2, link.node1)] = link.delay
+        return hardware_keys, link_delays, package_drc.get_delay_budgets(package_drc.get_drc_list())
+
+
+    def __find_destination_paths(self, origin_node, shortest_paths: bool, delay_budgets: dict,
+                                 only: set = None) -> list:
+        """
+        :returns: The paths to every base station (or to those in only), grouped by
+                  base station, in generation order.
+        """
         self.__construct_graph()
 
         destinations = []
@@ -420,59 +468,462 @@ class Topology:
             node = self.__nodes[key]
             if node.has_base_station():
                 for bs in node.get_base_station_keys():
-                    destinations.append(bs)
+                    if only is None or bs in only:
+                        destinations.append(bs)
 
-        for destination in destinations:
-            self.__graph.find_all_paths(origin_node, destination)
+        if shortest_paths:
+            # 3 lowest delay paths of each base station, within the loosest DRC budget
+            max_delay = max(sum(budget) for budgets in delay_budgets.values() for budget in budgets)
+            paths = self.__graph.find_shortest_paths(origin_node, destinations, max_paths=3,
+                                                     max_delay=max_delay)
+        else:
+            # first 3 paths of each base station, as Graph.find_all_paths(k=4)
+            paths = self.__graph.find_paths(origin_node, destinations, max_paths=3)
+        return [paths.pop(destination) for destination in destinations]
+
+
+    def iter_routes(self, origin_node, shortest_paths: bool = False):
+        """
+        Generate the routes from origin_node to every base station lazily, one
+        destination at a time: paths -> crosshaul splits -> hardware expansion -> Route.
+        Route identifiers are assigned in generation order, starting from 1.
+
+        Only routes some DRC of core.drc can be assigned to are created: paths, splits
+        and routes are dropped as soon as their delays exceed every DRC budget.
+
+        Parameters
+        ----------
+
+        shortest_paths : bool
+            Expand the 3 lowest delay paths of each base station instead of the first
+            3 paths in depth-first order. This selects other paths than the default, so
+            the routes, their identifiers and the optimum of the model change.
+
+        """
+        hardware_keys, link_delays, delay_budgets = self.__route_tables()
+        destination_paths = self.__find_destination_paths(origin_node, shortest_paths, delay_budgets)
+
+        records = _route_records((path for paths in destination_paths for path in paths),
+                                 origin_node, hardware_keys, link_delays, delay_budgets)
+        for idx, record in enumerate(records, start=1):
+            yield Route(idx, *record, self.__link_table)
+
+
+    def __iter_routes_parallel(self, origin_node, workers: int, shortest_paths: bool):
+        """
+        iter_routes() with the crosshaul expansion of the base stations split across
+        worker processes. Each worker gets a copy of the hardware and link delay tables
+        once; contiguous chunks of base stations are expanded and merged back in order,
+        so the routes and their identifiers are the ones of iter_routes().
+        """
+        hardware_keys, link_delays, delay_budgets = self.__route_tables()
+        destination_paths = self.__find_destination_paths(origin_node, shortest_paths, delay_budgets)
+
+        # a few chunks per worker, balanced on the number of paths
+        num_chunks = min(len(destination_paths), workers * 4)
+        chunks = [[] for _ in range(num_chunks)]
+        total_paths = sum(len(paths) for paths in destination_paths)
+        seen_paths = 0
+        for paths in destination_paths:
+            chunks[min(num_chunks - 1, seen_paths * num_chunks // max(total_paths, 1))].extend(paths)
+            seen_paths += len(paths)
 
-        self.__routes = []
         idx = 1
-        for path in self.__graph.paths:
-            routes_aux = self.__find_crosshaul_routes(path)
-            for route in self.__process_crosshaul_routes(routes_aux):
-                delay_backhaul = sum([self.__links[str(link)].delay for link in route[0]])
-                delay_midhaul   = sum([self.__links[str(link)].delay for link in route[1]])
-                delay_fronthaul  = sum([self.__links[str(link)].delay for link in route[2]])
-                sequence = [xhaul[-1][-1] if len(xhaul) > 0 else origin_node for xhaul in route]
-                self.__routes += [Route(idx, path[0], path[-1], sequence, route[2], route[1], 
-                                        route[0], delay_fronthaul, delay_midhaul, delay_backhaul)]
-                idx += 1
-        
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_route_worker,
+                initargs=(origin_node, hardware_keys, link_delays, delay_budgets)) as executor:
+            for records in executor.map(_expand_route_chunk, chunks):
+                for record in records:
+                    yield Route(idx, *record, self.__link_table)
+                    idx += 1
+
+
+    def generate_routes(self, origin_node, workers: int = None, shortest_paths: bool = False) -> None:
+        """
+        Generate the routes from origin_node to every base station (see iter_routes()).
+
+        Parameters
+        ----------
+
+        workers : int
+            Worker processes expanding the paths into routes. None or 1 generates the
+            routes in this process. The routes are the same either way.
+        shortest_paths : bool
+            See iter_routes().
+
+        """
+        route_gen_start = time.time()
+        if workers is None or workers <= 1:
+            self.__routes = list(self.iter_routes(origin_node, shortest_paths))
+        else:
+            self.__routes = list(self.__iter_routes_parallel(origin_node, workers, shortest_paths))
+        self.__id_to_route = {}
+        self.__route_origin = origin_node
+        self.__route_shortest_paths = shortest_paths
+        self.__stale_base_stations = set()
         route_gen_end = time.time()
         logging.info('Routes Generated: {}s'.format(route_gen_end - route_gen_start))
 
 
+    def generate_routes_to_json(self, origin_node, path: str, shortest_paths: bool = False) -> int:
+        """
+        Generate the routes and write them to a json file as they are produced, in the
+        format of export_routes(), without keeping them in the topology.
+
+        :returns: The number of routes written.
+        """
+        route_gen_start = time.time()
+        num_routes = write_routes_json(self.iter_routes(origin_node, shortest_paths), path)
+        route_gen_end = time.time()
+        logging.info('Routes Generated and Exported: {} routes, {}s'.format(
+            num_routes, route_gen_end - route_gen_start))
+        return num_routes
+
+
     def print_routes(self) -> None:
         for route in self.__routes:
             print(str(route))
 
 
     def export_routes(self, path: str) -> None:
-        json_output = '[\n'
-        for idx, route in enumerate(self.__routes):
-            json_output += json.dumps(route.__dict__, indent=4)
-            if idx < len(self.__routes) - 1:
-                json_output += ','
-        json_output += '\n]'
-        
-        with open(path, 'w') as route_file:
-            route_file.write(json_output)
+        write_routes_json(self.__routes, path)
 
 
     def import_routes_from_json(self, path: str) -> None:
-        json_input = ''
-        with open(path, 'r') as route_file:
-            json_input = route_file.read()
-        
-        routes = json.loads(json_input)
-        self.__routes = []
-        for route in routes:
-            fronthaul = [(link[0],link[1]) for link in route['fronthaul']]
-            midhaul = [(link[0],link[1]) for link in route['midhaul']]
-            backhaul = [(link[0],link[1]) for link in route['backhaul']]
-            self.__routes += [Route(route['identifier'], route['source'], route['target'], 
-                                    route['sequence'], fronthaul, midhaul, 
-                                    backhaul, route['delay_fronthaul'], 
-                                    route['delay_midhaul'], route['delay_backhaul'])]
-        
+        self.__routes = read_routes_json(path, self.__link_table)
+        self.__routes_imported()
+
+
+    def export_routes_to_store(self, path: str) -> None:
+        """ Write the routes to a columnar route store (see core.routestore.RouteStore). """
+        write_route_store(self.__routes, path)
+
+
+    def import_routes_from_store(self, path: str) -> None:
+        route_import_start = time.time()
+        self.__routes = list(RouteStore(path).iter_routes(self.__link_table))
+        self.__routes_imported()
+        route_import_end = time.time()
+        logging.info('Routes Imported: {} routes, {}s'.format(len(self.__routes),
+                                                             route_import_end - route_import_start))
+
+
+
+    def set_routes(self, routes: list) -> None:
+        """ Replace the routes of the topology (e.g. by the routes a model was built from). """
+        self.__routes = list(routes)
+        self.__routes_imported()
+
+
+    def __routes_imported(self) -> None:
+        self.__id_to_route = {}
+        self.__route_origin = self.__routes[0].source if len(self.__routes) > 0 else None
+        self.__stale_base_stations = set()
+
+
+    # ----- Mutations -----
+    # Every mutation marks the base stations below the changed element (the only ones
+    # whose routes can change, as routes only cross the ancestors of their target) and
+    # update_routes() regenerates their routes. "Below" follows the links from node1 to
+    # node2, as route generation does; links are checked to point away from the core
+    # when they are loaded or added (see __check_link_orientation()).
+
+    def __descendant_base_stations(self, vertex: str) -> set:
+        """ :returns: The base station keys reachable from vertex (itself included). """
+        children = {}
+        for link in {id(link): link for link in self.__links.values()}.values():
+            children.setdefault(link.node1, []).append(link.node2)
+
+        base_stations = set(self.get_base_station_keys())
+        seen = {vertex}
+        stack = [vertex]
+        while stack:
+            for child in children.get(stack.pop(), []):
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        return seen & base_stations
+
+
+    def __mark_stale(self, vertex: str) -> None:
+        self.__stale_base_stations |= self.__descendant_base_stations(vertex)
+
+
+    def __replace_node(self, key: str, node: Node) -> None:
+        """ Swap the node of key, relinking its hardware and base stations (their keys may change). """
+        self.__mark_stale(key)
+        self.__remove_node_links(key)
+        self.__nodes[key] = node
+        self.__invalidate_nodes()
+        self.__process_node_links(key)
+        self.__mark_stale(key)
+
+
+    def add_node(self, key: str, node: Node) -> None:
+        """ Add a node (with its hardware and base stations); link it with add_link(). """
+        if key in self.__nodes:
+            raise ValueError('Node {} already exists'.format(key))
+        self.__nodes[key] = node
+        self.__invalidate_nodes()
+        self.__process_node_links(key)
+        self.__mark_stale(key)
+
+
+    def remove_node(self, key: str) -> None:
+        """ Remove a node with its hardware, base stations and every link touching it. """
+        self.__mark_stale(key)
+        self.__remove_node_links(key)
+        for link_key, link in list(self.__links.items()):
+            if link.node1 == key or link.node2 == key:
+                del self.__links[link_key]
+        del self.__nodes[key]
+        self.__invalidate_nodes()
+
+
+    def add_link(self, link: Link) -> None:
+        """ Add a link from link.node1 (towards the core) to link.node2. """
+        self.__links[str((link.node1, link.node2))] = link
+        self.__links[str((link.node2, link.node1))] = link
+        if self.__route_origin is not None:
+            try:
+                self.__check_link_orientation(self.__route_origin)
+            except ValueError:
+                del self.__links[str((link.node1, link.node2))]
+                del self.__links[str((link.node2, link.node1))]
+                raise
+        self.__index = None
+        self.__mark_stale(link.node2)
+
+
+    def remove_link(self, node1: str, node2: str) -> None:
+        link = self.__links[str((node1, node2))]
+        self.__mark_stale(link.node2)
+        del self.__links[str((link.node1, link.node2))]
+        del self.__links[str((link.node2, link.node1))]
+        self.__index = None
+
+
+    def set_link_delay(self, node1: str, node2: str, delay: float) -> None:
+        link = self.__links[str((node1, node2))]
+        link.delay = delay
+        self.__index = None
+        self.__mark_stale(link.node2)
+
+
+    def set_link_capacity(self, node1: str, node2: str, port_capacity: int = None,
+                          max_ports: int = None) -> None:
+        """ Change the port capacity and/or number of ports of a link (routes are unchanged). """
+        link = self.__links[str((node1, node2))]
+        if port_capacity is not None:
+            link.port_capacity = port_capacity
+        if max_ports is not None:
+            link.max_ports = max_ports
+        self.__index = None
+
+
+    def add_node_hardware(self, node_key: str, hardware_type: int) -> str:
+        """
+        Add a hardware of type hardware_type (see add_hardware()) to a node.
+
+        :returns: The key of the new hardware.
+        """
+        node = self.__nodes[node_key]
+        self.__replace_node(node_key, Node(node.number, node.hardwares + [hardware_type],
+                                           node.static_percentage, node.base_stations))
+        return self.__nodes[node_key].get_hardware_keys()[-1]
+
+
+    def remove_node_hardware(self, hw_key: str) -> None:
+        """ Remove a hardware; the following hardware of its node is renumbered. """
+        node_key = self.get_node_key(hw_key)
+        node = self.__nodes[node_key]
+        position = node.get_hardware_keys().index(hw_key)
+        self.__replace_node(node_key, Node(node.number, node.hardwares[:position] + node.hardwares[position+1:],
+                                           node.static_percentage, node.base_stations))
+
+
+    def add_node_base_station(self, node_key: str, base_station_type: int) -> str:
+        """
+        Add a base station of type base_station_type (see add_base_station()) to a node.
+
+        :returns: The key of the new base station.
+        """
+        node = self.__nodes[node_key]
+        self.__replace_node(node_key, Node(node.number, node.hardwares, node.static_percentage,
+                                           node.base_stations + [base_station_type]))
+        return self.__nodes[node_key].get_base_station_keys()[-1]
+
+
+    def remove_node_base_station(self, bs_key: str) -> None:
+        """ Remove a base station; the following base stations of its node are renumbered. """
+        node_key = self.get_node_key(bs_key)
+        node = self.__nodes[node_key]
+        position = node.get_base_station_keys().index(bs_key)
+        self.__replace_node(node_key, Node(node.number, node.hardwares, node.static_percentage,
+                                           node.base_stations[:position] + node.base_stations[position+1:]))
+
+
+    def get_stale_base_stations(self) -> set:
+        """ :returns: The base stations whose routes are out of date after the mutations. """
+        return set(self.__stale_base_stations)
+
+
+    def update_routes(self, origin_node=None, shortest_paths: bool = None) -> RouteDelta:
+        """
+        Regenerate the routes of the base stations changed by the mutations since the
+        routes were generated or last updated, and drop the routes of removed base
+        stations. The other routes (and their identifiers) are kept; new routes get
+        identifiers after the largest one, and routes stay grouped by base station in
+        generation order, so they match generate_routes() up to identifiers.
+
+        origin_node and shortest_paths default to those of the last generate_routes()
+        (imported routes take their source as origin).
+
+        :returns: The RouteDelta, to update a model built on the previous routes
+                  (see core.model.update_model_topology()).
+        """
+        update_start = time.time()
+        origin_node = origin_node if origin_node is not None else self.__route_origin
+        shortest_paths = shortest_paths if shortest_paths is not None else self.__route_shortest_paths
+        if origin_node is None:
+            raise ValueError('No origin node: generate or import the routes first')
+
+        base_station_keys = self.get_base_station_keys()
+        stale = self.__stale_base_stations & set(base_station_keys)
+        by_base_station = {bs_key: [] for bs_key in base_station_keys}
+        removed = []
+        for route in self.__routes:
+            if route.target in stale or route.target not in by_base_station:
+                removed.append(route.identifier)
+            else:
+                by_base_station[route.target].append(route)
+
+        hardware_keys, link_delays, delay_budgets = self.__route_tables()
+        destination_paths = self.__find_destination_paths(origin_node, shortest_paths, delay_budgets, stale)
+        records = _route_records((path for paths in destination_paths for path in paths),
+                                 origin_node, hardware_keys, link_delays, delay_budgets)
+        next_identifier = max((route.identifier for route in self.__routes), default=0) + 1
+        added = [Route(idx, *record, self.__link_table) for idx, record in enumerate(records, start=next_identifier)]
+        for route in added:
+            by_base_station[route.target].append(route)
+
+        self.__routes = [route for routes in by_base_station.values() for route in routes]
+        self.__id_to_route = {}
+        self.__route_origin = origin_node
+        self.__route_shortest_paths = shortest_paths
+        self.__stale_base_stations = set()
+
+        update_end = time.time()
+        logging.info('Routes Updated: {} removed, {} added, {}s'.format(len(removed), len(added),
+                                                                       update_end - update_start))
+        return RouteDelta(removed, added)
+
+@functools.lru_cache(maxsize=None)
+def _crosshaul_splits(num_links: int) -> tuple:
+    """
+    Compositions of a path with num_links links into 3, 2 and 1 contiguous crosshauls,
+    as (start, end) link index ranges.
+
+    Example:
+        3 -> (((0, 1), (1, 2), (2, 3)), ((0, 1), (1, 3)), ((0, 2), (2, 3)), ((0, 3),))
+    """
+    routes_len_3 = tuple(((0, first), (first, second), (second, num_links))
+                         for first in range(1, num_links)
+                         for second in range(first+1, num_links))
+    routes_len_2 = tuple(((0, first), (first, num_links)) for first in range(1, num_links))
+    routes_len_1 = (((0, num_links),),) if num_links > 0 else ()
+    return routes_len_3 + routes_len_2 + routes_len_1
+
+
+# ----- Route Generation -----
+
+def _find_crosshaul_routes(path: list) -> list:
+    """
+    Generates routes for all possible combinations of crosshaul of the given path.
+    """
+    # Splits only depend on the number of links, node keys are mapped afterwards
+    # Example:
+    #   ['node1', 'node2', 'node4'] -> ((0, 1), (1, 2)) -> [[('node1', 'node2')], [('node2', 'node4')]]
+    links = [(path[idx], path[idx+1]) for idx in range(len(path)-1)]
+    return [[links[start:end] for start, end in split] for split in _crosshaul_splits(len(links))]
+
+
+def _process_crosshaul_routes(routes: list, hardware_keys: dict):
+    """
+    Make all crosshauls (except Fronthaul) of each route end in a hardware, 
+    and set empty list for suppressed crosshauls.
+
+    Yields [backhaul, midhaul, fronthaul] routes: the 3 crosshaul routes for every
+    midhaul and backhaul hardware, then the fronthaul only routes, then the 2
+    crosshaul routes for every midhaul hardware.
+    """
+    for route in routes:
+        if len(route) < 3:
+            continue
+        backhaul, midhaul, fronthaul = route
+        midhaul_node_key = midhaul[-1][-1]
+        backhaul_node_key = backhaul[-1][-1]
+        for midhaul_hw in hardware_keys[midhaul_node_key]:
+            for backhaul_hw in hardware_keys[backhaul_node_key]:
+                yield [backhaul + [(backhaul_node_key, backhaul_hw)],
+                       midhaul + [(midhaul_node_key, midhaul_hw)], fronthaul]
+
+    for route in routes:
+        if len(route) == 1:
+            yield [[], [], route[-1]]
+
+    for route in routes:
+        if len(route) != 2:
+            continue
+        midhaul, fronthaul = route
+        midhaul_node_key = midhaul[-1][-1]
+        for midhaul_hw in hardware_keys[midhaul_node_key]:
+            yield [[], midhaul + [(midhaul_node_key, midhaul_hw)], fronthaul]
+
+
+def _fits_delay_budget(delay_budgets: dict, num_nodes: int, delay_backhaul: float,
+                       delay_midhaul: float, delay_fronthaul: float) -> bool:
+    """ Check if some DRC needing num_nodes nodes admits the crosshaul delays (as core.registry). """
+    return any(delay_backhaul <= budget_bh and delay_midhaul <= budget_mh and delay_fronthaul <= budget_fh
+               for budget_bh, budget_mh, budget_fh in delay_budgets.get(num_nodes, ()))
+
+
+def _route_records(paths, origin_node, hardware_keys: dict, link_delays: dict, delay_budgets: dict):
+    """
+    Yields the Route arguments after the identifier (source, target, sequence,
+    fronthaul, midhaul, backhaul and their delays) of every route of paths that fits
+    the delay budget of some DRC.
+
+    Splits are checked before the hardware expansion, without the delay of the link
+    to the hardware (a lower bound), and every expanded route again with it.
+    """
+    for path in paths:
+        splits = []
+        for split in _find_crosshaul_routes(path):
+            delays = [sum([link_delays[link] for link in xhaul]) for xhaul in split]
+            if _fits_delay_budget(delay_budgets, len(split), *([0] * (3 - len(split)) + delays)):
+                splits.append(split)
+
+        for route in _process_crosshaul_routes(splits, hardware_keys):
+            delay_backhaul = sum([link_delays[link] for link in route[0]])
+            delay_midhaul   = sum([link_delays[link] for link in route[1]])
+            delay_fronthaul  = sum([link_delays[link] for link in route[2]])
+            num_nodes = 3 if len(route[0]) > 0 else 2 if len(route[1]) > 0 else 1
+            if not _fits_delay_budget(delay_budgets, num_nodes, delay_backhaul, delay_midhaul, delay_fronthaul):
+                continue
+            sequence = [xhaul[-1][-1] if len(xhaul) > 0 else origin_node for xhaul in route]
+            yield (path[0], path[-1], sequence, route[2], route[1], route[0],
+                   delay_fronthaul, delay_midhaul, delay_backhaul)
+
+
+# ----- Worker state, one copy of the route tables per process -----
+_worker_route_tables = None
+
+
+def _init_route_worker(origin_node, hardware_keys: dict, link_delays: dict, delay_budgets: dict) -> None:
+    global _worker_route_tables
+    _worker_route_tables = (origin_node, hardware_keys, link_delays, delay_budgets)
+
 
+def _expand_route_chunk(paths: list) -> list:
+    return list(_route_records(paths, *_worker_route_tables))
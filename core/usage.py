@@ -0,0 +1,92 @@
+import argparse
+import os
+import numpy
+
+
+# ----- Usage Files -----
+
+def read_usage_csv(path: str) -> tuple:
+    """
+    Read a BS usage csv: a header with one column per node number, then one row of
+    base station usage per time slot.
+
+    :returns: (float32 array [slots, columns], [column name])
+    """
+    with open(path, 'r') as usage_file:
+        columns = [column.strip() for column in usage_file.readline().strip().split(',')]
+        usage = numpy.loadtxt(usage_file, delimiter=',', dtype=numpy.float32, ndmin=2)
+    return usage.reshape(-1, len(columns)), columns
+
+
+def convert_usage_csv(csv_path: str, store_path: str) -> int:
+    """
+    Convert a BS usage csv once into a directory read memory mapped by BaseStationUsage:
+    usage.npy (float32 [slots, columns]) and columns.npy (the node number of each column).
+
+    :returns: The number of time slots.
+    """
+    usage, columns = read_usage_csv(csv_path)
+    os.makedirs(store_path, exist_ok=True)
+    numpy.save(os.path.join(store_path, 'usage.npy'), usage)
+    numpy.save(os.path.join(store_path, 'columns.npy'), numpy.array(columns, dtype=numpy.str_))
+    return usage.shape[0]
+
+
+class BaseStationUsage:
+    """
+    Base station usage of every node per time slot, loaded on first access.
+
+    path is a BS usage csv or a directory written by convert_usage_csv(), which is
+    memory mapped instead of parsed. Nothing is read until a slot is asked for, so
+    topologies that are only used for routes or a static model never touch the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__usage = None
+        self.__columns = None
+        self.__peaks = None
+
+
+    def __load(self) -> None:
+        if self.__usage is not None:
+            return
+        if os.path.isdir(self.path):
+            usage = numpy.load(os.path.join(self.path, 'usage.npy'), mmap_mode='r')
+            columns = numpy.load(os.path.join(self.path, 'columns.npy')).tolist()
+        else:
+            usage, columns = read_usage_csv(self.path)
+        self.__columns = {column: idx for idx, column in enumerate(columns)}
+        self.__usage = usage
+
+
+    @property
+    def num_slots(self) -> int:
+        self.__load()
+        return self.__usage.shape[0]
+
+
+    def has_node(self, number) -> bool:
+        self.__load()
+        return str(number) in self.__columns
+
+
+    def get_load(self, number, slot: int) -> float:
+        """ Usage of node number in slot, normalized by its peak over all slots. """
+        self.__load()
+        if self.__peaks is None:
+            self.__peaks = numpy.max(self.__usage, axis=0).tolist() if self.__usage.shape[0] > 0 else []
+
+        column = self.__columns[str(number)]
+        peak = self.__peaks[column]
+        return float(self.__usage[slot, column]) / peak if peak > 0 else 0.0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert a BS usage csv to a memory mapped (.npy) directory.')
+    parser.add_argument('source', help='A BS usage csv file.')
+    parser.add_argument('destination')
+    args = parser.parse_args()
+
+    num_slots = convert_usage_csv(args.source, args.destination)
+    print('{} slots: {} -> {}'.format(num_slots, args.source, args.destination))
@@ -2,7 +2,7 @@ import core.topology
 import core.link 
 import core.node 
 import core.model 
-import core.drc
+import core.solution
 import logging
 import time
 
@@ -28,11 +28,19 @@ topo.add_base_station(identifier=1, num_rf_chains=25, num_sectors=3,
 topo.load_nodes_for_eepran('data/EEPRAN_T2_450_nodes.json')
 topo.load_links_for_eepran('data/EEPRAN_T2_450_links.json')
 
-# topo.generate_routes(origin_node='node0')
-# topo.export_routes('data/routes_200_1099.json')
-topo.import_routes_from_json('data/routes_450.json')
+topo.generate_routes('node0')
+# topo.import_routes_from_store('data/routes_450') reads the shipped routes instead
+# (python -m core.routestore converts between the json and the store format)
 
-model, centralization_constraint = core.model.build_eepran_model(topo)
+# core.model.build_eepran_model(topo) builds the same model term by term (for cross-checking)
+# core.colgen.build_eepran_model_colgen(topo) builds a restricted model by column generation
+model, centralization_constraint = core.model.build_eepran_model_sparse(topo, presolve=True)
+# Routes and model can be kept in data/cache while the topology and the DRC catalog are unchanged:
+#   cache = core.cache.TopologyCache('data/cache')
+#   cache.load_routes(topo, origin_node='node0')
+#   model, centralization_constraint = cache.build_eepran_model(topo, presolve=True)
+# core.heuristic.solve_heuristic(topo) gives an assignment in seconds, without CPLEX; its keys
+# can warm start the solver with core.model.add_assignment_mip_start(model, result['keys'])
 
 model.solve()
 
@@ -40,34 +48,31 @@ model.solve()
 # -------------------- Solution Presentation --------------------
 # ---------------------------------------------------------------
 
+# all values are read in one call and kept as columnar tables (python -m core.solution prints them)
+solution = core.solution.extract_solution(model)
+core.solution.write_solution_store(solution, 'solutions/eepran_450')
+
 print('----------------------------------------')
-print('Objective Value: {} [w]'.format(model.solution.get_objective_value()))
-print('Centralization: {}'.format(model.solution.get_value(centralization_constraint.left_expr)))
+print('Objective Value: {} [w]'.format(solution['summary']['objective']))
+print('Centralization: {}'.format(solution['summary']['centralization']))
 print('----------------------------------------')
 
 # Print selected decision variables
+placement = solution['placement']
 logging.debug('----- Activated Decision Variables:')
-for key in model.x:
-    if model.x[key].solution_value != 0:
-        logging.debug("route={}, drc={}, bs={} -> {}".format(key.route_id, key.drc_id, key.bs_key, 
-                                                             model.x[key].solution_value))
+for route, drc, bs in zip(placement['route'], placement['drc'], placement['base_station']):
+    logging.debug("route={}, drc={}, bs={} -> 1".format(route, drc, bs))
 
 logging.debug('---- Centralization Locations:')
-for key in model.z:
-    if model.z[key].solution_value != 0:
-        logging.debug('node={}, function={} -> {}'.format(key.node_key, key.function_key, 
-                                                          model.z[key].solution_value))
+centralization = solution['centralization']
+for node, function, z in zip(centralization['node'], centralization['function'], centralization['z']):
+    if z != 0:
+        logging.debug('node={}, function={} -> {}'.format(node, function, z))
 
 
 logging.debug('---- Selected DRCs:')
-drc_dict = {}
-for drc in core.drc.get_drc_list():
-    drc_dict[drc.identifier] = drc
-
-for key in model.x:
-    if model.x[key].solution_value != 0:
-        route = topo.get_route(key.route_id)
-        logging.debug('{}:'.format(key.bs_key))
-        logging.debug('    CU({} -> {})'.format(route.sequence[0], drc_dict[key.drc_id].fs_cu))
-        logging.debug('    DU({} -> {})'.format(route.sequence[1], drc_dict[key.drc_id].fs_du))
-
+for bs, cu, fs_cu, du, fs_du in zip(placement['base_station'], placement['cu'], placement['fs_cu'],
+                                    placement['du'], placement['fs_du']):
+    logging.debug('{}:'.format(bs))
+    logging.debug('    CU({} -> {})'.format(cu, fs_cu.split(',') if fs_cu else []))
+    logging.debug('    DU({} -> {})'.format(du, fs_du.split(',') if fs_du else []))
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.topology import *
+
+
+def data_path(name: str) -> str:
+    return os.path.join(ROOT, 'data', name)
+
+
+def build_topology(size: int = 5, generate_routes: bool = True,
+                   usage_csv: str = 'T2_100_BS_usage.csv') -> Topology:
+    """ The T2_{size} topology, set up as in eepran.py, with its routes generated from node0. """
+    topo = Topology(data_path(usage_csv))
+    topo.add_hardware(identifier=1, cpu=64, power_consumption=225)
+    topo.add_hardware(identifier=2, cpu=56, power_consumption=400)
+    topo.add_base_station(identifier=1, num_rf_chains=25, num_sectors=3, transmission_power=40,
+                          static_power_consumption=260, rf_chain_power_consumption=1,
+                          power_amplifier_efficiency=0.25)
+    topo.load_nodes_for_eepran(data_path('EEPRAN_T2_{}_nodes.json'.format(size)))
+    topo.load_links_for_eepran(data_path('EEPRAN_T2_{}_links.json'.format(size)))
+    if generate_routes:
+        topo.generate_routes('node0')
+    return topo
+
+
+def route_signature(route: Route) -> tuple:
+    """ Everything of a route but its identifier. """
+    return (route.source, route.target, tuple(route.sequence), tuple(route.fronthaul), tuple(route.midhaul),
+            tuple(route.backhaul), route.delay_fronthaul, route.delay_midhaul, route.delay_backhaul)
+
+
+@pytest.fixture
+def topo() -> Topology:
+    return build_topology()
@@ -0,0 +1,75 @@
+from conftest import *
+from core.cache import *
+from core.cache import _directory_size
+
+
+def solved(model) -> tuple:
+    solution = model.solve()
+    return solution.get_objective_value(), sorted(key for key, var in model.x.items() if var.solution_value > 0.5)
+
+
+@pytest.mark.parametrize('backend', SOLVER_BACKENDS)
+def test_cache_hit_matches_fresh_build(topo, tmp_path, backend):
+    cache = TopologyCache(str(tmp_path / 'cache'))
+    cached_topo = build_topology(generate_routes=False)
+    assert not cache.load_routes(cached_topo, 'node0')
+    assert cache.load_routes(cached_topo, 'node0')
+    assert [route_signature(route) for route in cached_topo.get_routes()] == \
+        [route_signature(route) for route in topo.get_routes()]
+
+    fresh, _ = build_eepran_model_sparse(topo, presolve=True, lp_path=None, backend=backend)
+    cache.build_eepran_model(cached_topo, presolve=True, backend=backend)
+    model, centralization_constraint = cache.build_eepran_model(cached_topo, presolve=True, backend=backend)
+    assert 'Matrix Load' in model.build_timings
+    assert model.matrix.column_names == fresh.matrix.column_names
+    assert solved(model) == pytest.approx(solved(fresh))
+    assert model.solution.get_value(centralization_constraint.left_expr) == pytest.approx(18)
+
+    # the model read back from the MPS keeps the names of the matrix
+    if backend == 'cplex':
+        for row, name in enumerate(model.matrix.row_names):
+            assert model.get_constraint_by_name(name) is model.row_constraints[row]
+        assert [var.name for var in model.columns] == model.matrix.column_names
+
+
+def test_cache_keys(topo, tmp_path):
+    cache = TopologyCache(str(tmp_path / 'cache'))
+    assert not cache.load_routes(topo, 'node0')
+    cache.build_eepran_model(topo, backend='highs')
+    assert len(os.listdir(cache.directory)) == 2
+
+    # another cap, another model entry
+    model, _ = cache.build_eepran_model(topo, centralization_cap=20, backend='highs')
+    assert 'Matrix Load' not in model.build_timings
+    assert len(os.listdir(cache.directory)) == 3
+
+    # a changed link misses both the routes and the models
+    topo.set_link_delay('node1', 'node3', 0.1)
+    assert not cache.load_routes(topo, 'node0')
+    model, _ = cache.build_eepran_model(topo, backend='highs')
+    assert 'Matrix Load' not in model.build_timings
+    assert len(os.listdir(cache.directory)) == 5
+
+
+def test_cache_eviction(topo, tmp_path):
+    cache = TopologyCache(str(tmp_path / 'cache'))
+    cache.load_routes(topo, 'node0')
+    cache.build_eepran_model(topo, backend='highs')
+    entries = sorted(os.listdir(cache.directory))
+    sizes = {entry: _directory_size(os.path.join(cache.directory, entry)) for entry in entries}
+    assert cache.size() == sum(sizes.values())
+
+    # the least recently used entry goes first: a hit on the routes makes the model the oldest
+    oldest = time.time() - 100
+    for entry in entries:
+        os.utime(os.path.join(cache.directory, entry), (oldest, oldest))
+    assert cache.load_routes(topo, 'node0')
+    routes_entry = max(entries, key=lambda entry: os.path.getmtime(os.path.join(cache.directory, entry)))
+    cache.max_bytes = sizes[routes_entry]
+    removed = cache.evict()
+    assert [os.path.basename(path) for path in removed] == [entry for entry in entries if entry != routes_entry]
+    assert os.listdir(cache.directory) == [routes_entry]
+
+    cache.max_bytes = 0
+    assert cache.evict(keep=os.path.join(cache.directory, routes_entry)) == []
+    assert len(cache.evict()) == 1 and cache.size() == 0
@@ -0,0 +1,70 @@
+from conftest import *
+from core.colgen import *
+from core.colgen import _ColumnPricer, _RestrictedMaster
+
+
+def test_priced_columns_match_matrix(topo):
+    model, _ = build_eepran_model_colgen(topo)
+    matrix = model.matrix
+    assert model.column_generation['converged']
+    assert matrix.num_x == model.column_generation['columns'] < model.column_generation['candidates']
+
+    pricer = _ColumnPricer(topo)
+    columns = matrix.rows.tocsc()
+    names = {'single_route': ['single_route_{}'], 'processing': ['processing_capacity_{}'],
+             'link': ['qty_ports_link_{}'], 'centralization': ['centralization_constraint'],
+             'psi_1': ['low_ceil_restriction_{}', 'high_ceil_restriction_{}']}
+    for key in matrix.x_keys:
+        cost, terms = pricer.column(topo.get_route(key.route_id), matrix.drc_dict[key.drc_id])
+        expected = {}
+        for (kind, entity), value in terms:
+            if kind == 'psi_2':
+                row_names = [name.format(entity.node_key, entity.function_key)
+                             for name in ('low_ceil_restriction_{}_{}', 'high_ceil_restriction_{}_{}')]
+            else:
+                row_names = [name.format(entity) for name in names[kind]]
+            for name in row_names:
+                expected[name] = expected.get(name, 0.0) + value
+
+        column = matrix.x_index[key]
+        start, end = columns.indptr[column], columns.indptr[column+1]
+        actual = {matrix.row_names[row]: value for row, value in zip(columns.indices[start:end].tolist(),
+                                                                     columns.data[start:end].tolist())}
+        assert actual == pytest.approx({name: value for name, value in expected.items() if value != 0})
+        assert cost == pytest.approx(matrix.objective[column])
+
+
+def test_restricted_model_objective(topo):
+    model, _ = build_eepran_model_colgen(topo, backend='highs')
+    assert model.column_generation['lp_bound'] <= 6670.41
+    assert model.solve().get_objective_value() == pytest.approx(6670.41, abs=0.01)
+
+
+def test_master_duals_match_across_backends(topo):
+    pricer = _ColumnPricer(topo)
+    masters = [_RestrictedMaster(pricer, 0, 1e6, backend) for backend in SOLVER_BACKENDS]
+    for number, (key, route, cost, terms) in enumerate(pricer.iter_columns()):
+        if number % 3 == 0:
+            for master in masters:
+                master.add_column(key, cost, terms)
+
+    cplex_bound, highs_bound = [master.solve() for master in masters]
+    assert highs_bound == pytest.approx(cplex_bound)
+    cplex_duals, highs_duals = [master.row_duals() for master in masters]
+    assert highs_duals == pytest.approx(cplex_duals, abs=1e-6)
+    for master in masters:
+        master.end()
+
+
+def test_streamed_routes_match_topology_routes(topo):
+    model, _ = build_eepran_model_colgen(topo, backend='highs')
+    streamed_topo = build_topology(generate_routes=False)
+    streamed, _ = build_eepran_model_colgen(streamed_topo, backend='highs', origin_node='node0')
+
+    assert streamed.column_generation == model.column_generation
+    assert streamed.matrix.x_keys == model.matrix.x_keys
+    generated = sorted({key.route_id for key in streamed.matrix.x_keys})
+    assert [route.identifier for route in streamed_topo.get_routes()] == generated
+    assert [route_signature(route) for route in streamed_topo.get_routes()] == \
+        [route_signature(topo.get_route(identifier)) for identifier in generated]
+    assert streamed.solve().get_objective_value() == pytest.approx(model.solve().get_objective_value())
@@ -0,0 +1,10 @@
+from conftest import *
+from core.decomposition import *
+
+
+def test_decomposition_reaches_optimum(topo):
+    result = solve_decomposition(topo, workers=1, max_iterations=20, backend='highs')
+    assert result['objective'] == pytest.approx(6670.41, abs=0.01)
+    assert result['bound'] <= result['objective'] + 1e-6
+    assert result['centralization'] == 18
+    assert sorted(result['assignment']) == sorted(topo.get_base_station_keys())
@@ -0,0 +1,49 @@
+from conftest import *
+from core.evaluator import *
+from core.model import *
+
+
+def solved_keys(model) -> list:
+    return [key for key, var in model.x.items() if var.solution_value > 0.5]
+
+
+def test_evaluate_matches_solved_objective(topo):
+    model, _ = build_eepran_model_sparse(topo, lp_path=None)
+    solution = model.solve()
+    evaluator = SolutionEvaluator(model.matrix)
+    assignment = evaluator.assignment_from_keys(solved_keys(model))
+
+    result = evaluator.evaluate(assignment)
+    assert result['objective'][0] == pytest.approx(solution.get_objective_value())
+    assert result['centralization'][0] == 18
+    assert result['complete'][0] and result['feasible'][0]
+
+
+def test_evaluate_batch(topo):
+    model, _ = build_eepran_model_sparse(topo, lp_path=None, backend='highs')
+    model.solve()
+    evaluator = SolutionEvaluator(model.matrix)
+    assignment = evaluator.assignment_from_keys(solved_keys(model))
+    unassigned = assignment.copy()
+    unassigned[0] = -1
+
+    result = evaluator.evaluate(numpy.vstack([assignment, unassigned]))
+    assert result['feasible'].tolist() == [True, False]
+    assert result['complete'].tolist() == [True, False]
+    assert result['objective'][1] < result['objective'][0]
+
+
+def test_evaluate_loaded_matrix(topo, tmp_path):
+    model, _ = build_eepran_model_sparse(topo, lp_path=None, backend='highs')
+    model.solve()
+    model.matrix.save(str(tmp_path / 'matrix'))
+    loaded = EepranMatrix.load(str(tmp_path / 'matrix'), topo)
+    assert loaded.registry is None
+
+    keys = solved_keys(model)
+    built = SolutionEvaluator(model.matrix)
+    expected = built.evaluate(built.assignment_from_keys(keys))
+    evaluator = SolutionEvaluator(loaded)
+    result = evaluator.evaluate(evaluator.assignment_from_keys(keys))
+    for name in ('objective', 'centralization', 'feasible', 'max_link_utilisation', 'max_cpu_utilisation'):
+        assert result[name] == pytest.approx(expected[name])
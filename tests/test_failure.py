@@ -0,0 +1,37 @@
+from conftest import *
+import core.failure
+from core.failure import *
+
+
+def upper_bounds(model) -> numpy.ndarray:
+    if isinstance(model, HighsModel):
+        return numpy.asarray(model.highs.getLp().col_upper_)[model.column_positions]
+    return numpy.array([var.ub for var in model.columns])
+
+
+@pytest.mark.parametrize('backend', SOLVER_BACKENDS)
+def test_bounds_restored_after_each_failure(topo, backend):
+    matrix = build_eepran_matrix(topo)
+    model, _ = create_model_from_matrix(matrix, backend)
+    solution = model.solve()
+    baseline = numpy.array(solution.get_values(model.columns), dtype=float)
+    failure_index = build_failure_index(matrix)
+
+    core.failure._init_worker(topo, 0, False, baseline, 1, None, backend)
+    worker_model = core.failure._worker_model
+    bounds = upper_bounds(worker_model)
+    for element in ('node1_hw1', "('node1', 'node3')", "('node0', 'node1')"):
+        core.failure._solve_failure(failure_index[element])
+        assert numpy.array_equal(upper_bounds(worker_model), bounds)
+    assert worker_model.solve().get_objective_value() == pytest.approx(solution.get_objective_value())
+
+
+@pytest.mark.parametrize('backend', SOLVER_BACKENDS)
+def test_evaluate_failures(topo, backend):
+    # node5 is only reached through node1
+    table = evaluate_failures(topo, ["('node0', 'node1')", "('node1', 'node0')", 'node2_hw2'],
+                              workers=1, backend=backend)
+    assert [row['kind'] for row in table] == ['link', 'link', 'hardware']
+    for row in table[:2]:
+        assert row['infeasible'] and row['objective'] is None
+    assert not table[2]['infeasible'] and table[2]['objective_delta'] >= -1e-6
@@ -0,0 +1,80 @@
+from conftest import *
+import json
+import pandas
+
+# per level parameters: core links, then aggregation, then access (deeper levels reuse the last)
+LEVEL_PARAMETERS = {
+    'port_capacities': [1000, 400, 100],
+    'num_links': [10, 8, 4],
+    'delays': [0.36, 0.5, 0.92],
+    'pluggable_transceivers_power_consumption': [4.5, 4.2, 3.0],
+    'switch_ports_power_consumption': [14, 12, 10],
+}
+
+
+def old_generator_links(links_csv: str, node_names: list, port_capacities: list, num_links: list,
+                        delays: list, pluggable_transceivers_power_consumption: list,
+                        switch_ports_power_consumption: list) -> dict:
+    """ The per-level loop that set_links_from_generator() used before, reading rows by position. """
+    links_df = pandas.read_csv(links_csv)
+    links_df.sort_values(by=links_df.columns[0], inplace=True)
+
+    node_levels = {0: [0], 1: []}
+    current_node_level = 1
+    links = {}
+    for _, row in links_df.iterrows():
+        upper_node_level = node_levels[current_node_level-1]
+        if row.values[0] not in upper_node_level:
+            current_node_level += 1
+            upper_node_level = node_levels[current_node_level-1]
+            node_levels[current_node_level] = []
+        node_levels[current_node_level].append([node for node in row.values if node not in upper_node_level])
+
+        level = current_node_level - 1
+        new_link = Link(port_capacities[min(level, len(port_capacities)-1)],
+                        num_links[min(level, len(num_links)-1)], delays[min(level, len(delays)-1)],
+                        node_names[row.values[0]], True, node_names[row.values[1]], True,
+                        pluggable_transceivers_power_consumption[min(level, len(pluggable_transceivers_power_consumption)-1)],
+                        switch_ports_power_consumption[min(level, len(switch_ports_power_consumption)-1)])
+        links[str((node_names[row.values[0]], node_names[row.values[1]]))] = new_link
+        links[str((node_names[row.values[1]], node_names[row.values[0]]))] = new_link
+    return links
+
+
+def link_values(link: Link) -> tuple:
+    return (link.node1, link.node2, link.port_capacity, link.max_ports, link.delay,
+            link.pluggable_transceiver_power_consumption, link.switch_port_power_consumption)
+
+
+@pytest.mark.parametrize('size', [5, 50, 450])
+@pytest.mark.parametrize('num_levels', [1, 2, 3])
+def test_generator_links_match_old_loop(tmp_path, size, num_levels):
+    # the generator links of the bundled T2 topologies, shuffled, as a generator csv
+    with open(data_path('T2_{}_links.json'.format(size)), 'r') as links_file:
+        links = [(link['fromNode'], link['toNode']) for link in json.load(links_file)['links']]
+    # generator numbering: nodes numbered level by level (BFS from node 0), rows shuffled
+    neighbours = {}
+    for first, second in links:
+        neighbours.setdefault(first, []).append(second)
+        neighbours.setdefault(second, []).append(first)
+    order, seen = [0], {0}
+    for node in order:
+        for neighbour in sorted(neighbours[node]):
+            if neighbour not in seen:
+                seen.add(neighbour)
+                order.append(neighbour)
+    number = {node: position for position, node in enumerate(order)}
+    links = [(number[first], number[second]) for first, second in links]
+    links = [links[position] for position in numpy.random.default_rng(size).permutation(len(links))]
+    links_csv = str(tmp_path / 'links.csv')
+    pandas.DataFrame(links, columns=['fromNode', 'toNode']).to_csv(links_csv, index=False)
+
+    node_names = ['node{}'.format(number) for number in range(max(max(link) for link in links) + 1)]
+    parameters = {name: values[:num_levels] for name, values in LEVEL_PARAMETERS.items()}
+    topo = Topology(data_path('T2_{}_BS_usage.csv'.format(size)))
+    topo.set_links_from_generator(links_csv, node_names, **parameters)
+
+    expected = old_generator_links(links_csv, node_names, **parameters)
+    assert sorted(topo.get_links()) == sorted(expected)
+    for key, link in expected.items():
+        assert link_values(topo.get_link(key)) == link_values(link)
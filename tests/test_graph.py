@@ -0,0 +1,60 @@
+from conftest import *
+from core.graph import *
+
+# a small DAG whose edge delays are distinct powers of two, so no two paths tie
+DAG_EDGES = [('a', 'b'), ('a', 'c'), ('a', 'd'), ('b', 'c'), ('b', 'e'), ('c', 'e'), ('c', 'f'),
+             ('d', 'e'), ('d', 'f'), ('e', 'g'), ('f', 'g'), ('b', 'g')]
+
+
+def build_graph(edges: list) -> Graph:
+    graph = Graph()
+    for position, (source, destination) in enumerate(edges):
+        graph.add_edge(source, destination, 2.0 ** position)
+    return graph
+
+
+def brute_force_paths(graph: Graph, source, destination) -> list:
+    """ Every simple path from source to destination, in depth-first order over the sorted adjacency. """
+    neighbours = {}
+    for (vertex, neighbour, _) in graph.cost:
+        neighbours.setdefault(vertex, []).append(neighbour)
+    paths = []
+
+    def extend(path: list) -> None:
+        if path[-1] == destination:
+            paths.append(path)
+            return
+        for neighbour in sorted(neighbours.get(path[-1], []), key=str):
+            if neighbour not in path:
+                extend(path + [neighbour])
+
+    extend([source])
+    return paths
+
+
+def path_delay(graph: Graph, path: list) -> float:
+    return sum(graph.cost[(path[idx], path[idx+1], 'delay')] for idx in range(len(path) - 1))
+
+
+@pytest.mark.parametrize('edges', [DAG_EDGES, DAG_EDGES + [('e', 'c')]], ids=['acyclic', 'cyclic'])
+@pytest.mark.parametrize('max_paths', [1, 3])
+def test_find_paths_matches_brute_force(edges, max_paths):
+    graph = build_graph(edges)
+    destinations = ['c', 'e', 'f', 'g', 'missing']
+    found = graph.find_paths('a', destinations, max_paths)
+    for destination in destinations:
+        expected = brute_force_paths(graph, 'a', destination) if destination != 'missing' else []
+        assert found[destination] == expected[:max_paths]
+
+
+# the cyclic graph has no topological order, so it takes the best-first search
+@pytest.mark.parametrize('edges', [DAG_EDGES, DAG_EDGES + [('e', 'c')]], ids=['acyclic', 'cyclic'])
+@pytest.mark.parametrize('max_paths, max_delay', [(1, None), (3, None), (10, None), (3, 2.0 ** 9)])
+def test_find_shortest_paths_matches_brute_force(edges, max_paths, max_delay):
+    graph = build_graph(edges)
+    destinations = ['c', 'e', 'f', 'g']
+    found = graph.find_shortest_paths('a', destinations, max_paths, max_delay)
+    for destination in destinations:
+        paths = sorted(brute_force_paths(graph, 'a', destination), key=lambda path: path_delay(graph, path))
+        expected = [path for path in paths if max_delay is None or path_delay(graph, path) <= max_delay]
+        assert found[destination] == expected[:max_paths]
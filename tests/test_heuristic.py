@@ -0,0 +1,21 @@
+from conftest import *
+from core.evaluator import *
+from core.heuristic import *
+from core.model import *
+
+
+@pytest.mark.parametrize('size, centralization_cap', [(5, 0), (5, 20), (50, 0)])
+def test_heuristic_is_feasible_and_bounded_by_the_optimum(size, centralization_cap):
+    topo = build_topology(size)
+    result = solve_heuristic(topo, centralization_cap)
+    assert result['feasible'] and result['unassigned'] == []
+    assert sorted(result['assignment']) == sorted(topo.get_base_station_keys())
+
+    model, _ = build_eepran_model_sparse(topo, centralization_cap, lp_path=None, backend='highs')
+    optimum = model.solve().get_objective_value()
+    evaluator = SolutionEvaluator(model.matrix)
+    evaluated = evaluator.evaluate(evaluator.assignment_from_keys(result['keys']))
+    assert evaluated['feasible'][0]
+    assert evaluated['objective'][0] == pytest.approx(result['objective'])
+    assert evaluated['centralization'][0] == result['centralization'] >= centralization_cap
+    assert result['objective'] >= optimum - 1e-6
@@ -0,0 +1,34 @@
+from conftest import *
+from core.model import *
+
+
+def test_parameters_reset_between_solves(topo):
+    model, _ = build_eepran_model_sparse(topo, lp_path=None, backend='highs')
+    model.parameters.timelimit = 60
+    model.parameters.threads = 1
+    model.solve()
+    assert model.highs.getOptionValue('time_limit')[1] == 60
+    assert model.highs.getOptionValue('threads')[1] == 1
+
+    model.parameters.timelimit = None
+    model.parameters.threads = None
+    model.solve()
+    assert model.highs.getOptionValue('time_limit')[1] == numpy.inf
+    assert model.highs.getOptionValue('threads')[1] == 0
+
+
+def test_update_loads_matches_fresh_model(topo):
+    loads = {bs_key: 0.25 + 0.5 * (position % 2) for position, bs_key in enumerate(topo.get_base_station_keys())}
+    model, _ = build_eepran_model_sparse(topo, lp_path=None, backend='highs')
+    model.solve()
+    model.matrix.set_loads(loads)
+    update_model_loads(model)
+    solution = model.solve()
+
+    matrix = build_eepran_matrix(topo)
+    matrix.set_loads(loads)
+    fresh, _ = create_model_from_matrix(matrix, 'highs')
+    assert solution.get_objective_value() == pytest.approx(fresh.solve().get_objective_value())
+    # the rows moved by update_loads() are read back at their new positions
+    row_values = [solution.get_value(constraint.left_expr) for constraint in model.row_constraints]
+    assert row_values == pytest.approx(matrix.rows @ solution.column_values)
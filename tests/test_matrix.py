@@ -0,0 +1,31 @@
+from conftest import *
+from core.model import *
+
+BASELINE_OBJECTIVE = 6670.41
+
+
+def test_term_model_objective(topo):
+    model, _ = build_eepran_model(topo, lp_path=None)
+    assert model.solve().get_objective_value() == pytest.approx(BASELINE_OBJECTIVE, abs=0.01)
+
+
+@pytest.mark.parametrize('backend', SOLVER_BACKENDS)
+def test_matrix_model_objective(topo, backend):
+    model, centralization_constraint = build_eepran_model_sparse(topo, lp_path=None, backend=backend)
+    solution = model.solve()
+    assert solution.get_objective_value() == pytest.approx(BASELINE_OBJECTIVE, abs=0.01)
+    assert solution.get_value(centralization_constraint.left_expr) == pytest.approx(18)
+
+
+def test_matrix_matches_term_model(topo):
+    term_model, _ = build_eepran_model(topo, lp_path=None)
+    matrix = build_eepran_matrix(topo)
+    assert matrix.num_columns == term_model.number_of_variables
+    assert len(matrix.row_names) == term_model.number_of_constraints
+    for row, name in enumerate(matrix.row_names):
+        constraint = term_model.get_constraint_by_name(name)
+        columns, values = matrix.get_row_terms(row)
+        expected = {matrix.column_names[column]: value for column, value in zip(columns.tolist(), values.tolist())}
+        actual = {var.name: value for var, value in constraint.left_expr.iter_terms() if value != 0}
+        assert actual == pytest.approx(expected)
+        assert constraint.rhs.constant == pytest.approx(matrix.rhs[row])
@@ -0,0 +1,29 @@
+from conftest import *
+from core.evaluator import *
+from core.multiperiod import *
+
+SLOTS = [0, 48, 96, 144]
+
+
+@pytest.mark.parametrize('backend', SOLVER_BACKENDS)
+def test_slot_updates_match_cold_builds(backend):
+    topo = build_topology(usage_csv='T2_5_BS_usage.csv')
+    results = solve_multi_period(topo, slots=SLOTS, backend=backend)
+    assert [result['slot'] for result in results] == SLOTS
+    assert len({round(result['objective'], 6) for result in results}) == len(SLOTS)
+
+    for result in results:
+        matrix = build_eepran_matrix(topo)
+        matrix.set_loads(topo.get_base_station_loads(result['slot']))
+        model, _ = create_model_from_matrix(matrix, backend)
+        objective = model.solve().get_objective_value()
+        assert result['objective'] == pytest.approx(objective)
+
+        # the slot assignment is an optimum of the cold model (ties may pick another one)
+        keys = [DecisionVariableKey(route_id, drc_id, bs_key)
+                for bs_key, (route_id, drc_id) in result['assignment'].items()]
+        evaluator = SolutionEvaluator(matrix)
+        evaluated = evaluator.evaluate(evaluator.assignment_from_keys(keys))
+        assert evaluated['feasible'][0]
+        assert evaluated['objective'][0] == pytest.approx(objective)
+        assert evaluated['centralization'][0] == pytest.approx(result['centralization'])
@@ -0,0 +1,97 @@
+from conftest import *
+from core.model import *
+
+
+def assert_routes_match_fresh(topo: Topology, route_delta: RouteDelta) -> None:
+    """ The updated routes equal (up to identifiers and order) freshly generated ones. """
+    assert not topo.get_stale_base_stations()
+    fresh = [route_signature(route) for route in topo.iter_routes('node0')]
+    updated = [route_signature(route) for route in topo.get_routes()]
+    assert sorted(updated) == sorted(fresh)
+    identifiers = [route.identifier for route in topo.get_routes()]
+    assert len(set(identifiers)) == len(identifiers)
+    assert all(route.identifier in identifiers for route in route_delta.added)
+
+
+def test_set_link_delay(topo):
+    link = topo.get_link(next(iter(topo.get_links())))
+    topo.set_link_delay(link.node1, link.node2, link.delay * 2)
+    assert_routes_match_fresh(topo, topo.update_routes())
+
+
+def test_add_and_remove_hardware(topo):
+    node_key = [key for key in topo.get_node_keys() if topo.get_node(key).has_base_station()][1]
+    topo.add_node_hardware(node_key, 2)
+    assert_routes_match_fresh(topo, topo.update_routes())
+    topo.remove_node_hardware(topo.get_node(node_key).get_hardware_keys()[0])
+    assert_routes_match_fresh(topo, topo.update_routes())
+
+
+def test_remove_last_base_station_of_node_with_hardware(topo):
+    node = topo.get_node('node1')
+    assert node.has_hardware() and node.get_base_station_keys() == ['node1_bs1']
+    topo.remove_node_base_station('node1_bs1')
+    route_delta = topo.update_routes()
+    assert_routes_match_fresh(topo, route_delta)
+    assert all('node1_hw1' not in route.get_hardware_keys() for route in topo.get_routes())
+    assert all(route.target != 'node1_bs1' for route in topo.get_routes())
+
+
+def matrix_terms(matrix: EepranMatrix) -> tuple:
+    """ Rows and objective of a matrix by name, independent of the column and row order. """
+    rows = {}
+    for row, name in enumerate(matrix.row_names):
+        columns, values = matrix.get_row_terms(row)
+        rows[name] = (matrix.row_senses[row], float(matrix.rhs[row]),
+                      sorted(zip([matrix.column_names[column] for column in columns.tolist()], values.tolist())))
+    return rows, dict(zip(matrix.column_names, matrix.objective.tolist()))
+
+
+def test_update_model_topology(topo):
+    model, _ = build_eepran_model_sparse(topo, lp_path=None, backend='highs')
+    previous = model.matrix
+    previous_keys = list(previous.registry.keys)
+    node_key = [key for key in topo.get_node_keys() if topo.get_node(key).has_base_station()][1]
+
+    topo.add_node_hardware(node_key, 2)
+    updated, delta = update_model_topology(model, topo.update_routes(), rebuild_fraction=1.0)
+    assert updated is model and len(delta.added_columns) > 0
+    assert previous.registry.keys == previous_keys
+    fresh, _ = build_eepran_model_sparse(topo, lp_path=None, backend='highs')
+    assert matrix_terms(model.matrix) == matrix_terms(fresh.matrix)
+    assert model.solve().get_objective_value() == pytest.approx(fresh.solve().get_objective_value())
+
+    topo.remove_node_hardware(topo.get_node(node_key).get_hardware_keys()[-1])
+    rebuilt, _ = update_model_topology(model, topo.update_routes(), rebuild_fraction=0.0)
+    assert rebuilt is not model
+    fresh, _ = build_eepran_model_sparse(topo, lp_path=None, backend='highs')
+    assert matrix_terms(rebuilt.matrix) == matrix_terms(fresh.matrix)
+
+
+def test_links_must_point_away_from_the_core(topo):
+    with pytest.raises(ValueError):
+        topo.add_link(Link(100, 8, 0.005, 'node5', True, 'node1', True, 4.5, 14))
+    assert str(('node5', 'node1')) not in topo.get_links()
+
+
+MUTATIONS = {
+    'add_base_station': lambda topo: topo.add_node_base_station('node3', 1),
+    'remove_base_station': lambda topo: topo.remove_node_base_station('node4_bs1'),
+    'add_link': lambda topo: topo.add_link(Link(100, 8, 0.005, 'node2', True, 'node5', True, 4.5, 14)),
+    'remove_link': lambda topo: topo.remove_link('node1', 'node4'),
+}
+
+
+@pytest.mark.parametrize('mutation', sorted(MUTATIONS))
+@pytest.mark.parametrize('backend', SOLVER_BACKENDS)
+def test_matrix_delta_matches_cold_rebuild(topo, backend, mutation):
+    model, _ = build_eepran_model_sparse(topo, lp_path=None, backend=backend)
+    model.solve()
+    MUTATIONS[mutation](topo)
+    updated, delta = update_model_topology(model, topo.update_routes(), rebuild_fraction=1.0)
+    assert updated is model and not delta.is_empty()
+
+    fresh, _ = build_eepran_model_sparse(topo, lp_path=None, backend=backend)
+    assert matrix_terms(model.matrix) == matrix_terms(fresh.matrix)
+    assert model.number_of_constraints == fresh.number_of_constraints
+    assert model.solve().get_objective_value() == pytest.approx(fresh.solve().get_objective_value())
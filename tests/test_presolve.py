@@ -0,0 +1,27 @@
+from conftest import *
+from core.presolve import *
+from core.presolve import _prune_group
+
+
+def profile(route_id: int, static_cost: float, load_cost: float, links: dict) -> CandidateProfile:
+    candidate = CandidateProfile(DecisionVariableKey(route_id, 1, 'node1_bs1'))
+    candidate.static_cost = static_cost
+    candidate.load_cost = load_cost
+    candidate.links = links
+    return candidate
+
+
+def test_mutual_dominance_keeps_lowest_key():
+    # same total power split differently, and a link used with no bandwidth:
+    # each dominates the other without being equivalent
+    a = profile(1, 10.0, 5.0, {'link': 1.0})
+    b = profile(2, 12.0, 3.0, {'link': 1.0, 'other': 0.0})
+    c = profile(3, 11.0, 4.0, {'link': 1.0})
+    assert _prune_group([c, b, a], False, True) == [c, b]
+    assert _prune_group([a, b], False, False) == []
+
+
+def test_strict_dominance():
+    a = profile(2, 10.0, 5.0, {'link': 1.0})
+    b = profile(1, 10.0, 5.0, {'link': 2.0})
+    assert _prune_group([a, b], False, True) == [b]
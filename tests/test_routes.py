@@ -0,0 +1,69 @@
+from conftest import *
+from core.registry import *
+from core.routestore import *
+import itertools
+
+
+@pytest.mark.parametrize('size', [5, 50])
+def test_serial_and_parallel_routes_match_shipped(size):
+    serial = build_topology(size, generate_routes=False)
+    serial.generate_routes('node0')
+    parallel = build_topology(size, generate_routes=False)
+    parallel.generate_routes('node0', workers=2)
+
+    serial_routes = [(route.identifier,) + route_signature(route) for route in serial.get_routes()]
+    parallel_routes = [(route.identifier,) + route_signature(route) for route in parallel.get_routes()]
+    assert serial_routes == parallel_routes
+
+    # the shipped files were written by a version whose path order followed the memory
+    # addresses of the links, so only the routes (not their identifiers) are compared
+    shipped = read_routes_json(data_path('routes_{}.json'.format(size)))
+    assert sorted(route_signature(route) for route in serial.get_routes()) == \
+        sorted(route_signature(route) for route in shipped)
+
+
+def brute_force_routes(topo: Topology, origin_node: str) -> list:
+    """ Every route of every simple path from origin_node to every base station, without pruning. """
+    edges, delays = {}, {}
+    for link in {id(link): link for link in map(topo.get_link, topo.get_links())}.values():
+        edges.setdefault(link.node1, []).append(link.node2)
+        delays[(link.node1, link.node2)] = delays[(link.node2, link.node1)] = link.delay
+
+    def paths_to(path: list, destination: str):
+        if path[-1] == destination:
+            yield path
+        for neighbour in edges.get(path[-1], []):
+            if neighbour not in path:
+                yield from paths_to(path + [neighbour], destination)
+
+    routes = []
+    for bs_key in topo.get_base_station_keys():
+        for path in paths_to([origin_node], bs_key):
+            links = list(zip(path[:-1], path[1:]))
+            for num_cuts in (2, 1, 0):
+                for cuts in itertools.combinations(range(1, len(links)), num_cuts):
+                    xhauls = [links[start:end] for start, end in zip((0,) + cuts, cuts + (len(links),))]
+                    # backhaul and midhaul end in a hardware of their last node
+                    ends = [topo.get_node(xhaul[-1][-1]).get_hardware_keys() for xhaul in xhauls[:-1]]
+                    for hardware in itertools.product(*ends):
+                        route = [[]] * (3 - len(xhauls)) + [xhaul + [(xhaul[-1][-1], hw)]
+                                                            for xhaul, hw in zip(xhauls, hardware)] + xhauls[-1:]
+                        sequence = [xhaul[-1][-1] if len(xhaul) > 0 else origin_node for xhaul in route]
+                        route_delays = [sum([delays[link] for link in xhaul]) for xhaul in route]
+                        routes.append(Route(0, origin_node, bs_key, sequence, route[2], route[1], route[0],
+                                            *reversed(route_delays)))
+    return routes
+
+
+def test_delay_budget_pruning_matches_brute_force():
+    topo = build_topology(generate_routes=False)
+    topo.set_link_delay('node1', 'node3', 0.3)     # over the fronthaul budget of 3 node DRCs
+    topo.set_link_delay('node2', 'node4', 11.0)    # over every budget
+    topo.generate_routes('node0')
+
+    routes = brute_force_routes(topo, 'node0')
+    splits = package_drc.get_drc_list()
+    expected = [route for route in routes if len(get_route_drcs(route, splits)) > 0]
+    assert 0 < len(expected) < len(routes)
+    assert sorted(route_signature(route) for route in topo.get_routes()) == \
+        sorted(route_signature(route) for route in expected)
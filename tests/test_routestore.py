@@ -0,0 +1,26 @@
+import json
+
+from conftest import *
+from core.routestore import *
+
+
+def test_route_store_round_trip(topo, tmp_path):
+    store_path = str(tmp_path / 'routes')
+    assert write_route_store(topo.get_routes(), store_path) == len(topo.get_routes())
+    store = RouteStore(store_path)
+    assert len(store) == len(topo.get_routes())
+    assert [route.to_dict() for route in store.iter_routes()] == [route.to_dict() for route in topo.get_routes()]
+
+    imported = build_topology(generate_routes=False)
+    imported.import_routes_from_store(store_path)
+    assert [route.to_dict() for route in imported.get_routes()] == \
+        [route.to_dict() for route in topo.get_routes()]
+
+
+def test_json_store_conversion(tmp_path):
+    store_path = str(tmp_path / 'routes')
+    json_path = str(tmp_path / 'routes.json')
+    convert_routes_json_to_store(data_path('routes_5.json'), store_path)
+    convert_route_store_to_json(store_path, json_path)
+    with open(data_path('routes_5.json'), 'r') as shipped, open(json_path, 'r') as converted:
+        assert json.load(converted) == json.load(shipped)
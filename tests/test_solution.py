@@ -0,0 +1,27 @@
+from conftest import *
+from core.model import *
+from core.solution import *
+
+
+@pytest.mark.parametrize('backend', SOLVER_BACKENDS)
+def test_solution_store_round_trip(topo, tmp_path, backend):
+    model, _ = build_eepran_model_sparse(topo, lp_path=None, backend=backend)
+    model.solve()
+    solution = extract_solution(model)
+    assert solution['summary']['objective'] == pytest.approx(6670.41, abs=0.01)
+    assert solution['summary']['centralization'] == 18
+    assert sorted(solution['placement']['base_station'].tolist()) == sorted(topo.get_base_station_keys())
+    terms = sum(float(solution['placement'][column].sum())
+                for column in ('base_station_power', 'dynamic_power', 'link_power'))
+    terms += float(solution['hardware']['static_power'].sum())
+    assert terms == pytest.approx(solution['summary']['objective'])
+
+    path = str(tmp_path / 'solution')
+    write_solution_store(solution, path)
+    for mmap in (True, False):
+        stored = read_solution_store(path, mmap=mmap)
+        assert stored['summary'] == solution['summary']
+        for table in SOLUTION_TABLES:
+            assert sorted(stored[table]) == sorted(solution[table])
+            for column, values in solution[table].items():
+                assert numpy.array_equal(stored[table][column], values)
@@ -0,0 +1,32 @@
+from conftest import *
+from core.sweep import *
+
+
+def serial_sweep(topo: Topology, caps: list, backend: str) -> dict:
+    model, centralization_constraint = create_model_from_matrix(build_eepran_matrix(topo), backend)
+    results = {}
+    for cap in caps:
+        centralization_constraint.rhs = cap
+        solution = model.solve()
+        results[cap] = (solution.get_objective_value() if solution is not None else None)
+    return results
+
+
+@pytest.mark.parametrize('backend', SOLVER_BACKENDS)
+def test_parallel_sweep_matches_serial(topo, backend):
+    caps = [0, 18, 24, 30, 36, 45]
+    table = sweep_centralization(topo, caps, workers=2, backend=backend)
+    assert [row['cap'] for row in table] == caps
+    expected = serial_sweep(topo, caps, backend)
+    for row in table:
+        assert row['objective'] == pytest.approx(expected[row['cap']])
+        if row['objective'] is not None:
+            assert row['centralization'] >= row['cap']
+    assert table[-1]['objective'] is None and table[-1]['dominated']
+
+
+def test_adaptive_sweep_matches_serial(topo):
+    table = sweep_centralization(topo, num_points=6, workers=2, backend='highs')
+    assert len(table) == 6 and table[0]['cap'] == 0 and table[-1]['cap'] == 45
+    expected = serial_sweep(topo, [row['cap'] for row in table], 'highs')
+    assert [row['objective'] for row in table] == pytest.approx([expected[row['cap']] for row in table])